@@ -0,0 +1,197 @@
+"""
+Incrementally maintained aggregate tables.
+
+The scraper's write path adds each batch's mention counts to the aggregates
+in the same transaction as the raw rows, so the API can read totals and
+time series without scanning brand_mentions.
+"""
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import BrandMention, BrandMentionDaily, BrandMentionHourly, BrandSummary
+
+logger = logging.getLogger(__name__)
+
+# Rollup table for each supported bucket size
+ROLLUPS = {
+    "hour": BrandMentionHourly,
+    "day": BrandMentionDaily,
+}
+
+# Rows read per round-trip when rebuilding rollups
+REBUILD_CHUNK_SIZE = 10000
+
+
+def _insert(db: Session, model):
+    """Build an INSERT that supports ON CONFLICT for the session's database."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(model)
+    if dialect == "sqlite":
+        return sqlite.insert(model)
+    raise NotImplementedError(f"Upsert is not supported for {dialect}")
+
+
+def add_brand_totals(db: Session, totals: Dict[str, int]):
+    """
+    Add mention counts to the brand summaries with a single upsert.
+
+    Does not commit; call it inside the transaction that stores the mentions.
+
+    Args:
+        db: Session holding the open transaction
+        totals: Mentions to add, by brand name
+    """
+    rows = [{"brand_name": brand, "total_mentions": count} for brand, count in sorted(totals.items()) if count]
+    if not rows:
+        return
+
+    # Sorted rows take the row locks in a fixed order, so concurrent writers cannot deadlock
+    stmt = _insert(db, BrandSummary).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BrandSummary.brand_name],
+        set_={
+            "total_mentions": BrandSummary.total_mentions + stmt.excluded.total_mentions,
+            "last_updated": func.now(),
+        }
+    )
+    db.execute(stmt)
+
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """
+    Truncate a timestamp to the start of its UTC hour or day.
+
+    Naive timestamps are taken to be UTC.
+    """
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    moment = moment.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        moment = moment.replace(hour=0)
+    return moment
+
+
+def add_mention_rollups(db: Session, totals: Dict[str, int], at: datetime):
+    """
+    Add mention counts to the hourly and daily rollups for the bucket holding `at`.
+
+    Does not commit; call it inside the transaction that stores the mentions.
+    """
+    counts = [(brand, count) for brand, count in sorted(totals.items()) if count]
+    if not counts:
+        return
+
+    for bucket, model in ROLLUPS.items():
+        start = bucket_start(at, bucket)
+        stmt = _insert(db, model).values([
+            {"bucket_start": start, "brand_name": brand, "mention_count": count}
+            for brand, count in counts
+        ])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[model.brand_name, model.bucket_start],
+            set_={"mention_count": model.mention_count + stmt.excluded.mention_count}
+        ))
+
+
+def record_mentions(db: Session, totals: Dict[str, int], at: Optional[datetime] = None):
+    """
+    Add a write's mention counts to every aggregate table.
+
+    Args:
+        db: Session holding the open transaction
+        totals: Mentions to add, by brand name
+        at: When the mentions were stored (defaults to now)
+    """
+    add_brand_totals(db, totals)
+    add_mention_rollups(db, totals, at or datetime.now(timezone.utc))
+
+
+def rebuild_brand_summaries(db: Session) -> Dict[str, int]:
+    """
+    Recompute every brand summary from the raw brand_mentions rows and commit.
+
+    On Postgres, brand_mentions is locked against writes while the totals
+    are rebuilt, so a running scraper just waits instead of being lost.
+
+    Returns:
+        The rebuilt totals by brand name
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE brand_mentions IN SHARE MODE"))
+
+        totals = {
+            row.brand_name: int(row.total_mentions)
+            for row in db.query(
+                BrandMention.brand_name,
+                func.sum(BrandMention.mention_count).label("total_mentions")
+            ).group_by(BrandMention.brand_name)
+        }
+
+        db.query(BrandSummary).filter(BrandSummary.brand_name.notin_(list(totals))).update(
+            {BrandSummary.total_mentions: 0}, synchronize_session=False
+        )
+        if totals:
+            stmt = _insert(db, BrandSummary).values(
+                [{"brand_name": brand, "total_mentions": count} for brand, count in sorted(totals.items())]
+            )
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[BrandSummary.brand_name],
+                set_={"total_mentions": stmt.excluded.total_mentions, "last_updated": func.now()}
+            ))
+
+        db.commit()
+        logger.info(f"Rebuilt brand summaries for {len(totals)} brands")
+        return totals
+
+    except Exception:
+        db.rollback()
+        raise
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute the hourly and daily rollups from the raw brand_mentions rows and commit.
+
+    Returns:
+        The number of hourly buckets written
+    """
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(text("LOCK TABLE brand_mentions IN SHARE MODE"))
+
+        hourly = Counter()
+        raw_rows = db.query(
+            BrandMention.brand_name, BrandMention.mention_count, BrandMention.created_at
+        ).execution_options(yield_per=REBUILD_CHUNK_SIZE)
+        for row in raw_rows:
+            if row.mention_count and row.created_at is not None:
+                hourly[(bucket_start(row.created_at, "hour"), row.brand_name)] += row.mention_count
+
+        daily = Counter()
+        for (start, brand), count in hourly.items():
+            daily[(bucket_start(start, "day"), brand)] += count
+
+        for model, counts in ((BrandMentionHourly, hourly), (BrandMentionDaily, daily)):
+            db.query(model).delete(synchronize_session=False)
+            rows = [
+                {"bucket_start": start, "brand_name": brand, "mention_count": count}
+                for (start, brand), count in counts.items()
+            ]
+            for i in range(0, len(rows), REBUILD_CHUNK_SIZE):
+                db.execute(model.__table__.insert(), rows[i:i + REBUILD_CHUNK_SIZE])
+
+        db.commit()
+        logger.info(f"Rebuilt {len(hourly)} hourly and {len(daily)} daily rollup buckets")
+        return len(hourly)
+
+    except Exception:
+        db.rollback()
+        raise
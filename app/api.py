@@ -1,12 +1,14 @@
 """
 FastAPI application with brand mention endpoints.
 """
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Query
+from datetime import datetime
+from typing import Optional
 import logging
 
-from .database import init_db
+from .database import init_db, dispose_engines
 from .endpoints import (
-    root, favicon, get_mentions, get_brand_mentions, 
+    root, favicon, get_mentions, get_brand_mentions, get_mentions_timeseries,
     health_check, get_db_dependency
 )
 from config import DEBUG
@@ -32,6 +34,11 @@ def create_app(password: str):
         init_db(password)
         logger.info("Database initialized successfully")
 
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        """Close pooled database connections on shutdown."""
+        dispose_engines()
+
     # Create database dependency
     db_dependency = get_db_dependency(password)
 
@@ -48,6 +55,17 @@ def create_app(password: str):
     async def mentions_endpoint(db=Depends(db_dependency)):
         return await get_mentions(db)
 
+    # Registered before /mentions/{brand} so "timeseries" is not taken as a brand
+    @app.get("/mentions/timeseries")
+    async def mentions_timeseries_endpoint(
+        brand: Optional[str] = None,
+        start: Optional[datetime] = Query(None, alias="from"),
+        end: Optional[datetime] = Query(None, alias="to"),
+        bucket: str = "day",
+        db=Depends(db_dependency)
+    ):
+        return await get_mentions_timeseries(db, brand, start, end, bucket)
+
     @app.get("/mentions/{brand}")
     async def brand_mentions_endpoint(brand: str, db=Depends(db_dependency)):
         return await get_brand_mentions(brand, db)
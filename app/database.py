@@ -1,20 +1,77 @@
 """
 Database configuration and connection setup.
 """
+import threading
+from typing import Dict
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from config import DB_USER, DB_HOST, DB_PORT, DB_NAME
+from config import (
+    DB_USER, DB_HOST, DB_PORT, DB_NAME,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING
+)
+
+# Engines and session factories shared by everything in this process, one per URL
+_engines: Dict[str, Engine] = {}
+_session_factories: Dict[str, sessionmaker] = {}
+_engines_lock = threading.Lock()
 
 # Database URL will be built with password parameter
 def get_database_url(password: str) -> str:
     """Build database URL with password."""
     return f"postgresql://{DB_USER}:{password}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+def _engine_options(database_url: str) -> dict:
+    """Connection pool settings for the given database URL."""
+    if database_url.startswith("sqlite"):
+        # SQLite pools are managed by the dialect
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
 def create_engine_with_password(password: str):
     """Create SQLAlchemy engine with password."""
     database_url = get_database_url(password)
-    return create_engine(database_url)
+    return create_engine(database_url, **_engine_options(database_url))
+
+def get_engine(password: str) -> Engine:
+    """
+    Get the process-wide engine for the database, creating it on first use.
+    """
+    database_url = get_database_url(password)
+    engine = _engines.get(database_url)
+    if engine is None:
+        with _engines_lock:
+            engine = _engines.get(database_url)
+            if engine is None:
+                engine = create_engine(database_url, **_engine_options(database_url))
+                _engines[database_url] = engine
+                _session_factories[database_url] = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    return engine
+
+def get_session_factory(password: str) -> sessionmaker:
+    """
+    Get the session factory bound to the shared engine.
+    """
+    get_engine(password)
+    return _session_factories[get_database_url(password)]
+
+def dispose_engines():
+    """
+    Close all pooled connections, e.g. on application shutdown.
+    """
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _session_factories.clear()
 
 # Create Base class
 Base = declarative_base()
@@ -23,9 +80,7 @@ def get_db(password: str):
     """
     Dependency to get database session.
     """
-    engine = create_engine_with_password(password)
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
+    db = get_session_factory(password)()
     try:
         yield db
     finally:
@@ -35,5 +90,5 @@ def init_db(password: str):
     """
     Initialize database tables.
     """
-    engine = create_engine_with_password(password)
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    engine = get_engine(password)
+    Base.metadata.create_all(bind=engine)
@@ -4,19 +4,48 @@ API endpoints for brand mentions.
 from fastapi import Depends, HTTPException
 from fastapi.responses import Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Dict, Any
+from typing import Callable, Dict, Any, Optional
+from datetime import datetime, timedelta, timezone
 import logging
 
-from .models import BrandMention
+import anyio
+
+from .aggregates import ROLLUPS, bucket_start
+from .models import BrandSummary
+from config import DB_THREAD_LIMIT, TIMESERIES_DEFAULT_DAYS
 
 logger = logging.getLogger(__name__)
 
+# Caps the worker threads running database queries; created on first use
+_db_limiter: Optional[anyio.CapacityLimiter] = None
+
+
+def _get_db_limiter() -> anyio.CapacityLimiter:
+    """Get the limiter shared by all database calls."""
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(DB_THREAD_LIMIT)
+    return _db_limiter
+
+
+async def run_db(query: Callable, *args):
+    """
+    Run a blocking database function in a worker thread.
+    
+    Keeps the event loop free to serve other requests while the query runs.
+    """
+    return await anyio.to_thread.run_sync(query, *args, limiter=_get_db_limiter())
+
 
 def get_db_dependency(password: str):
     """Create database dependency with password."""
     from .database import get_db
-    return lambda: next(get_db(password))
+    
+    def db_dependency():
+        # Yielding lets FastAPI close the session once the response is sent
+        yield from get_db(password)
+    
+    return db_dependency
 
 
 async def root():
@@ -26,6 +55,7 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "GET /mentions": "Get total mentions for all brands",
+            "GET /mentions/timeseries": "Get mentions per hour or day over a time range",
             "GET /mentions/{brand}": "Get mentions for a specific brand"
         }
     }
@@ -36,23 +66,65 @@ async def favicon():
     return Response(status_code=204)  # No content response
 
 
+def query_mentions(db: Session) -> Dict[str, int]:
+    """Query total mentions for all brands (blocking)."""
+    results = db.query(BrandSummary.brand_name, BrandSummary.total_mentions).all()
+    
+    mentions = {result.brand_name: result.total_mentions or 0 for result in results}
+    
+    # Ensure all brands are present (even with 0 mentions)
+    all_brands = ['nike', 'adidas', 'hoka', 'new balance', 'jordan']
+    for brand in all_brands:
+        if brand not in mentions:
+            mentions[brand] = 0
+    
+    return mentions
+
+
+def query_brand_mentions(brand: str, db: Session) -> Dict[str, Any]:
+    """Query mentions for a specific brand (blocking)."""
+    brand_lower = brand.lower()
+    
+    result = db.query(BrandSummary.total_mentions).filter(BrandSummary.brand_name == brand_lower).scalar()
+    
+    total_mentions = result or 0
+    
+    return {
+        "brand": brand_lower,
+        "mentions": total_mentions
+    }
+
+
+def query_timeseries(db: Session, brand: Optional[str], start: datetime, end: datetime,
+                     bucket: str) -> Dict[str, Any]:
+    """Query mentions per bucket from the rollup tables (blocking)."""
+    model = ROLLUPS[bucket]
+    query = db.query(model.brand_name, model.bucket_start, model.mention_count).filter(
+        model.bucket_start >= bucket_start(start, bucket),
+        model.bucket_start < end
+    )
+    if brand:
+        query = query.filter(model.brand_name == brand.lower())
+    
+    series: Dict[str, list] = {}
+    for row in query.order_by(model.brand_name, model.bucket_start):
+        series.setdefault(row.brand_name, []).append({
+            "bucket_start": bucket_start(row.bucket_start, bucket).isoformat(),
+            "mentions": row.mention_count
+        })
+    
+    return {
+        "bucket": bucket,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "series": series
+    }
+
+
 async def get_mentions(db: Session) -> Dict[str, int]:
     """Get total mentions for all brands."""
     try:
-        results = db.query(
-            BrandMention.brand_name,
-            func.sum(BrandMention.mention_count).label('total_mentions')
-        ).group_by(BrandMention.brand_name).all()
-        
-        mentions = {result.brand_name: result.total_mentions for result in results}
-        
-        # Ensure all brands are present (even with 0 mentions)
-        all_brands = ['nike', 'adidas', 'hoka', 'new balance', 'jordan']
-        for brand in all_brands:
-            if brand not in mentions:
-                mentions[brand] = 0
-        
-        return mentions
+        return await run_db(query_mentions, db)
         
     except Exception as e:
         logger.error(f"Error retrieving mentions: {e}")
@@ -62,24 +134,41 @@ async def get_mentions(db: Session) -> Dict[str, int]:
 async def get_brand_mentions(brand: str, db: Session) -> Dict[str, Any]:
     """Get mentions for a specific brand."""
     try:
-        brand_lower = brand.lower()
-        
-        result = db.query(
-            func.sum(BrandMention.mention_count).label('total_mentions')
-        ).filter(BrandMention.brand_name == brand_lower).scalar()
-        
-        total_mentions = result or 0
-        
-        return {
-            "brand": brand_lower,
-            "mentions": total_mentions
-        }
+        return await run_db(query_brand_mentions, brand, db)
         
     except Exception as e:
         logger.error(f"Error retrieving mentions for {brand}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+def _as_utc(moment: datetime) -> datetime:
+    """Convert a timestamp to UTC, treating naive ones as UTC already."""
+    if moment.tzinfo is None:
+        return moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc)
+
+
+async def get_mentions_timeseries(db: Session, brand: Optional[str] = None,
+                                  start: Optional[datetime] = None, end: Optional[datetime] = None,
+                                  bucket: str = "day") -> Dict[str, Any]:
+    """Get mentions per hour or day, optionally for one brand, between start and end."""
+    if bucket not in ROLLUPS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(ROLLUPS)}")
+    
+    # Times without a zone are UTC; buckets are UTC hours and days
+    end = _as_utc(end or datetime.now(timezone.utc))
+    start = _as_utc(start or end - timedelta(days=TIMESERIES_DEFAULT_DAYS))
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be earlier than 'to'")
+    
+    try:
+        return await run_db(query_timeseries, db, brand, start, end, bucket)
+        
+    except Exception as e:
+        logger.error(f"Error retrieving mention time series: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 async def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "message": "API is running"}
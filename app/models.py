@@ -1,7 +1,7 @@
 """
 SQLAlchemy models for the brand mentions system.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Text, Index
+from sqlalchemy import Boolean, Column, Integer, String, DateTime, Text, Index, UniqueConstraint
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -53,4 +53,88 @@ class BrandSummary(Base):
     last_updated = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Index for faster queries
-    __table_args__ = (Index('idx_brand_summaries_brand_name', 'brand_name'),) 
\ No newline at end of file
+    __table_args__ = (Index('idx_brand_summaries_brand_name', 'brand_name'),)
+
+
+class PromptLedger(Base):
+    """
+    Model for tracking the status of each prompt within a scrape run.
+    """
+    __tablename__ = "prompt_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String(64), nullable=False)
+    prompt_hash = Column(String(64), nullable=False)
+    prompt_text = Column(Text, nullable=False)
+    status = Column(String(20), nullable=False, default='pending')
+    attempts = Column(Integer, default=0)
+    prompt_id = Column(Integer, nullable=True)
+    cached = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # One entry per prompt per run
+    __table_args__ = (
+        UniqueConstraint('run_id', 'prompt_hash', name='uq_prompt_ledger_run_prompt'),
+        Index('idx_prompt_ledger_created_at', 'created_at'),
+    )
+
+
+class BrandMentionHourly(Base):
+    """
+    Model for storing brand mention totals per hour.
+    """
+    __tablename__ = "brand_mentions_hourly"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    brand_name = Column(String(50), nullable=False)
+    mention_count = Column(Integer, nullable=False, default=0)
+
+    # One row per brand per hour; also serves brand + time range lookups
+    __table_args__ = (
+        UniqueConstraint('brand_name', 'bucket_start', name='uq_brand_mentions_hourly_brand_bucket'),
+        Index('idx_brand_mentions_hourly_bucket_start', 'bucket_start'),
+    )
+
+
+class BrandMentionDaily(Base):
+    """
+    Model for storing brand mention totals per day.
+    """
+    __tablename__ = "brand_mentions_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    bucket_start = Column(DateTime(timezone=True), nullable=False)
+    brand_name = Column(String(50), nullable=False)
+    mention_count = Column(Integer, nullable=False, default=0)
+
+    # One row per brand per day; also serves brand + time range lookups
+    __table_args__ = (
+        UniqueConstraint('brand_name', 'bucket_start', name='uq_brand_mentions_daily_brand_bucket'),
+        Index('idx_brand_mentions_daily_bucket_start', 'bucket_start'),
+    )
+
+
+class ScrapeJob(Base):
+    """
+    Model for prompts waiting in the shared work queue.
+    """
+    __tablename__ = "scrape_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_text = Column(Text, nullable=False)
+    prompt_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default='queued')
+    attempts = Column(Integer, nullable=False, default=0)
+    lease_owner = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # Indexes for claiming queued jobs in order and finding expired leases
+    __table_args__ = (
+        Index('idx_scrape_jobs_status_id', 'status', 'id'),
+        Index('idx_scrape_jobs_lease_expires_at', 'lease_expires_at'),
+    )
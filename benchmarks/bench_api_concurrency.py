@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API throughput as the number of in-flight requests grows.
+
+Serves GET /mentions from a SQLite database whose queries are slowed down
+by a fixed delay, standing in for the round-trip to Postgres. Compares the
+old handler, which runs the query on the event loop, with the current one,
+which runs it in a worker thread. No Postgres or server process needed.
+
+Usage:
+    python benchmarks/bench_api_concurrency.py [--latency-ms 20] [--requests 200]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.endpoints import get_mentions, query_mentions
+from app.models import BrandMention, Prompt
+
+
+def build_session_factory(path: str, latency: float) -> sessionmaker:
+    """Create a seeded SQLite database whose queries take at least `latency` seconds."""
+    engine = create_engine(f"sqlite:///{path}", pool_size=64, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    db = factory()
+    prompt = Prompt(prompt_text="Best running shoes?", response_text="Nike and Hoka")
+    db.add(prompt)
+    db.flush()
+    db.add_all([
+        BrandMention(prompt_id=prompt.id, brand_name="nike", mention_count=2),
+        BrandMention(prompt_id=prompt.id, brand_name="hoka", mention_count=1),
+    ])
+    db.commit()
+    db.close()
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def simulate_network(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(latency)
+
+    return factory
+
+
+def build_app(factory: sessionmaker, offload: bool) -> FastAPI:
+    """Build an app serving /mentions either on the event loop or in worker threads."""
+    app = FastAPI()
+
+    def db_dependency():
+        db = factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    if offload:
+        @app.get("/mentions")
+        async def mentions(db=Depends(db_dependency)):
+            return await get_mentions(db)
+    else:
+        @app.get("/mentions")
+        async def mentions(db=Depends(db_dependency)):
+            return query_mentions(db)
+
+    return app
+
+
+async def run_load(app: FastAPI, concurrency: int, total: int):
+    """Send `total` requests with `concurrency` in flight; return (req/s, p50 ms, p99 ms)."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one_request():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get("/mentions")
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return total / elapsed, statistics.median(latencies) * 1000, p99 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API concurrency benchmark')
+    parser.add_argument('--latency-ms', type=float, default=20, help='Simulated database round-trip')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per concurrency level')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32],
+                        help='In-flight request counts to test')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        factory = build_session_factory(str(Path(tmp) / "bench.db"), args.latency_ms / 1000)
+        apps = {'event loop': build_app(factory, offload=False), 'worker threads': build_app(factory, offload=True)}
+
+        print(f"{'handler':<16}{'in-flight':>10}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        for name, app in apps.items():
+            for concurrency in args.concurrency:
+                rate, p50, p99 = asyncio.run(run_load(app, concurrency, args.requests))
+                print(f"{name:<16}{concurrency:>10}{rate:>10.1f}{p50:>10.1f}{p99:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
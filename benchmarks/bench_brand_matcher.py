@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: single-pass BrandMatcher vs. one regex scan per brand.
+
+Usage:
+    python benchmarks/bench_brand_matcher.py [--sizes 5 500 5000] [--repeat 20]
+"""
+import argparse
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scraper.brand_matcher import BrandMatcher
+from scraper.utils import BRANDS, create_brand_patterns
+
+FILLER_WORDS = (
+    "the best running shoes for daily training offer cushioning support and "
+    "durability while staying light enough for tempo runs and long races"
+).split()
+
+
+def make_brands(count: int, rng: random.Random) -> list:
+    """Real brands padded with synthetic one- and two-word brand names."""
+    brands = list(BRANDS[:count])
+    seen = set(brands)
+    while len(brands) < count:
+        words = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 9)))
+            for _ in range(rng.choice((1, 1, 1, 2)))
+        ]
+        brand = ' '.join(words)
+        if brand not in seen:
+            seen.add(brand)
+            brands.append(brand)
+    return brands
+
+
+def make_response(brands: list, rng: random.Random, words: int = 700) -> str:
+    """A ChatGPT-sized response with a sprinkling of brand mentions."""
+    tokens = []
+    for _ in range(words):
+        if rng.random() < 0.03:
+            brand = rng.choice(brands)
+            tokens.append(brand.title() if rng.random() < 0.5 else brand)
+        else:
+            tokens.append(rng.choice(FILLER_WORDS))
+    return ' '.join(tokens) + '.'
+
+
+def per_pattern_count(patterns: dict, text: str) -> dict:
+    """The original BrandAnalyzer loop: one findall per brand."""
+    return {brand: len(pattern.findall(text)) for brand, pattern in patterns.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BrandMatcher micro-benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 500, 5000], help='Brand counts to test')
+    parser.add_argument('--repeat', type=int, default=20, help='Responses scanned per measurement')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'brands':>7} {'per-pattern ms':>15} {'single-pass ms':>15} {'speedup':>8}")
+    for size in args.sizes:
+        brands = make_brands(size, rng)
+        text = make_response(brands, rng)
+        patterns = create_brand_patterns(brands)
+        matcher = BrandMatcher(brands)
+
+        assert per_pattern_count(patterns, text) == matcher.count(text), "matcher disagrees with per-pattern loop"
+
+        loop_s = min(timeit.repeat(lambda: per_pattern_count(patterns, text), number=args.repeat, repeat=3))
+        single_s = min(timeit.repeat(lambda: matcher.count(text), number=args.repeat, repeat=3))
+        loop_ms = loop_s / args.repeat * 1000
+        single_ms = single_s / args.repeat * 1000
+        print(f"{size:>7} {loop_ms:>15.3f} {single_ms:>15.3f} {loop_ms / single_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
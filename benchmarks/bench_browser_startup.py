@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: time from launch to a ready chat box, cold vs. warm.
+
+Runs one cold start on a fresh persistent profile, detaches while leaving
+the browser running, then attaches to it several times. Requires Chrome;
+point --url at a local fake page to avoid logging in to ChatGPT.
+
+Usage:
+    python benchmarks/bench_browser_startup.py [--url URL] [--warm-runs 3]
+"""
+import argparse
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scraper.browser_manager import BrowserManager
+from scraper.browser_pool import WarmBrowserManager, devtools_alive
+from scraper.utils import CHATGPT_URL
+
+
+def time_to_ready(manager: BrowserManager) -> float:
+    """Launch and navigate, returning the seconds until the chat box is ready."""
+    start = time.perf_counter()
+    manager.launch_browser()
+    manager.navigate_to_chatgpt()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Browser startup benchmark')
+    parser.add_argument('--url', type=str, default=CHATGPT_URL, help='Chat page to open')
+    parser.add_argument('--warm-runs', type=int, default=3, help='Number of warm attaches to time')
+    args = parser.parse_args()
+
+    profile_dir = tempfile.mkdtemp(prefix='scraper-profile-')
+    try:
+        baseline = BrowserManager(args.url)
+        baseline_s = time_to_ready(baseline)
+        baseline.close_browser()
+
+        cold = WarmBrowserManager(profile_dir, keep_warm=True, url=args.url)
+        cold_s = time_to_ready(cold)
+        cold.close_browser()
+
+        warm_times = []
+        for _ in range(args.warm_runs):
+            warm = WarmBrowserManager(profile_dir, keep_warm=True, url=args.url)
+            warm_times.append(time_to_ready(warm))
+            assert warm.attached, "expected to attach to the running browser"
+            warm.close_browser()
+
+        print(f"{'fresh browser (no profile)':<30}{baseline_s:>8.2f}s")
+        print(f"{'cold start (new profile)':<30}{cold_s:>8.2f}s")
+        print(f"{'warm start (attach), median':<30}{statistics.median(warm_times):>8.2f}s")
+    finally:
+        # Shut down the browser left running by the warm runs
+        cleanup = WarmBrowserManager(profile_dir, keep_warm=False, url=args.url)
+        session = cleanup._read_session()
+        if session and devtools_alive(session['port']):
+            cleanup.launch_browser()
+            cleanup.close_browser()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rows/second for storing prompt/response/mention records.
+
+Compares the old write path (one ORM object at a time, flush for the id,
+commit per prompt) with DatabaseManager.save_prompt_responses. Uses a
+throwaway SQLite file by default; pass --database-url to run against
+Postgres, where large batches go through COPY (add --no-copy to compare
+with multi-row INSERTs).
+
+The old path is slow enough that it is only timed on the first
+--legacy-max records of each size and reported as a rate.
+
+Usage:
+    python benchmarks/bench_bulk_ingest.py [--sizes 10000 1000000] [--database-url URL]
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import BrandMention, Prompt
+from scraper.data_processor import DatabaseManager
+
+BRANDS = ['nike', 'adidas', 'hoka', 'new balance', 'jordan']
+
+
+def make_records(count: int, seed: int = 0):
+    """Build synthetic records with one to three brand mentions each."""
+    rng = random.Random(seed)
+    for i in range(count):
+        mentions = {brand: rng.randint(1, 3) for brand in rng.sample(BRANDS, rng.randint(1, 3))}
+        yield {
+            'prompt': f"Benchmark prompt {i}: which running shoes are best?",
+            'response': "Runners often pick " + ", ".join(mentions) + " for daily training.",
+            'mentions': mentions,
+        }
+
+
+def legacy_save(db, record):
+    """The previous per-prompt write path."""
+    prompt = Prompt(prompt_text=record['prompt'], response_text=record['response'])
+    db.add(prompt)
+    db.flush()
+    for brand, count in record['mentions'].items():
+        db.add(BrandMention(prompt_id=prompt.id, brand_name=brand, mention_count=count))
+    db.commit()
+
+
+def reset(engine):
+    """Recreate the schema."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+
+
+def count_rows(factory) -> int:
+    db = factory()
+    try:
+        return db.execute(text("SELECT COUNT(*) FROM prompts")).scalar() + \
+            db.execute(text("SELECT COUNT(*) FROM brand_mentions")).scalar()
+    finally:
+        db.close()
+
+
+def time_legacy(engine, factory, count: int) -> float:
+    reset(engine)
+    db = factory()
+    start = time.perf_counter()
+    for record in make_records(count):
+        legacy_save(db, record)
+    elapsed = time.perf_counter() - start
+    db.close()
+    return count_rows(factory) / elapsed
+
+
+def time_bulk(engine, factory, count: int, batch_size: int, use_copy) -> float:
+    reset(engine)
+    manager = DatabaseManager(factory())
+    records = make_records(count)
+    start = time.perf_counter()
+    while True:
+        batch = [record for _, record in zip(range(batch_size), records)]
+        if not batch:
+            break
+        manager.save_prompt_responses(batch, use_copy=use_copy)
+    elapsed = time.perf_counter() - start
+    manager.close()
+    return count_rows(factory) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk ingestion benchmark')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 1000000], help='Records per run')
+    parser.add_argument('--batch-size', type=int, default=50000, help='Records per save_prompt_responses call')
+    parser.add_argument('--legacy-max', type=int, default=10000, help='Records timed with the old path')
+    parser.add_argument('--database-url', type=str, default=None, help='Database to use (default: temp SQLite)')
+    parser.add_argument('--no-copy', action='store_true', help='Use INSERTs on Postgres instead of COPY')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.database_url or f"sqlite:///{Path(tmp) / 'bench.db'}"
+        engine = create_engine(url)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        use_copy = False if args.no_copy else None
+
+        print(f"{'records':>10}{'old rows/s':>14}{'bulk rows/s':>14}{'speedup':>10}")
+        for size in args.sizes:
+            legacy = time_legacy(engine, factory, min(size, args.legacy_max))
+            bulk = time_bulk(engine, factory, size, args.batch_size, use_copy)
+            print(f"{size:>10}{legacy:>14,.0f}{bulk:>14,.0f}{bulk / legacy:>9.1f}x")
+
+        Base.metadata.drop_all(bind=engine)
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Cost model (not a browser measurement): per-prompt lookup overhead over a
+long run, with and without conversation recycling.
+
+No browser is involved. Every prompt appends a conversation turn to an
+in-memory list standing in for the DOM, and each response lookup scans the
+whole list, on the assumption that the page's ``querySelectorAll`` cost
+grows with the DOM. The real BrowserManager recycling logic and
+ResponseExtractor lookups run against it, so the output shows how the
+recycling thresholds bound a cost that grows with the conversation. It
+does not show how much ChatGPT's page really slows down; for timings in a
+real browser, run bench_end_to_end.py against the fake ChatGPT server.
+
+Usage:
+    python benchmarks/bench_conversation_recycling.py [--prompts 500] [--polls 10]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from scraper.browser_manager import BrowserManager
+from scraper.page_scripts import DOM_SIZE, LATEST_RESPONSE
+from scraper.response_handler import ResponseExtractor
+
+PAGE_NODES = 1500  # Sidebar, header and composer
+NODES_PER_TURN = 400  # Markdown, code blocks and action buttons of one exchange
+
+
+class SimulatedDriver:
+    """In-memory model of the page whose lookup cost grows with its size."""
+
+    def __init__(self):
+        self.nodes = []
+        # The only scripts BrowserManager and ResponseExtractor run here
+        self.scripts = {LATEST_RESPONSE: self._latest_response, DOM_SIZE: self._dom_size}
+
+    def get(self, url):
+        self.nodes = [None] * PAGE_NODES
+
+    def find_element(self, by, value):
+        if by == By.ID:
+            return object()
+        raise NoSuchElementException(value)
+
+    def add_turn(self, text):
+        self.nodes.append('user')
+        self.nodes.append(('assistant', text))
+        self.nodes.extend([None] * (NODES_PER_TURN - 2))
+
+    def execute_script(self, script, *args):
+        return self.scripts[script](*args)
+
+    def _latest_response(self, response_selector, stop_selector):
+        messages = [node for node in self.nodes if type(node) is tuple]
+        text = messages[-1][1] if messages else ''
+        return {'count': len(messages), 'text': text, 'length': len(text), 'generating': False, 'done': True}
+
+    def _dom_size(self):
+        return len(self.nodes)
+
+
+def run(prompts: int, polls: int, new_chat_every: int, max_dom_nodes: int) -> list:
+    """Return per-prompt overhead in milliseconds."""
+    manager = BrowserManager('http://fake', new_chat_every, max_dom_nodes)
+    manager.driver = SimulatedDriver()
+    manager.driver.get(manager.url)
+    extractor = ResponseExtractor(manager.driver)
+
+    timings = []
+    for i in range(prompts):
+        manager.driver.add_turn(f"Answer {i}: Nike and Hoka lead the running category this season.")
+        start = time.perf_counter()
+        for _ in range(polls):
+            extractor.fetch_latest()
+        extractor.extract_response()
+        manager.recycle_conversation_if_needed()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cost model of conversation recycling (no browser)')
+    parser.add_argument('--prompts', type=int, default=500, help='Prompts per run')
+    parser.add_argument('--polls', type=int, default=10, help='Completion polls per prompt')
+    args = parser.parse_args()
+
+    windows = [(0, 50), (args.prompts // 2 - 25, args.prompts // 2 + 25), (args.prompts - 50, args.prompts)]
+    configs = [
+        ('single conversation', 0, 0),
+        ('new chat every 20 prompts', 20, 0),
+        ('new chat at 10k DOM nodes', 0, 10000),
+    ]
+
+    header = ''.join(f"{f'prompts {lo + 1}-{hi}':>16}" for lo, hi in windows)
+    print(f"{'modelled mean ms per prompt':<28}{header}")
+    for name, every, nodes in configs:
+        timings = run(args.prompts, args.polls, every, nodes)
+        means = ''.join(f"{statistics.mean(timings[lo:hi]):>16.3f}" for lo, hi in windows)
+        print(f"{name:<28}{means}")
+
+
+if __name__ == "__main__":
+    main()
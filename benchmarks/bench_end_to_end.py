@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the whole scraper against the local fake ChatGPT server.
+
+Starts benchmarks/fake_chatgpt.py in-process and runs ChatGPTScraper over a
+set of generated prompts once per configuration (workers x tabs x page
+mode). Real browsers, PromptSender, ResponseExtractor, the processing
+pipeline and the ledger all run as in production; only the database is a
+throwaway SQLite file. For each configuration it reports prompts/min,
+p50/p95 of the main stages, browser memory and the requests the fake server
+saw. Requires Chrome.
+
+Usage:
+    python benchmarks/bench_end_to_end.py [--prompts 30] [--workers 1 2] [--tabs 1 3] [--modes full lean]
+                                          [--tokens-per-second 50] [--answer-tokens 120] [--popup-every 0]
+                                          [--json results.json]
+"""
+import argparse
+import itertools
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.models  # noqa: F401  (registers the tables on Base)
+from benchmarks.fake_chatgpt import FakeChatGPT, FakeChatGPTServer
+from scraper.chatgpt_scraper import ChatGPTScraper
+
+# Stages shown in the table, ones that both single-tab and multi-tab workers
+# record; every stage is in the --json output
+REPORTED_STAGES = ['prompt', 'type_prompt', 'extract_response', 'db_write']
+
+TOPICS = ['marathon training', 'trail running', 'flat feet', 'wide feet', 'beginners', 'track workouts',
+          'winter running', 'recovery days', 'heavy runners', 'race day']
+
+
+class LocalScraper(ChatGPTScraper):
+    """ChatGPTScraper that stores its results in a local SQLite file instead of Postgres."""
+
+    def __init__(self, database_path: str, **kwargs):
+        self.database_path = database_path
+        super().__init__(password='', **kwargs)
+
+    def _create_session_factory(self):
+        engine = create_engine(f"sqlite:///{self.database_path}", connect_args={'check_same_thread': False})
+        Base.metadata.create_all(bind=engine)
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def run_configuration(server: FakeChatGPTServer, prompts, workers: int, tabs: int, lean: bool,
+                      delay: float, database_path: str) -> dict:
+    """Scrape the prompts with one configuration and summarize the run."""
+    server.app.reset_stats()
+    scraper = LocalScraper(database_path, url=server.url, workers=workers, tabs=tabs, lean=lean,
+                           delay=delay, min_delay=delay)
+    start = time.perf_counter()
+    try:
+        scraper.process_prompts(prompts)
+    finally:
+        scraper.close()
+    elapsed = time.perf_counter() - start
+
+    summary = scraper.metrics.summary()
+    with server.app.lock:
+        requests = dict(server.app.stats)
+    return {
+        'workers': workers,
+        'tabs': tabs,
+        'mode': 'lean' if lean else 'full',
+        'elapsed_seconds': round(elapsed, 2),
+        'prompts': summary['prompts'],
+        'failures': summary['failures'],
+        'retries': summary['retries'],
+        'prompts_per_minute': round(summary['prompts'] * 60 / elapsed, 1),
+        'stages': summary['stages'],
+        'browser_rss_mb': summary['readings'].get('browser_rss_mb'),
+        'server_requests': requests,
+    }
+
+
+def print_table(results):
+    stage_columns = "".join(f"{stage + ' p50/p95 (s)':>34}" for stage in REPORTED_STAGES)
+    print(f"{'workers':>8}{'tabs':>6}{'mode':>6}{'prompts/min':>13}{'failed':>8}{stage_columns}"
+          f"{'RSS p50/max (MB)':>18}{'assets':>8}")
+    for result in results:
+        stages = ""
+        for stage in REPORTED_STAGES:
+            stats = result['stages'].get(stage)
+            stages += f"{stats['p50']:>24.2f}/{stats['p95']:<9.2f}" if stats else f"{'-':>34}"
+        rss = result['browser_rss_mb']
+        memory = f"{rss['p50']:>11.0f}/{rss['max']:<6.0f}" if rss else f"{'-':>18}"
+        requests = result['server_requests']
+        assets = sum(requests.get(kind, 0) for kind in ('image_requests', 'font_requests', 'analytics_requests'))
+        print(f"{result['workers']:>8}{result['tabs']:>6}{result['mode']:>6}{result['prompts_per_minute']:>13.1f}"
+              f"{result['failures']:>8}{stages}{memory}{assets:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End-to-end scraper benchmark against a fake ChatGPT')
+    parser.add_argument('--prompts', type=int, default=30, help='Prompts per configuration')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2], help='Worker counts to run')
+    parser.add_argument('--tabs', type=int, nargs='+', default=[1, 3], help='Tabs per browser to run')
+    parser.add_argument('--modes', nargs='+', choices=['full', 'lean'], default=['full', 'lean'],
+                        help='Page modes to run')
+    parser.add_argument('--delay', type=float, default=0, help='Pacing delay between prompts per worker')
+    parser.add_argument('--tokens-per-second', type=float, default=50, help='Answer streaming rate')
+    parser.add_argument('--answer-tokens', type=int, default=120, help='Words per answer')
+    parser.add_argument('--first-token-delay', type=float, default=0.3, help='Seconds before the first token')
+    parser.add_argument('--popup-every', type=int, default=0,
+                        help='Show the "Stay logged out" popup after every N answers (0 disables)')
+    parser.add_argument('--json', type=str, help='File to write every configuration\'s full results to')
+    args = parser.parse_args()
+
+    fake = FakeChatGPT(args.tokens_per_second, args.answer_tokens, args.first_token_delay, args.popup_every)
+    results = []
+    with FakeChatGPTServer(fake) as server, tempfile.TemporaryDirectory(prefix='scraper-bench-') as tmp_dir:
+        configurations = itertools.product(args.workers, args.tabs, args.modes)
+        for run, (workers, tabs, mode) in enumerate(configurations, 1):
+            # Fresh prompts per run, so no configuration reuses another's answers
+            prompts = [f"Which running shoes are best for {TOPICS[i % len(TOPICS)]}? (run {run}, #{i})"
+                       for i in range(args.prompts)]
+            results.append(run_configuration(server, prompts, workers, tabs, mode == 'lean', args.delay,
+                                             str(Path(tmp_dir) / f"run-{run}.db")))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
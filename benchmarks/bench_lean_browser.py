@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Benchmark: page-ready time and per-session memory with lean mode off and on.
+
+Launches several browser sessions in each mode, times each one from launch
+to a ready chat box, lets the page settle and then measures the resident
+memory of the session's chromedriver and Chrome processes. Requires Chrome
+on Linux; point --url at a local fake page to avoid logging in to ChatGPT.
+
+Usage:
+    python benchmarks/bench_lean_browser.py [--url URL] [--sessions 3] [--settle 5]
+"""
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from scraper.browser_manager import BrowserManager
+from scraper.utils import CHATGPT_URL
+
+
+def measure(url: str, lean: bool, settle: float):
+    """Return (seconds to a ready chat box, RSS in MB) for one session."""
+    manager = BrowserManager(url, lean=lean)
+    try:
+        start = time.perf_counter()
+        manager.launch_browser()
+        manager.navigate_to_chatgpt()
+        ready = time.perf_counter() - start
+        time.sleep(settle)
+        rss = manager.browser_rss()
+        return ready, (rss or 0) / 2**20
+    finally:
+        manager.close_browser()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lean page mode benchmark')
+    parser.add_argument('--url', type=str, default=CHATGPT_URL, help='Chat page to open')
+    parser.add_argument('--sessions', type=int, default=3, help='Sessions measured per mode')
+    parser.add_argument('--settle', type=float, default=5.0, help='Seconds to let the page settle before measuring RSS')
+    args = parser.parse_args()
+
+    print(f"{'mode':<8}{'ready p50 (s)':>15}{'RSS p50 (MB)':>15}{'RSS max (MB)':>15}")
+    for lean in (False, True):
+        samples = [measure(args.url, lean, args.settle) for _ in range(args.sessions)]
+        ready = [s for s, _ in samples]
+        rss = [m for _, m in samples]
+        print(f"{'lean' if lean else 'full':<8}{statistics.median(ready):>15.2f}"
+              f"{statistics.median(rss):>15.0f}{max(rss):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
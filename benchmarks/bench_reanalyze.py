@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: re-analysis throughput with one process vs. a process pool.
+
+Seeds a throwaway SQLite database with synthetic responses, then re-runs
+brand matching over all of them with a larger brand list, once inline and
+once per worker count.
+
+Usage:
+    python benchmarks/bench_reanalyze.py [--records 200000] [--brands 500] [--workers 1 4]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from scraper.data_processor import DatabaseManager
+from scraper.reanalysis import Reanalyzer
+from scraper.utils import BRANDS
+
+WORDS = "the best shoes for running trail road daily training comfort cushioning support speed".split()
+
+
+def make_brands(count: int):
+    """The real brand list padded with synthetic multi-word brands."""
+    return BRANDS + [f"brand{i} {WORDS[i % len(WORDS)]}" for i in range(max(0, count - len(BRANDS)))]
+
+
+def seed(factory, records: int, brands, seed_value: int = 0):
+    rng = random.Random(seed_value)
+    manager = DatabaseManager(factory())
+    batch = []
+    for i in range(records):
+        words = rng.choices(WORDS, k=150) + rng.sample(brands, 5)
+        rng.shuffle(words)
+        batch.append({'prompt': f"prompt {i}", 'response': " ".join(words), 'mentions': {}})
+        if len(batch) == 20000:
+            manager.save_prompt_responses(batch)
+            batch = []
+    manager.save_prompt_responses(batch)
+    manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-analysis benchmark')
+    parser.add_argument('--records', type=int, default=200000, help='Stored responses to re-analyze')
+    parser.add_argument('--brands', type=int, default=500, help='Brands to match')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, os.cpu_count() or 1],
+                        help='Worker process counts to compare')
+    parser.add_argument('--chunk-size', type=int, default=2000, help='Prompts per task')
+    args = parser.parse_args()
+
+    brands = make_brands(args.brands)
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        seed(factory, args.records, brands)
+
+        print(f"{'workers':>8}{'seconds':>10}{'prompts/s':>12}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            Reanalyzer(factory, brands=brands, workers=workers, chunk_size=args.chunk_size).run()
+            elapsed = time.perf_counter() - start
+            print(f"{workers:>8}{elapsed:>10.1f}{args.records / elapsed:>12,.0f}")
+
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
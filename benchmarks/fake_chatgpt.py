@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+A local stand-in for the ChatGPT web app, for benchmarks and offline runs.
+
+Serves a chat page with the elements the scraper drives (``#prompt-textarea``,
+``[data-message-author-role="assistant"]`` messages and the stop button) and
+streams canned answers from a POST endpoint at a configurable token rate, the
+way the real page fills in an answer. It can show the "Stay logged out"
+popup every N prompts, and the page also loads an image, a font and an
+analytics script, so lean mode has something to block. Counters of prompts,
+page loads and asset requests are served as JSON from /stats.
+
+Usage:
+    python benchmarks/fake_chatgpt.py [--port 8765] [--tokens-per-second 50] [--answer-tokens 120]
+                                      [--first-token-delay 0.3] [--popup-every 0] [--answers FILE]
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+# Sentences canned answers are built from; they mention the tracked brands
+ANSWER_SENTENCES = [
+    "Nike Pegasus is a dependable daily trainer for most runners.",
+    "Hoka Clifton offers plenty of cushioning for long easy miles.",
+    "Adidas Adizero shoes are light and fast on race day.",
+    "New Balance makes the 1080, a soft and stable everyday shoe.",
+    "Jordan sneakers are built for the court rather than the road.",
+    "Fit matters more than the brand, so try shoes on late in the day.",
+    "Rotate two pairs if you run more than four times a week.",
+    "Replace running shoes after roughly 500 to 800 kilometres.",
+]
+
+ASSET_SIZE = 256 * 1024  # Bytes served for the page's image and font
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>ChatGPT (fake)</title>
+<style>
+@font-face { font-family: Sans; src: url("/static/sans.woff2") format("woff2"); }
+body { font-family: Sans, sans-serif; margin: 0; }
+main { max-width: 48rem; margin: 0 auto; padding: 1rem; }
+#popup { position: fixed; inset: 0; background: rgba(0, 0, 0, 0.5); display: none; }
+#popup div { background: #fff; margin: 20vh auto; padding: 2rem; width: 20rem; }
+</style>
+<script src="/cdn.segment.com/analytics.js"></script>
+</head>
+<body>
+<main>
+<img src="/static/hero.png" alt="" width="1" height="1">
+<div id="thread"></div>
+<form id="composer">
+<textarea id="prompt-textarea" rows="3"></textarea>
+<span id="controls"></span>
+</form>
+</main>
+<div id="popup"><div><p>Thanks for trying ChatGPT</p><a href="#" id="stay-logged-out">Stay logged out</a></div></div>
+<script>
+const CONFIG = __CONFIG__;
+const input = document.getElementById('prompt-textarea');
+const thread = document.getElementById('thread');
+const controls = document.getElementById('controls');
+const popup = document.getElementById('popup');
+let answered = 0;
+
+function showPopup(visible) {
+    popup.style.display = visible ? 'block' : 'none';
+    input.disabled = visible;
+}
+
+document.getElementById('stay-logged-out').addEventListener('click', function (event) {
+    event.preventDefault();
+    showPopup(false);
+});
+
+function addMessage(role, text) {
+    const message = document.createElement('div');
+    message.setAttribute('data-message-author-role', role);
+    const body = document.createElement('div');
+    body.className = 'markdown';
+    body.textContent = text;
+    message.appendChild(body);
+    thread.appendChild(message);
+    return body;
+}
+
+async function send(prompt) {
+    addMessage('user', prompt);
+    const body = addMessage('assistant', '');
+    const stop = document.createElement('button');
+    stop.setAttribute('data-testid', 'stop-button');
+    stop.type = 'button';
+    stop.textContent = 'Stop';
+    controls.appendChild(stop);
+    try {
+        const response = await fetch('/backend-api/conversation', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({prompt: prompt}),
+        });
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const {value, done} = await reader.read();
+            if (done) {
+                break;
+            }
+            buffer += decoder.decode(value, {stream: true});
+            const events = buffer.split('\\n\\n');
+            buffer = events.pop();
+            for (const event of events) {
+                const data = event.replace(/^data: /, '');
+                if (data !== '[DONE]') {
+                    body.textContent += JSON.parse(data).text;
+                }
+            }
+        }
+    } finally {
+        stop.remove();
+    }
+    answered += 1;
+    if (CONFIG.popupEvery && answered % CONFIG.popupEvery === 0) {
+        showPopup(true);
+    }
+}
+
+input.addEventListener('keydown', function (event) {
+    if (event.key === 'Enter' && !event.shiftKey) {
+        event.preventDefault();
+        const prompt = input.value.trim();
+        input.value = '';
+        if (prompt) {
+            send(prompt);
+        }
+    }
+});
+</script>
+</body>
+</html>
+"""
+
+
+class FakeChatGPT:
+    """Answers and counters shared by all request handlers of one server."""
+
+    def __init__(self, tokens_per_second: float = 50, answer_tokens: int = 120,
+                 first_token_delay: float = 0.3, popup_every: int = 0, answers: Optional[List[str]] = None):
+        """
+        Initialize the fake app.
+
+        Args:
+            tokens_per_second: Streaming rate of answers (0 sends each answer at once)
+            answer_tokens: Words per generated answer
+            first_token_delay: Seconds before the first token is sent
+            popup_every: Show the "Stay logged out" popup after every N answers in a page (0 disables)
+            answers: Canned answers to use instead of generated ones
+        """
+        self.tokens_per_second = tokens_per_second
+        self.answer_tokens = answer_tokens
+        self.first_token_delay = first_token_delay
+        self.popup_every = popup_every
+        self.answers = answers
+        self.stats: Counter = Counter()
+        self.lock = threading.Lock()
+
+    def count(self, name: str):
+        with self.lock:
+            self.stats[name] += 1
+
+    def reset_stats(self):
+        with self.lock:
+            self.stats.clear()
+
+    def answer(self, prompt: str) -> str:
+        """The answer to a prompt; the same prompt always gets the same answer."""
+        seed = int(hashlib.sha1(prompt.encode('utf-8')).hexdigest(), 16)
+        if self.answers:
+            return self.answers[seed % len(self.answers)]
+        words = []
+        sentence = seed % len(ANSWER_SENTENCES)
+        while len(words) < self.answer_tokens:
+            words += ANSWER_SENTENCES[sentence % len(ANSWER_SENTENCES)].split()
+            sentence += 1
+        return " ".join(words[:self.answer_tokens])
+
+    def page(self) -> bytes:
+        config = json.dumps({'popupEvery': self.popup_every})
+        return PAGE.replace('__CONFIG__', config).encode('utf-8')
+
+
+class FakeChatGPTHandler(BaseHTTPRequestHandler):
+    """Serves the chat page, its assets and the streaming answer endpoint."""
+
+    protocol_version = 'HTTP/1.0'  # The end of a streamed answer is the end of the connection
+
+    @property
+    def app(self) -> FakeChatGPT:
+        return self.server.app
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split('?', 1)[0]
+        if path == '/stats':
+            with self.app.lock:
+                self._send(200, 'application/json', json.dumps(dict(self.app.stats)).encode('utf-8'))
+        elif path.endswith('.png'):
+            self.app.count('image_requests')
+            self._send(200, 'image/png', b'\0' * ASSET_SIZE)
+        elif path.endswith('.woff2'):
+            self.app.count('font_requests')
+            self._send(200, 'font/woff2', b'\0' * ASSET_SIZE)
+        elif path.startswith('/cdn.segment.com/'):
+            self.app.count('analytics_requests')
+            self._send(200, 'application/javascript', b'window.analytics = {};')
+        elif path == '/' or path.startswith('/c/'):
+            self.app.count('page_loads')
+            self._send(200, 'text/html; charset=utf-8', self.app.page())
+        else:
+            self._send(404, 'text/plain', b'not found')
+
+    def do_POST(self):
+        if self.path != '/backend-api/conversation':
+            self._send(404, 'text/plain', b'not found')
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        prompt = json.loads(self.rfile.read(length) or b'{}').get('prompt', '')
+        self.app.count('prompts')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            self._stream(self.app.answer(prompt).split(' '))
+        except (BrokenPipeError, ConnectionResetError):
+            self.app.count('aborted_streams')
+
+    def _stream(self, tokens: List[str]):
+        """Send tokens as server-sent events, paced to the configured rate."""
+        time.sleep(self.app.first_token_delay)
+        rate = self.app.tokens_per_second
+        start = time.monotonic()
+        sent = 0
+        while sent < len(tokens):
+            due = len(tokens) if not rate else min(len(tokens), int((time.monotonic() - start) * rate) + 1)
+            for i in range(sent, due):
+                text = tokens[i] if i == 0 else " " + tokens[i]
+                self.wfile.write(f"data: {json.dumps({'text': text})}\n\n".encode('utf-8'))
+            self.wfile.flush()
+            sent = due
+            if sent < len(tokens):
+                time.sleep(min(0.05, 1 / rate))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _send(self, status: int, content_type: str, body: bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FakeChatGPTServer:
+    """Runs the fake app on a background thread."""
+
+    def __init__(self, app: Optional[FakeChatGPT] = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            app: The fake app to serve, with default settings if omitted
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+        """
+        self.app = app or FakeChatGPT()
+        self.httpd = ThreadingHTTPServer((host, port), FakeChatGPTHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.app = self.app
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> 'FakeChatGPTServer':
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='fake-chatgpt', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> 'FakeChatGPTServer':
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local fake ChatGPT server')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--tokens-per-second', type=float, default=50, help='Answer streaming rate (0 for instant)')
+    parser.add_argument('--answer-tokens', type=int, default=120, help='Words per generated answer')
+    parser.add_argument('--first-token-delay', type=float, default=0.3, help='Seconds before the first token')
+    parser.add_argument('--popup-every', type=int, default=0,
+                        help='Show the "Stay logged out" popup after every N answers (0 disables)')
+    parser.add_argument('--answers', type=str, help='JSON file with a list of canned answers')
+    args = parser.parse_args()
+
+    answers = None
+    if args.answers:
+        with open(args.answers, encoding='utf-8') as f:
+            answers = json.load(f)
+    app = FakeChatGPT(args.tokens_per_second, args.answer_tokens, args.first_token_delay,
+                      args.popup_every, answers)
+    server = FakeChatGPTServer(app, args.host, args.port)
+    print(f"Fake ChatGPT listening on {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -32,10 +32,20 @@ DB_HOST = os.environ.get("DB_HOST", "localhost")
 DB_PORT = os.environ.get("DB_PORT", "5432")
 DB_NAME = os.environ.get("DB_NAME", "brand_mentions")
 
+# Connection Pool Configuration
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# Threads the API may use for database queries at once (defaults to the pool's capacity)
+DB_THREAD_LIMIT = int(os.environ.get("DB_THREAD_LIMIT", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
 # API Configuration
 API_HOST = os.environ.get("API_HOST", "0.0.0.0")
 API_PORT = int(os.environ.get("API_PORT", "8000"))
 DEBUG = os.environ.get("DEBUG", "false").lower() == "true"
+TIMESERIES_DEFAULT_DAYS = int(os.environ.get("TIMESERIES_DEFAULT_DAYS", "30"))
 
 # Scraping Configuration
 SCRAPING_DELAY = int(os.environ.get("SCRAPING_DELAY", "3"))
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+Brand Mentions Re-analysis - Entry Point
+
+Recomputes brand mentions for responses already stored in the database,
+e.g. after the brand list or matching rules change, without re-scraping.
+
+Usage:
+    python reanalyze.py --db-password <db_password> [--workers N] [--start-id ID] [--end-id ID]
+
+Example:
+    python reanalyze.py --db-password mypassword --brands "nike,adidas,hoka,on running"
+"""
+
+from scraper.reanalysis import main
+
+if __name__ == "__main__":
+    main()
@@ -7,8 +7,10 @@ from .browser_manager import BrowserManager
 from .response_handler import ResponseHandler
 from .data_processor import DataProcessor
 from .brand_analyzer import BrandAnalyzer
+from .brand_matcher import BrandMatcher
 from .prompt_sender import PromptSender
 from .retry_handler import RetryHandler
+from .worker_pool import ScraperWorker, WorkerPool
 
 __all__ = [
     'main', 
@@ -17,6 +19,9 @@ __all__ = [
     'ResponseHandler', 
     'DataProcessor',
     'BrandAnalyzer',
+    'BrandMatcher',
     'PromptSender',
-    'RetryHandler'
+    'RetryHandler',
+    'ScraperWorker',
+    'WorkerPool'
 ] 
\ No newline at end of file
@@ -2,9 +2,10 @@
 Brand mention analysis and extraction.
 """
 import logging
-from typing import Dict
+from typing import Dict, List, Optional
 
-from .utils import BRANDS, create_brand_patterns
+from .brand_matcher import BrandMatcher
+from .utils import BRANDS
 
 logger = logging.getLogger(__name__)
 
@@ -12,13 +13,19 @@ logger = logging.getLogger(__name__)
 class BrandAnalyzer:
     """Handles brand mention extraction and analysis."""
     
-    def __init__(self):
-        """Initialize brand analyzer."""
-        self.brand_patterns = create_brand_patterns()
+    def __init__(self, brands: Optional[List[str]] = None):
+        """
+        Initialize brand analyzer.
+        
+        Args:
+            brands: Brands to track, defaults to BRANDS
+        """
+        self.brands = list(brands) if brands is not None else list(BRANDS)
+        self.brand_matcher = BrandMatcher(self.brands)
     
     def extract_brand_mentions(self, text: str) -> Dict[str, int]:
         """
-        Extract brand mentions from text using regex patterns.
+        Extract brand mentions from text in a single pass.
         
         Args:
             text: Text to analyze for brand mentions
@@ -26,13 +33,7 @@ class BrandAnalyzer:
         Returns:
             Dictionary with brand names and mention counts
         """
-        mentions = {brand: 0 for brand in BRANDS}
-        
-        for brand, pattern in self.brand_patterns.items():
-            matches = pattern.findall(text)
-            mentions[brand] = len(matches)
-            
-        return mentions
+        return self.brand_matcher.count(text)
     
     def log_mentions(self, mentions: Dict[str, int]):
         """
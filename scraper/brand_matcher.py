@@ -0,0 +1,109 @@
+"""
+Single-pass multi-brand matching.
+"""
+import re
+from typing import Dict, List, Tuple
+
+
+class BrandMatcher:
+    """
+    Counts mentions of many brands in a single scan of the text.
+
+    All brands are compiled into one regex whose alternation is laid out as a
+    prefix trie, so the regex engine only tries the brands that share the
+    characters already read. Every brand ends in an empty named group, which
+    lets ``match.lastgroup`` identify the brand without any per-brand scan.
+
+    Matching keeps the semantics of the per-brand ``\\b<brand>\\b`` patterns
+    from ``create_brand_patterns``: case-insensitive, whole words only, and
+    multi-word brands such as "new balance" match the exact phrase. The trie
+    sits in a lookahead, so it is tried at every word start without consuming
+    text: brands that overlap ("nike air" and "air jordan") or contain one
+    another ("air jordan" and "jordan") are all found. The longest brand at a
+    position also credits the shorter brands it starts with, and each brand's
+    own matches are kept non-overlapping, as separate patterns would.
+    """
+
+    def __init__(self, brands: List[str]):
+        """Build the combined pattern for the given brands."""
+        self.brands = list(brands)
+        self._group_brands: Dict[str, List[str]] = {}
+        # Brands, with their lengths, credited when a group matches at a position
+        self._at_start: Dict[str, List[Tuple[str, int]]] = {}
+
+        trie: Dict = {}
+        for brand in self.brands:
+            key = brand.lower()
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            group = node.get('')
+            if group is None:
+                group = f'b{len(self._group_brands)}'
+                node[''] = group
+                self._group_brands[group] = []
+            if brand not in self._group_brands[group]:
+                self._group_brands[group].append(brand)
+
+        self.pattern = re.compile(
+            rf'\b(?=(?:{self._trie_to_regex(trie)})\b)', re.IGNORECASE
+        ) if self.brands else None
+
+        # A match is the longest brand starting at a position; shorter brands
+        # that are a leading run of whole words of it match there too
+        by_key = {owners[0].lower(): owners for owners in self._group_brands.values()}
+        for group, owners in self._group_brands.items():
+            phrase = owners[0].lower()
+            at_start = [(brand, len(phrase)) for brand in owners]
+            for bound in (m.start() for m in re.finditer(r'\b', phrase)):
+                if 0 < bound < len(phrase) and phrase[:bound] in by_key:
+                    at_start += [(brand, bound) for brand in by_key[phrase[:bound]]]
+            self._at_start[group] = at_start
+
+    @staticmethod
+    def _trie_to_regex(node: Dict) -> str:
+        """Render a trie node as a regex alternation, longest branches first."""
+        branches = []
+        for char in sorted(k for k in node if k):
+            branches.append(re.escape(char) + BrandMatcher._trie_to_regex_tail(node[char]))
+        if '' in node:
+            # Terminal marker last so longer brands are preferred
+            branches.append(f'(?P<{node[""]}>)')
+        return '|'.join(branches)
+
+    @staticmethod
+    def _trie_to_regex_tail(node: Dict) -> str:
+        """Render the part of the pattern that follows a trie edge."""
+        # Collapse single-child chains into a plain literal run
+        literal = ''
+        while len(node) == 1 and '' not in node:
+            (char, node), = node.items()
+            literal += re.escape(char)
+        if len(node) == 1:
+            return f'{literal}(?P<{node[""]}>)'
+        return f'{literal}(?:{BrandMatcher._trie_to_regex(node)})'
+
+    def count(self, text: str) -> Dict[str, int]:
+        """
+        Count mentions of every brand in one pass over the text.
+
+        Args:
+            text: Text to analyze for brand mentions
+
+        Returns:
+            Dictionary with brand names and mention counts
+        """
+        mentions = {brand: 0 for brand in self.brands}
+        if self.pattern is None or not text:
+            return mentions
+
+        # End of each brand's last counted match, so a brand never overlaps itself
+        last_end: Dict[str, int] = {}
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            for brand, length in self._at_start[match.lastgroup]:
+                if start >= last_end.get(brand, 0):
+                    mentions[brand] += 1
+                    last_end[brand] = start + length
+
+        return mentions
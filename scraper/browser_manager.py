@@ -3,13 +3,19 @@ Browser management for ChatGPT scraper.
 """
 import time
 import logging
+from typing import Iterable, List, Optional
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
 
 import undetected_chromedriver as uc
-from .utils import CHATGPT_URL, BROWSER_OPTIONS
+from .lean_page import block_requests, blocked_url_patterns, process_tree_rss
+from .page_scripts import DOM_SIZE
+from .utils import (
+    CHATGPT_URL, BROWSER_OPTIONS, LEAN_BROWSER_OPTIONS, MULTI_TAB_BROWSER_OPTIONS, CONVERSATION_MAX_PROMPTS,
+    CONVERSATION_MAX_DOM_NODES
+)
 
 logger = logging.getLogger(__name__)
 
@@ -17,18 +23,52 @@ logger = logging.getLogger(__name__)
 class BrowserManager:
     """Manages browser setup and navigation for ChatGPT scraping."""
     
-    def __init__(self):
-        """Initialize browser manager."""
+    def __init__(self, url: str = CHATGPT_URL, max_conversation_prompts: int = CONVERSATION_MAX_PROMPTS,
+                 max_conversation_nodes: int = CONVERSATION_MAX_DOM_NODES, lean: bool = False,
+                 lean_allow: Iterable[str] = (), tabs: int = 1):
+        """
+        Initialize browser manager.
+        
+        Args:
+            url: ChatGPT URL to open (a local fake page can be used for testing)
+            max_conversation_prompts: Prompts per conversation before starting a new chat (0 disables)
+            max_conversation_nodes: DOM size that triggers a new chat (0 disables)
+            lean: Block non-essential requests and use memory-saving Chrome flags
+            lean_allow: Resource types or URL patterns lean mode should still load
+            tabs: ChatGPT tabs the browser will run side by side
+        """
+        self.url = url
+        self.max_conversation_prompts = max_conversation_prompts
+        self.max_conversation_nodes = max_conversation_nodes
+        self.conversation_prompts = 0
+        self.lean = lean
+        self.lean_allow = list(lean_allow)
+        self.tabs = tabs
+        self.blocked_urls = blocked_url_patterns(allow=lean_allow) if lean else []
         self.driver = None
     
-    def launch_browser(self):
-        """Launch undetected-chromedriver browser."""
-        logger.info("Launching undetected-chromedriver...")
+    def _build_options(self) -> uc.ChromeOptions:
+        """Build Chrome options for a new browser."""
         options = uc.ChromeOptions()
         
         # Add basic options for undetection
         for option in BROWSER_OPTIONS:
             options.add_argument(option)
+        if self.lean:
+            for option in LEAN_BROWSER_OPTIONS:
+                # The renderer also skips images unless they are allowed
+                if option.startswith('--blink-settings=imagesEnabled') and 'image' in self.lean_allow:
+                    continue
+                options.add_argument(option)
+        if self.tabs > 1:
+            for option in MULTI_TAB_BROWSER_OPTIONS:
+                options.add_argument(option)
+        return options
+    
+    def launch_browser(self):
+        """Launch undetected-chromedriver browser."""
+        logger.info("Launching undetected-chromedriver...")
+        options = self._build_options()
         
         try:
             self.driver = uc.Chrome(options=options)
@@ -36,15 +76,37 @@ class BrowserManager:
         except Exception as e:
             logger.error(f"Failed to launch browser: {e}")
             raise
+        self.apply_lean_mode()
+    
+    def apply_lean_mode(self):
+        """Start blocking non-essential requests in the current tab (lean mode only)."""
+        if self.lean and self.blocked_urls:
+            block_requests(self.driver, self.blocked_urls)
+    
+    def browser_rss(self) -> Optional[int]:
+        """
+        Resident memory of this session's chromedriver and browser processes.
+        
+        Returns:
+            Bytes, or None if it cannot be measured
+        """
+        service = getattr(self.driver, 'service', None)
+        # uc.Chrome may start the browser outside chromedriver's process tree
+        pids = [getattr(getattr(service, 'process', None), 'pid', None), getattr(self.driver, 'browser_pid', None)]
+        pids = [pid for pid in pids if pid]
+        return process_tree_rss(*pids) if pids else None
     
     def navigate_to_chatgpt(self):
         """Navigate to ChatGPT and wait for interface to be ready."""
         logger.info("Navigating to ChatGPT...")
-        self.driver.get(CHATGPT_URL)
+        self.driver.get(self.url)
         logger.info("Navigation completed")
         
-        # Wait for page to load
-        time.sleep(3)
+        # Wait until the page shows either the chat box or a login redirect
+        WebDriverWait(self.driver, 30).until(
+            lambda driver: "login" in driver.current_url.lower()
+            or driver.find_elements(By.ID, 'prompt-textarea')
+        )
         
         # Check if we need to handle login
         current_url = self.driver.current_url
@@ -57,8 +119,81 @@ class BrowserManager:
         logger.info("Waiting for chat interface...")
         wait = WebDriverWait(self.driver, 30)
         wait.until(EC.presence_of_element_located((By.ID, 'prompt-textarea')))
+        self.conversation_prompts = 0
         logger.info("ChatGPT interface is ready")
     
+    def open_tabs(self, count: int) -> List[str]:
+        """
+        Open ChatGPT in more tabs, each with its own conversation.
+        
+        Args:
+            count: Total number of tabs, including the current one
+            
+        Returns:
+            Window handles of all the tabs, the current one first
+        """
+        handles = [self.driver.current_window_handle]
+        for _ in range(count - 1):
+            self.driver.switch_to.new_window('tab')
+            # Request blocking is set per tab
+            self.apply_lean_mode()
+            self.driver.get(self.url)
+            WebDriverWait(self.driver, 30).until(EC.presence_of_element_located((By.ID, 'prompt-textarea')))
+            handles.append(self.driver.current_window_handle)
+        self.driver.switch_to.window(handles[0])
+        logger.info(f"Opened {len(handles)} ChatGPT tabs")
+        return handles
+    
+    def switch_to_tab(self, handle: str):
+        """Make a tab the target of further commands."""
+        self.driver.switch_to.window(handle)
+    
+    def start_new_chat(self):
+        """Open a fresh conversation in the running browser."""
+        logger.info("Starting a new chat...")
+        self.driver.get(self.url)
+        WebDriverWait(self.driver, 30).until(EC.presence_of_element_located((By.ID, 'prompt-textarea')))
+        self.handle_stay_logged_out_popup()
+        self.conversation_prompts = 0
+    
+    def conversation_dom_size(self) -> int:
+        """Return the number of elements currently in the page."""
+        return self.driver.execute_script(DOM_SIZE)
+    
+    def recycle_conversation_if_needed(self) -> bool:
+        """
+        Count a finished prompt and start a new chat once the conversation is too long.
+        
+        Keeping conversations short keeps the DOM, browser memory and the
+        cost of every response lookup flat over long runs.
+        
+        Returns:
+            True if a new chat was started
+        """
+        self.conversation_prompts += 1
+        
+        reason = None
+        if self.max_conversation_prompts and self.conversation_prompts >= self.max_conversation_prompts:
+            reason = f"{self.conversation_prompts} prompts"
+        elif self.max_conversation_nodes:
+            dom_size = self.conversation_dom_size()
+            if dom_size >= self.max_conversation_nodes:
+                reason = f"{dom_size} DOM nodes"
+        
+        if reason is None:
+            return False
+        
+        logger.info(f"Conversation reached {reason}, recycling")
+        self.start_new_chat()
+        return True
+    
+    def restart_browser(self):
+        """Replace a crashed or hung browser with a fresh one showing ChatGPT."""
+        self.close_browser()
+        self.driver = None
+        self.launch_browser()
+        self.navigate_to_chatgpt()
+    
     def handle_stay_logged_out_popup(self):
         """
         Check for and handle the "Stay logged out" popup if it appears.
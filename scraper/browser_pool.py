@@ -0,0 +1,166 @@
+"""
+Warm browser sessions with persistent profiles.
+
+A warm browser keeps its Chrome profile (cookies, login) in a fixed
+directory and is left running after a run finishes. The next run, or the
+next worker using the same profile, attaches to it over the DevTools port
+instead of launching Chrome, logging in and loading ChatGPT again.
+"""
+import json
+import logging
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+from selenium import webdriver
+from selenium.webdriver.chromium.service import ChromiumService
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.service import utils as service_utils
+
+import undetected_chromedriver as uc
+from .browser_manager import BrowserManager
+
+logger = logging.getLogger(__name__)
+
+SESSION_FILE = 'scraper_session.json'
+
+
+def devtools_alive(port: int, timeout: float = 1.0) -> bool:
+    """Return True if a browser answers on the DevTools port."""
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+class WarmBrowserManager(BrowserManager):
+    """BrowserManager that reuses a persistent profile and a running browser."""
+
+    def __init__(self, profile_dir: str, keep_warm: bool = True, **kwargs):
+        """
+        Initialize warm browser manager.
+
+        Args:
+            profile_dir: Chrome user-data directory reused across runs
+            keep_warm: Leave the browser running on close so the next run can attach
+            **kwargs: Passed to BrowserManager
+        """
+        super().__init__(**kwargs)
+        self.profile_dir = Path(profile_dir)
+        self.keep_warm = keep_warm
+        self.attached = False
+
+    @property
+    def session_file(self) -> Path:
+        """File recording the DevTools port of this profile's browser."""
+        return self.profile_dir / SESSION_FILE
+
+    def _read_session(self) -> Optional[dict]:
+        """Load the saved DevTools port of a previously launched browser."""
+        try:
+            return json.loads(self.session_file.read_text())
+        except (OSError, ValueError):
+            return None
+
+    def _write_session(self, port: int):
+        """Remember the DevTools port so later runs can attach."""
+        self.session_file.write_text(json.dumps({'port': port}))
+
+    def launch_browser(self):
+        """Attach to a running browser for this profile, or launch one."""
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+        session = self._read_session()
+        if session and devtools_alive(session['port']):
+            try:
+                self._attach(session['port'])
+                self.apply_lean_mode()
+                return
+            except Exception as e:
+                logger.warning(f"Could not attach to warm browser on port {session['port']}: {e}")
+
+        self._launch_cold()
+        self.apply_lean_mode()
+
+    def _attach(self, port: int):
+        """Connect a new driver to the browser already listening on port."""
+        logger.info(f"Attaching to warm browser on port {port}...")
+        patcher = uc.Patcher()
+        patcher.auto()
+
+        options = webdriver.ChromeOptions()
+        options.debugger_address = f"127.0.0.1:{port}"
+        self.driver = webdriver.Chrome(service=ChromiumService(patcher.executable_path), options=options)
+        self.attached = True
+        logger.info("Attached to warm browser")
+
+    def _launch_cold(self):
+        """Launch a browser on the persistent profile with a known DevTools port."""
+        logger.info(f"Launching browser with profile {self.profile_dir}...")
+        port = service_utils.free_port()
+        try:
+            # A detached browser outlives this process, so it can be reused
+            self.driver = uc.Chrome(
+                options=self._build_options(),
+                user_data_dir=str(self.profile_dir),
+                port=port,
+                use_subprocess=not self.keep_warm
+            )
+        except Exception as e:
+            logger.error(f"Failed to launch browser: {e}")
+            raise
+        self.attached = False
+        self._write_session(port)
+        logger.info("Browser launched successfully")
+
+    def navigate_to_chatgpt(self):
+        """Skip navigation when an attached browser already shows the chat."""
+        if self.attached:
+            try:
+                if self.driver.find_elements(By.ID, 'prompt-textarea'):
+                    self.conversation_prompts = 0
+                    logger.info("Warm browser is already on ChatGPT")
+                    return
+            except Exception as e:
+                logger.warning(f"Could not inspect warm browser page: {e}")
+        super().navigate_to_chatgpt()
+
+    def restart_browser(self):
+        """Shut the broken browser down rather than keeping it warm, then start a new one."""
+        keep_warm = self.keep_warm
+        self.keep_warm = False
+        try:
+            self.close_browser()
+        finally:
+            self.keep_warm = keep_warm
+        self.driver = None
+        self.launch_browser()
+        self.navigate_to_chatgpt()
+
+    def close_browser(self):
+        """Detach from the browser, leaving it running when kept warm."""
+        if not self.driver:
+            return
+        if not self.keep_warm:
+            if self.attached:
+                # Quitting an attached driver leaves the browser running
+                try:
+                    self.driver.execute_cdp_cmd('Browser.close', {})
+                except Exception:
+                    pass
+            super().close_browser()
+            self.session_file.unlink(missing_ok=True)
+            return
+
+        try:
+            # Stop only chromedriver; the browser keeps running for the next run
+            self.driver.service.stop()
+            if hasattr(self.driver, 'browser_pid'):
+                # uc.Chrome kills this pid when garbage collected
+                self.driver.browser_pid = None
+            logger.info("Detached from warm browser")
+        except Exception as e:
+            logger.error(f"Error detaching from browser: {e}")
+        self.driver = None
+
@@ -1,15 +1,30 @@
 """
 ChatGPT scraper implementation using undetected-chromedriver.
 """
-import time
 import logging
-from typing import List
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
 
 from app.database import create_engine_with_password
 from sqlalchemy.orm import sessionmaker
 from .browser_manager import BrowserManager
+from .browser_pool import WarmBrowserManager
+from .job_queue import JobQueue
+from .ledger import RunLedger
+from .metrics import RunMetrics
+from .pipeline import ProcessingPipeline
+from .pacing import PacingScheduler, TokenBucket
+from .recording import ResponseRecorder
+from .response_cache import ResponseCache
 from .response_handler import ResponseHandler
-from .data_processor import DataProcessor
+from .tab_worker import MultiTabWorker
+from .utils import (
+    CHATGPT_URL, CONVERSATION_MAX_PROMPTS, CONVERSATION_MAX_DOM_NODES, MAX_RETRIES, PACING_MIN_DELAY,
+    CACHE_TTL, CACHE_MAX_SIZE, JOB_LEASE_SECONDS, JOB_RUN_ID, PROMPT_QUEUE_SIZE, BROWSER_MAX_RESTARTS_PER_HOUR,
+    BROWSER_MAX_RSS_MB, BROWSER_RECYCLE_EVERY
+)
+from .worker_pool import PromptFeeder, ScraperWorker, WorkerPool
 
 logger = logging.getLogger(__name__)
 
@@ -19,84 +34,254 @@ class ChatGPTScraper:
     Undetected-chromedriver based scraper for ChatGPT interface.
     """
     
-    def __init__(self, password: str, delay=3):
-        """Initialize the scraper."""
+    def __init__(self, password: str, delay=3, workers: int = 1, url: str = CHATGPT_URL,
+                 new_chat_every: int = CONVERSATION_MAX_PROMPTS, max_dom_nodes: int = CONVERSATION_MAX_DOM_NODES,
+                 profile_dir: Optional[str] = None, keep_browser: bool = False,
+                 max_rate: float = 0, min_delay: float = PACING_MIN_DELAY, max_retries: int = MAX_RETRIES,
+                 run_id: Optional[str] = None, resume: Optional[str] = None,
+                 cache_ttl: float = CACHE_TTL, cache_size: int = CACHE_MAX_SIZE,
+                 queue: bool = False, lease_seconds: float = JOB_LEASE_SECONDS,
+                 metrics_json: Optional[str] = None, metrics_prom: Optional[str] = None,
+                 max_restarts_per_hour: int = BROWSER_MAX_RESTARTS_PER_HOUR, lean: bool = False,
+                 lean_allow: Optional[List[str]] = None, tabs: int = 1,
+                 max_browser_rss_mb: float = BROWSER_MAX_RSS_MB, recycle_browser_every: int = BROWSER_RECYCLE_EVERY,
+                 record_dir: Optional[str] = None):
+        """
+        Initialize the scraper.
+        
+        Args:
+            password: Database password
+            delay: Initial seconds to wait between requests (per worker)
+            workers: Number of parallel browser sessions
+            url: ChatGPT URL to scrape
+            new_chat_every: Prompts per conversation before starting a new chat
+            max_dom_nodes: Page size that triggers a new chat
+            profile_dir: Directory of persistent Chrome profiles, one per worker
+            keep_browser: Leave browsers running after the run for warm starts
+            max_rate: Maximum prompts per minute across all workers (0 for no cap)
+            min_delay: Shortest delay between requests after speeding up
+            max_retries: Attempts per prompt before it is skipped
+            run_id: Identifier for a new run (generated when omitted)
+            resume: Run id to resume, or 'latest' for the most recent run
+            cache_ttl: Seconds a scraped response may be reused (0 disables the cache)
+            cache_size: Responses kept in the in-memory cache
+            queue: Take prompts from the shared scrape_jobs queue
+            lease_seconds: Seconds a claimed job is held without a heartbeat
+            metrics_json: File to write the run's stage timings to as JSON
+            metrics_prom: File to write them to in the Prometheus text format
+            max_restarts_per_hour: Browser restarts per worker per hour after a crash (0 disables)
+            lean: Block non-essential page requests and use memory-saving Chrome flags
+            lean_allow: Resource types or URL patterns lean mode should still load
+            tabs: ChatGPT tabs per browser, each running its own conversation
+            max_browser_rss_mb: Browser memory in MB that triggers a recycle between prompts (0 disables)
+            recycle_browser_every: Prompts per browser before it is recycled (0 disables)
+            record_dir: Directory to record each finished response to for offline replay
+        """
         self.password = password
-        self.db = self._create_db_session()
+        self.session_factory = self._create_session_factory()
+        self.db = self.session_factory()
         self.delay = delay
+        self.workers = workers
+        self.url = url
+        self.new_chat_every = new_chat_every
+        self.max_dom_nodes = max_dom_nodes
+        self.profile_dir = profile_dir
+        self.keep_browser = keep_browser
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.max_retries = max_retries
+        self.max_restarts_per_hour = max_restarts_per_hour
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.recycle_browser_every = recycle_browser_every
+        self.lean = lean
+        self.lean_allow = lean_allow or []
+        self.tabs = tabs
+        self.worker_factory = partial(MultiTabWorker, tabs=tabs) if tabs > 1 else ScraperWorker
+        # Queued jobs are each stored under their own ledger run (see JobQueue.run_id_for)
+        self.run_id = self._resolve_run_id(run_id or (JOB_RUN_ID if queue else None), resume)
         
         # Initialize components
-        self.browser_manager = BrowserManager()
+        self.metrics = RunMetrics()
+        self.metrics_json = metrics_json
+        self.metrics_prom = metrics_prom
+        self.recorder = ResponseRecorder(record_dir, self.run_id) if record_dir else None
+        self.handler_factory = partial(ResponseHandler, metrics=self.metrics, recorder=self.recorder)
+        self.ledger = RunLedger(self.session_factory, self.run_id)
+        self.response_cache = ResponseCache(self.session_factory, cache_ttl, cache_size) if cache_ttl > 0 else None
+        self.browser_manager = self._create_browser_manager()
         self.response_handler = None
-        self.data_processor = DataProcessor(self.db)
+        self.job_queue = JobQueue(self.session_factory, lease_seconds=lease_seconds) if queue else None
+        # Claim only what the workers can start on, so other hosts get the rest
+        self.prefetch = workers * tabs if queue else PROMPT_QUEUE_SIZE
+        self.pipeline = ProcessingPipeline(
+            self.session_factory, run_id=self.run_id, response_cache=self.response_cache,
+            on_written=self.job_queue.settle_records if self.job_queue else None,
+            on_dropped=self.job_queue.settle_dropped if self.job_queue else None,
+            run_id_for=self.job_queue.run_id_for if self.job_queue else None,
+            metrics=self.metrics
+        )
+    
+    def _resolve_run_id(self, run_id: Optional[str], resume: Optional[str]) -> str:
+        """Pick the run to resume or the id of a new run."""
+        if resume == 'latest':
+            latest = RunLedger.latest_run_id(self.session_factory)
+            if latest is None:
+                raise ValueError("No previous run to resume")
+            logger.info(f"Resuming latest run {latest}")
+            return latest
+        if resume:
+            logger.info(f"Resuming run {resume}")
+            return resume
+        return run_id or RunLedger.new_run_id()
         
-    def _create_db_session(self):
-        """Create database session with password."""
+    def _create_browser_manager(self, worker_id: int = 1) -> BrowserManager:
+        """Create a browser manager with this run's settings."""
+        if self.profile_dir:
+            return WarmBrowserManager(
+                str(Path(self.profile_dir) / f"worker-{worker_id}"),
+                keep_warm=self.keep_browser,
+                url=self.url,
+                max_conversation_prompts=self.new_chat_every,
+                max_conversation_nodes=self.max_dom_nodes,
+                lean=self.lean,
+                lean_allow=self.lean_allow,
+                tabs=self.tabs
+            )
+        return BrowserManager(self.url, self.new_chat_every, self.max_dom_nodes,
+                              lean=self.lean, lean_allow=self.lean_allow, tabs=self.tabs)
+    
+    def _create_session_factory(self):
+        """Create database session factory with password."""
         engine = create_engine_with_password(self.password)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-        return SessionLocal()
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine)
     
-    def process_prompts(self, prompts: List[str]):
+    def process_prompts(self, prompts: Iterable[str]):
         """
-        Process a list of prompts and extract brand mentions.
+        Process prompts and extract brand mentions.
         
         Args:
-            prompts: List of prompts to process
+            prompts: Prompts to process; a lazy iterator is read as the workers need it
         """
-        logger.info(f"Starting to process {len(prompts)} prompts...")
+        logger.info(f"Starting to process prompts with {self.workers} worker(s) (run {self.run_id})...")
+        
+        # Analysis and database writes run in the background
+        self.pipeline.start()
+        try:
+            # Skip prompts this run has already completed or that were scraped recently
+            self._run_workers(self._skip_cached(self.ledger.pending(prompts)))
+        finally:
+            try:
+                self.pipeline.close()
+            finally:
+                self._report_metrics()
+        
+        if self.ledger.skipped:
+            logger.info(f"Run {self.run_id}: skipped {self.ledger.skipped} completed or duplicate prompts")
+        if self.response_cache is not None:
+            logger.info(f"Response cache: {self.response_cache.stats['hits']} hits, "
+                        f"{self.response_cache.stats['misses']} misses")
+        
+        logger.info(f"Completed processing all prompts! Run {self.run_id} ledger: {self.ledger.summary()}")
+    
+    def process_queue(self):
+        """Claim and process jobs from the shared queue until it is empty."""
+        logger.info(f"Processing queued jobs with {self.workers} worker(s) as {self.job_queue.worker_name}...")
         
+        self.pipeline.start()
+        self.job_queue.start_heartbeat()
         try:
-            # Setup browser and navigation
-            self.browser_manager.launch_browser()
-            self.browser_manager.navigate_to_chatgpt()
-            
-            # Initialize response handler with driver
-            self.response_handler = ResponseHandler(self.browser_manager.driver)
-            
-            # Process each prompt
-            for i, prompt in enumerate(prompts, 1):
-                max_retries = 3
-                retry_count = 0
-                
-                while retry_count < max_retries:
-                    try:
-                        logger.info(f"Processing prompt {i}/{len(prompts)} (attempt {retry_count + 1}): {prompt}")
-                        
-                        # Send prompt to ChatGPT (with automatic popup handling)
-                        response = self.response_handler.retry_with_popup_handling(
-                            self.response_handler.send_prompt,
-                            self.browser_manager.handle_stay_logged_out_popup,
-                            prompt
-                        )
-                        
-                        # Process the response
-                        self.data_processor.process_prompt_response(prompt, response)
-                        
-                        # Success - break out of retry loop
-                        break
-                        
-                    except Exception as e:
-                        retry_count += 1
-                        logger.error(f"Error processing prompt {i} (attempt {retry_count}): {e}")
-                        
-                        if retry_count >= max_retries:
-                            logger.error(f"Failed to process prompt {i} after {max_retries} attempts, skipping...")
-                            break
-                        else:
-                            logger.info(f"Retrying prompt {i} in {self.delay * 2} seconds...")
-                            time.sleep(self.delay * 2)  # Longer delay before retry
-                
-                # Add delay between requests to be respectful
-                time.sleep(self.delay)
-                    
+            self._run_workers(self._skip_cached(self.job_queue.iter_prompts()))
+        finally:
+            # Settle the last batches before the heartbeat stops
+            try:
+                self.pipeline.close()
+            finally:
+                self.job_queue.close()
+                self._report_metrics()
+        
+        logger.info("Queue drained")
+    
+    def _report_metrics(self):
+        """Log the slowest stages and write the metrics files that were asked for."""
+        summary = self.metrics.summary()
+        slowest = sorted(summary['stages'].items(), key=lambda item: item[1]['total'], reverse=True)[:5]
+        logger.info(f"Run metrics: {summary['prompts']} prompts ({summary['prompts_per_hour']:.0f}/hour), "
+                    f"{summary['retries']} retries, {summary['failures']} failures; slowest stages: "
+                    + ", ".join(f"{name} p50={stats['p50']:.2f}s p95={stats['p95']:.2f}s" for name, stats in slowest))
+        try:
+            if self.metrics_json:
+                self.metrics.write_json(self.metrics_json)
+            if self.metrics_prom:
+                self.metrics.write_prometheus(self.metrics_prom)
+        except OSError as e:
+            logger.error(f"Could not write run metrics: {e}")
+    
+    def _skip_cached(self, prompts: Iterable[str]) -> Iterator[str]:
+        """Hand cached responses straight to the pipeline and yield the prompts that need sending."""
+        for prompt in prompts:
+            response = self.response_cache.get(prompt) if self.response_cache is not None else None
+            if response is None:
+                yield prompt
+            else:
+                self.pipeline.process_prompt_response(prompt, response, cached=True)
+    
+    def _run_workers(self, prompts: Iterable[str]):
+        """Send the prompts with one inline worker or a pool of workers."""
+        if self.workers > 1:
+            pool = WorkerPool(
+                self.workers,
+                self.pipeline,
+                delay=self.delay,
+                max_retries=self.max_retries,
+                browser_factory=self._create_browser_manager,
+                max_rate=self.max_rate,
+                min_delay=self.min_delay,
+                prefetch=self.prefetch,
+                handler_factory=self.handler_factory,
+                metrics=self.metrics,
+                max_restarts_per_hour=self.max_restarts_per_hour,
+                max_browser_rss_mb=self.max_browser_rss_mb,
+                recycle_browser_every=self.recycle_browser_every,
+                worker_factory=self.worker_factory
+            )
+            pool.run(prompts)
+            if pool.feeder.error:
+                raise pool.feeder.error
+            return
+        
+        # Prompts are read in the background while the worker sends them
+        feeder = PromptFeeder(prompts, self.prefetch)
+        worker = self.worker_factory(
+            1,
+            feeder.start(),
+            self.browser_manager,
+            self.pipeline,
+            max_retries=self.max_retries,
+            pacer=PacingScheduler(
+                self.delay,
+                TokenBucket(self.max_rate) if self.max_rate else None,
+                min_delay=self.min_delay
+            ),
+            input_done=feeder.done,
+            handler_factory=self.handler_factory,
+            metrics=self.metrics,
+            max_restarts_per_hour=self.max_restarts_per_hour,
+            max_browser_rss_mb=self.max_browser_rss_mb,
+            recycle_browser_every=self.recycle_browser_every
+        )
+        
+        try:
+            worker.run()
+            self.response_handler = worker.response_handler
         except Exception as e:
             logger.error(f"Error in process_prompts: {e}")
+            feeder.stop()
             raise
-        finally:
-            self.browser_manager.close_browser()
-        
-        logger.info("Completed processing all prompts!")
+        if feeder.error:
+            raise feeder.error
     
     def close(self):
-        """Close database connection."""
-        self.db.close() 
\ No newline at end of file
+        """Close database connection and the recording file."""
+        if self.recorder is not None:
+            self.recorder.close()
+        self.db.close()
@@ -1,12 +1,19 @@
 """
 Data processing for brand mentions analysis.
 """
+import csv
+import io
 import logging
-from typing import Dict
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import Table, insert, text
 from sqlalchemy.orm import Session
 
-from app.models import Prompt, BrandMention
+from app.aggregates import record_mentions
+from app.models import Prompt, BrandMention, PromptLedger
 from .brand_analyzer import BrandAnalyzer
+from .utils import BULK_CHUNK_SIZE, BULK_COPY_THRESHOLD
 
 logger = logging.getLogger(__name__)
 
@@ -27,32 +34,166 @@ class DatabaseManager:
             response_text: The ChatGPT response
             mentions: Dictionary of brand mentions
         """
+        self.save_prompt_responses([{'prompt': prompt_text, 'response': response_text, 'mentions': mentions}])
+    
+    def save_prompt_responses(self, records: List[Dict[str, Any]], use_copy: Optional[bool] = None):
+        """
+        Save many prompts, responses and their brand mentions in one transaction.
+        
+        Rows are written with set-based inserts: prompts in multi-row INSERT
+        ... RETURNING statements that hand back their ids in input order, and
+        mentions in executemany batches. On Postgres, large batches use COPY.
+        
+        Records carrying 'run_id' and 'prompt_hash' are checked against the run
+        ledger: prompts the ledger already shows as completed are skipped, and
+        the ledger entries are updated in the same transaction, so writing the
+        same result twice has no effect. Records with 'failed' set only update
+        the ledger; 'cached' records are flagged as reused responses.
+        
+        Args:
+            records: Dictionaries with 'prompt', 'response' and 'mentions' keys
+            use_copy: Force COPY on or off (default: Postgres batches of BULK_COPY_THRESHOLD or more)
+        """
+        if not records:
+            return
+        
         try:
-            # Save prompt and response
-            prompt_record = Prompt(
-                prompt_text=prompt_text,
-                response_text=response_text
+            written_at = datetime.now(timezone.utc)
+            to_save = self._apply_ledger(records)
+            
+            if use_copy is None:
+                use_copy = self._dialect() == 'postgresql' and len(to_save) >= BULK_COPY_THRESHOLD
+            insert_rows = self._copy_rows if use_copy else self._insert_rows
+            
+            prompt_ids = insert_rows(
+                Prompt.__table__,
+                ('prompt_text', 'response_text'),
+                [(record['prompt'], record['response']) for record, _ in to_save],
+                returning_ids=True
+            )
+            
+            mention_rows = []
+            totals = Counter()
+            for prompt_id, (record, entry) in zip(prompt_ids, to_save):
+                if entry is not None:
+                    entry.prompt_id = prompt_id
+                for brand, count in record['mentions'].items():
+                    if count > 0:
+                        mention_rows.append((prompt_id, brand, count, written_at))
+                        totals[brand] += count
+            insert_rows(
+                BrandMention.__table__,
+                ('prompt_id', 'brand_name', 'mention_count', 'created_at'),
+                mention_rows
             )
-            self.db.add(prompt_record)
-            self.db.flush()  # Get the ID
             
-            # Save brand mentions
-            for brand, count in mentions.items():
-                if count > 0:
-                    mention_record = BrandMention(
-                        prompt_id=prompt_record.id,
-                        brand_name=brand,
-                        mention_count=count
-                    )
-                    self.db.add(mention_record)
+            # Keep the brand totals and rollups in step with the raw rows
+            record_mentions(self.db, totals, written_at)
             
             self.db.commit()
-            logger.info(f"Saved data for prompt: {prompt_text[:50]}...")
+            logger.info(f"Saved data for {len(prompt_ids)} prompts")
             
         except Exception as e:
             self.db.rollback()
-            logger.error(f"Error saving to database: {e}")
+            logger.error(f"Error saving batch to database: {e}")
             raise
+    
+    def _apply_ledger(self, records: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], Optional[PromptLedger]]]:
+        """Update the ledger entries of a batch and return the records that still need storing."""
+        ledger = self._lock_ledger_entries(records)
+        
+        to_save = []
+        for record in records:
+            key = self._ledger_key(record)
+            entry = ledger.get(key)
+            if key and entry is None:
+                entry = ledger[key] = PromptLedger(
+                    run_id=key[0], prompt_hash=key[1], prompt_text=record['prompt'], attempts=0
+                )
+                self.db.add(entry)
+            if entry is not None:
+                if entry.status == 'completed':
+                    continue  # Already stored by an earlier write
+                entry.attempts = (entry.attempts or 0) + 1
+                entry.status = 'failed' if record.get('failed') else 'completed'
+                entry.cached = bool(record.get('cached'))
+            if not record.get('failed'):
+                to_save.append((record, entry))
+        return to_save
+    
+    def _dialect(self) -> str:
+        return self.db.get_bind().dialect.name
+    
+    def _insert_rows(self, table: Table, columns: Sequence[str], rows: List[tuple],
+                     returning_ids: bool = False) -> List[int]:
+        """Insert rows in chunks of multi-row INSERTs, optionally returning the new ids in order."""
+        ids = []
+        stmt = insert(table)
+        if returning_ids:
+            stmt = stmt.returning(table.c.id, sort_by_parameter_order=True)
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            params = [dict(zip(columns, row)) for row in rows[i:i + BULK_CHUNK_SIZE]]
+            result = self.db.execute(stmt, params)
+            if returning_ids:
+                ids.extend(result.scalars().all())
+        return ids
+    
+    def _copy_rows(self, table: Table, columns: Sequence[str], rows: List[tuple],
+                   returning_ids: bool = False) -> List[int]:
+        """
+        Load rows with Postgres COPY inside the current transaction.
+        
+        COPY cannot return ids, so when they are needed they are reserved from
+        the table's sequence first and written explicitly.
+        """
+        if not rows:
+            return []
+        
+        ids = []
+        if returning_ids:
+            ids = self.db.execute(
+                text("SELECT nextval(pg_get_serial_sequence(:table, 'id')) FROM generate_series(1, :n)"),
+                {'table': table.name, 'n': len(rows)}
+            ).scalars().all()
+            columns = ('id', *columns)
+            rows = [(row_id, *row) for row_id, row in zip(ids, rows)]
+        
+        cursor = self.db.connection().connection.cursor()
+        try:
+            for i in range(0, len(rows), BULK_CHUNK_SIZE):
+                buffer = io.StringIO()
+                # Quoting every string keeps empty strings distinct from NULL
+                csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows[i:i + BULK_CHUNK_SIZE])
+                buffer.seek(0)
+                cursor.copy_expert(
+                    f"COPY {table.name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+        finally:
+            cursor.close()
+        return ids
+    
+    @staticmethod
+    def _ledger_key(record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """Return the (run_id, prompt_hash) ledger key of a record, if it has one."""
+        if record.get('run_id') and record.get('prompt_hash'):
+            return record['run_id'], record['prompt_hash']
+        return None
+    
+    def _lock_ledger_entries(self, records: List[Dict[str, Any]]) -> Dict[Tuple[str, str], PromptLedger]:
+        """Load and lock the ledger entries for a batch of records."""
+        keys = {key for key in map(self._ledger_key, records) if key}
+        if not keys:
+            return {}
+        
+        entries = self.db.query(PromptLedger).filter(
+            PromptLedger.run_id.in_({run_id for run_id, _ in keys}),
+            PromptLedger.prompt_hash.in_({hash_ for _, hash_ in keys})
+        ).with_for_update().all()
+        return {(entry.run_id, entry.prompt_hash): entry for entry in entries}
+    
+    def close(self):
+        """Close the database session."""
+        self.db.close()
 
 
 class DataProcessor:
@@ -63,14 +204,18 @@ class DataProcessor:
         self.brand_analyzer = BrandAnalyzer()
         self.db_manager = DatabaseManager(db_session)
     
-    def process_prompt_response(self, prompt: str, response: str):
+    def process_prompt_response(self, prompt: str, response: str, cached: bool = False):
         """
         Process a single prompt-response pair.
         
         Args:
             prompt: The original prompt
             response: The ChatGPT response
+            cached: True if the response came from the response cache
         """
+        if cached:
+            logger.info(f"Using cached response for prompt: {prompt[:50]}...")
+        
         # Extract brand mentions
         mentions = self.brand_analyzer.extract_brand_mentions(response)
         
@@ -78,4 +223,12 @@ class DataProcessor:
         self.brand_analyzer.log_mentions(mentions)
         
         # Save to database
-        self.db_manager.save_prompt_response(prompt, response, mentions) 
\ No newline at end of file
+        self.db_manager.save_prompt_response(prompt, response, mentions) 
+    
+    def record_failure(self, prompt: str):
+        """Note a prompt that could not be scraped; nothing is stored without a ledger."""
+        logger.warning(f"No response recorded for prompt: {prompt[:50]}...")
+    
+    def close(self):
+        """Release the database session."""
+        self.db_manager.close()
@@ -0,0 +1,328 @@
+"""
+Shared work queue for running scrapers on several hosts.
+
+Prompts are enqueued as rows in scrape_jobs. Each scraper claims queued
+jobs with SELECT ... FOR UPDATE SKIP LOCKED, so no two hosts get the same
+job, and holds a lease that a heartbeat thread keeps extending. If a host
+dies, its leases expire and the jobs are put back in the queue (or marked
+failed once they have used up their attempts).
+
+Each job's result is stored under its own ledger run, so a job that comes
+back after a crash is not stored twice, while a prompt enqueued again later
+is scraped and stored again.
+"""
+import os
+import socket
+import threading
+import time
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import case, func, insert, select, update
+
+from app.models import ScrapeJob
+from .utils import (
+    prompt_hash, MAX_RETRIES, JOB_LEASE_SECONDS, JOB_POLL_INTERVAL, JOB_CLAIM_BATCH, JOB_ENQUEUE_CHUNK_SIZE,
+    JOB_RUN_ID
+)
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Claims, renews and settles scrape jobs for one scraper process."""
+
+    def __init__(self, session_factory: Callable, worker_name: Optional[str] = None,
+                 lease_seconds: float = JOB_LEASE_SECONDS, max_attempts: int = MAX_RETRIES,
+                 claim_batch: int = JOB_CLAIM_BATCH, poll_interval: float = JOB_POLL_INTERVAL,
+                 clock: Callable[[], float] = time.time, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the job queue.
+
+        Args:
+            session_factory: Creates database sessions
+            worker_name: Lease owner name (defaults to host:pid)
+            lease_seconds: How long a claim lasts without a heartbeat
+            max_attempts: Claims per job before it is marked failed
+            claim_batch: Jobs claimed per query
+            poll_interval: Seconds to wait while other hosts still hold jobs
+            clock: Wall clock in seconds, replaceable in tests
+            sleep: Sleep function, replaceable in tests
+        """
+        self.session_factory = session_factory
+        self.worker_name = worker_name or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.claim_batch = claim_batch
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.held: Dict[str, List[int]] = defaultdict(list)
+        # Ledger run -> held job whose result is on its way to the writer
+        self.assigned: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.heartbeat_thread: Optional[threading.Thread] = None
+        self.stats = {'claimed': 0, 'done': 0, 'failed': 0, 'requeued': 0}
+
+    @staticmethod
+    def job_run_id(job_id: int) -> str:
+        """Ledger run a job's result is stored under."""
+        return f"{JOB_RUN_ID}-{job_id}"
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), timezone.utc)
+
+    def _execute(self, operation: Callable[[Any], Any]):
+        """Run an operation in its own transaction."""
+        db = self.session_factory()
+        try:
+            result = operation(db)
+            db.commit()
+            return result
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def enqueue(self, prompts: Iterable[str]) -> int:
+        """
+        Add prompts to the queue.
+
+        Args:
+            prompts: Prompts to enqueue, possibly a lazy iterator
+
+        Returns:
+            Number of jobs added
+        """
+        added = 0
+        iterator = iter(prompts)
+        while True:
+            chunk = list(islice(iterator, JOB_ENQUEUE_CHUNK_SIZE))
+            if not chunk:
+                break
+            rows = [{'prompt_text': prompt, 'prompt_hash': prompt_hash(prompt), 'status': 'queued', 'attempts': 0}
+                    for prompt in chunk]
+            self._execute(lambda db: db.execute(insert(ScrapeJob), rows))
+            added += len(rows)
+        logger.info(f"Enqueued {added} jobs")
+        return added
+
+    def claim(self, limit: Optional[int] = None) -> List[Tuple[int, str, str]]:
+        """
+        Lease up to `limit` queued jobs, skipping rows other hosts are claiming.
+
+        Returns:
+            (job id, prompt, prompt hash) for each claimed job
+        """
+        expires = self._now() + timedelta(seconds=self.lease_seconds)
+
+        def claim_jobs(db):
+            ids = db.execute(
+                select(ScrapeJob.id).where(ScrapeJob.status == 'queued').order_by(ScrapeJob.id)
+                .limit(limit or self.claim_batch).with_for_update(skip_locked=True)
+            ).scalars().all()
+            if not ids:
+                return []
+            db.execute(update(ScrapeJob).where(ScrapeJob.id.in_(ids)).values(
+                status='leased', lease_owner=self.worker_name, lease_expires_at=expires,
+                attempts=ScrapeJob.attempts + 1, updated_at=func.now()
+            ))
+            rows = db.execute(
+                select(ScrapeJob.id, ScrapeJob.prompt_text, ScrapeJob.prompt_hash)
+                .where(ScrapeJob.id.in_(ids)).order_by(ScrapeJob.id)
+            ).all()
+            return [tuple(row) for row in rows]
+
+        jobs = self._execute(claim_jobs)
+        with self.lock:
+            for job_id, _, key in jobs:
+                self.held[key].append(job_id)
+            self.stats['claimed'] += len(jobs)
+        return jobs
+
+    def requeue_expired(self) -> int:
+        """Put jobs whose lease ran out back in the queue, or fail them if out of attempts."""
+        def requeue(db):
+            return db.execute(
+                update(ScrapeJob)
+                .where(ScrapeJob.status == 'leased', ScrapeJob.lease_expires_at < self._now())
+                .values(
+                    status=case((ScrapeJob.attempts >= self.max_attempts, 'failed'), else_='queued'),
+                    lease_owner=None, lease_expires_at=None, last_error='lease expired', updated_at=func.now()
+                )
+            ).rowcount
+
+        count = self._execute(requeue)
+        if count:
+            logger.warning(f"Re-queued {count} jobs with expired leases")
+            with self.lock:
+                self.stats['requeued'] += count
+        return count
+
+    def heartbeat(self) -> int:
+        """Extend the leases of every job this process still holds."""
+        with self.lock:
+            job_ids = [job_id for ids in self.held.values() for job_id in ids]
+        if not job_ids:
+            return 0
+        expires = self._now() + timedelta(seconds=self.lease_seconds)
+        return self._execute(lambda db: db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id.in_(job_ids), ScrapeJob.status == 'leased',
+                   ScrapeJob.lease_owner == self.worker_name)
+            .values(lease_expires_at=expires)
+        ).rowcount)
+
+    def remaining(self) -> int:
+        """Count jobs that are queued or leased by any host."""
+        return self._execute(lambda db: db.execute(
+            select(func.count()).select_from(ScrapeJob).where(ScrapeJob.status.in_(('queued', 'leased')))
+        ).scalar())
+
+    def iter_prompts(self) -> Iterator[str]:
+        """
+        Yield prompts from claimed jobs until no job is queued or leased anywhere.
+
+        While other hosts still hold leases, keep polling in case their jobs
+        expire and come back.
+        """
+        while not self.stop_event.is_set():
+            self.requeue_expired()
+            jobs = self.claim()
+            if jobs:
+                for _, prompt, _ in jobs:
+                    yield prompt
+                continue
+            if self.remaining() == 0:
+                return
+            self.sleep(self.poll_interval)
+
+    def run_id_for(self, prompt: str) -> str:
+        """
+        Assign a prompt's result to the first held job for it that has none yet.
+
+        Used as the pipeline's run_id_for hook, so each result is keyed into
+        the ledger run of its own job.
+
+        Returns:
+            The job's ledger run id (JOB_RUN_ID if no job for the prompt is held)
+        """
+        with self.lock:
+            for job_id in self.held.get(prompt_hash(prompt), ()):
+                run_id = self.job_run_id(job_id)
+                if run_id not in self.assigned:
+                    self.assigned[run_id] = job_id
+                    return run_id
+        logger.warning(f"No held job for a result, storing it under run {JOB_RUN_ID}: {prompt}")
+        return JOB_RUN_ID
+
+    def _release(self, prompt: str, run_id: Optional[str] = None) -> Optional[int]:
+        """
+        Forget a held job and return its id.
+
+        With a run_id, only the job the result under that run was assigned to
+        is released; otherwise the first job held for the prompt.
+        """
+        key = prompt_hash(prompt)
+        with self.lock:
+            ids = self.held.get(key, [])
+            if run_id is not None:
+                job_id = self.assigned.pop(run_id, None)
+            elif ids:
+                job_id = ids[0]
+                self.assigned.pop(self.job_run_id(job_id), None)
+            else:
+                return None
+            if job_id not in ids:
+                return None
+            ids.remove(job_id)
+            if not ids:
+                del self.held[key]
+            return job_id
+
+    def settle(self, done: Iterable[str] = (), failed: Iterable[Tuple[str, str]] = ()):
+        """
+        Mark held jobs done, or failed with an error message.
+
+        Failed jobs go back in the queue until they run out of attempts.
+        """
+        self._settle_jobs(
+            [self._release(prompt) for prompt in done],
+            [(self._release(prompt), error) for prompt, error in failed]
+        )
+
+    def _settle_jobs(self, done_ids: List[Optional[int]], failed_ids: List[Tuple[Optional[int], str]]):
+        done_ids = [job_id for job_id in done_ids if job_id is not None]
+        failed_ids = [(job_id, error) for job_id, error in failed_ids if job_id is not None]
+        if not done_ids and not failed_ids:
+            return
+
+        def update_jobs(db):
+            if done_ids:
+                db.execute(update(ScrapeJob).where(ScrapeJob.id.in_(done_ids)).values(
+                    status='done', lease_owner=None, lease_expires_at=None, updated_at=func.now()
+                ))
+            for job_id, error in failed_ids:
+                db.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(
+                    status=case((ScrapeJob.attempts >= self.max_attempts, 'failed'), else_='queued'),
+                    lease_owner=None, lease_expires_at=None, last_error=error, updated_at=func.now()
+                ))
+
+        self._execute(update_jobs)
+        with self.lock:
+            self.stats['done'] += len(done_ids)
+            self.stats['failed'] += len(failed_ids)
+
+    def settle_records(self, records: List[Dict[str, Any]]):
+        """
+        Settle the jobs of a batch the pipeline has written; used as its on_written hook.
+
+        A job is marked done only if its result is now stored under the job's
+        own ledger run, whether by this batch or by an earlier lease of the
+        same job that was cut short before it could settle. Records stored
+        under no job's run settle nothing.
+        """
+        done, failed = [], []
+        for record in records:
+            job_id = self._release(record['prompt'], record.get('run_id'))
+            if record.get('failed'):
+                failed.append((job_id, 'no response'))
+            else:
+                done.append(job_id)
+        self._settle_jobs(done, failed)
+
+    def settle_dropped(self, records: List[Dict[str, Any]]):
+        """
+        Fail the jobs of records the pipeline could not store; used as its on_dropped hook.
+
+        Releasing them stops their heartbeat, and settling them puts them back
+        in the queue (or fails them), so the queue can still drain.
+        """
+        self._settle_jobs([], [(self._release(record['prompt'], record.get('run_id')), 'result was not stored')
+                               for record in records])
+
+    def start_heartbeat(self):
+        """Renew held leases in the background every third of the lease time."""
+        def beat():
+            while not self.stop_event.wait(self.lease_seconds / 3):
+                try:
+                    self.heartbeat()
+                except Exception as e:
+                    logger.warning(f"Job heartbeat failed: {e}")
+
+        self.heartbeat_thread = threading.Thread(target=beat, name="job-heartbeat", daemon=True)
+        self.heartbeat_thread.start()
+
+    def close(self):
+        """Stop claiming and heartbeating; unsettled leases expire on their own."""
+        self.stop_event.set()
+        if self.heartbeat_thread:
+            self.heartbeat_thread.join()
+            self.heartbeat_thread = None
+        logger.info(f"Job queue: {self.stats['claimed']} claimed, {self.stats['done']} done, "
+                    f"{self.stats['failed']} failed, {self.stats['requeued']} re-queued")
@@ -0,0 +1,113 @@
+"""
+Run ledger for checkpointed, resumable scrape runs.
+
+Every prompt of a run gets a ledger entry keyed by (run_id, prompt hash).
+The writer marks an entry completed in the same transaction that stores
+the response, so after a crash ``--resume`` skips exactly the prompts whose
+results were committed and retries everything else.
+"""
+import uuid
+import logging
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, Iterable, Iterator, Optional
+
+from app.models import PromptLedger
+from .utils import prompt_hash, LEDGER_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class RunLedger:
+    """Tracks which prompts of a run are pending, completed or failed."""
+
+    def __init__(self, session_factory: Callable, run_id: str):
+        """
+        Initialize the ledger for one run.
+
+        Args:
+            session_factory: Creates database sessions
+            run_id: Identifier of the run
+        """
+        self.session_factory = session_factory
+        self.run_id = run_id
+        self.skipped = 0
+
+    @staticmethod
+    def new_run_id() -> str:
+        """Create a sortable, unique run id."""
+        return f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+
+    @staticmethod
+    def latest_run_id(session_factory: Callable) -> Optional[str]:
+        """Return the id of the most recently started run, if any."""
+        db = session_factory()
+        try:
+            entry = db.query(PromptLedger.run_id).order_by(PromptLedger.id.desc()).first()
+            return entry.run_id if entry else None
+        finally:
+            db.close()
+
+    def pending(self, prompts: Iterable[str]) -> Iterator[str]:
+        """
+        Yield the prompts that still need scraping in this run.
+
+        Prompts are registered in the ledger chunk by chunk as they are read,
+        so the input can be a lazy iterator. Completed prompts and repeats
+        within a chunk are skipped. Only one chunk is held in memory, so a
+        repeat further apart may be scraped again; the ledger stores its
+        result once either way.
+        """
+        iterator = iter(prompts)
+        while True:
+            chunk = list(islice(iterator, LEDGER_CHUNK_SIZE))
+            if not chunk:
+                return
+
+            hashes = {}
+            for prompt in chunk:
+                key = prompt_hash(prompt)
+                if key in hashes:
+                    self.skipped += 1
+                    continue
+                hashes[key] = prompt
+
+            for key in self._register(hashes):
+                yield hashes[key]
+
+    def _register(self, hashes: dict) -> list:
+        """Insert entries for new prompts and return the hashes not yet completed."""
+        db = self.session_factory()
+        try:
+            existing = {
+                entry.prompt_hash: entry.status
+                for entry in db.query(PromptLedger.prompt_hash, PromptLedger.status).filter(
+                    PromptLedger.run_id == self.run_id,
+                    PromptLedger.prompt_hash.in_(list(hashes))
+                )
+            }
+            db.add_all(
+                PromptLedger(run_id=self.run_id, prompt_hash=key, prompt_text=prompt, status='pending')
+                for key, prompt in hashes.items() if key not in existing
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        completed = [key for key, status in existing.items() if status == 'completed']
+        self.skipped += len(completed)
+        return [key for key in hashes if existing.get(key) != 'completed']
+
+    def summary(self) -> dict:
+        """Count this run's entries by status."""
+        db = self.session_factory()
+        try:
+            counts = {'pending': 0, 'completed': 0, 'failed': 0}
+            for entry in db.query(PromptLedger.status).filter(PromptLedger.run_id == self.run_id):
+                counts[entry.status] = counts.get(entry.status, 0) + 1
+            return counts
+        finally:
+            db.close()
@@ -8,8 +8,16 @@ from pathlib import Path
 # Add the parent directory to the path so we can import app modules
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from sqlalchemy.orm import sessionmaker
+
+from app.database import create_engine_with_password
 from .chatgpt_scraper import ChatGPTScraper
-from .utils import load_prompts, parse_arguments
+from .job_queue import JobQueue
+from .ledger import RunLedger
+from .metrics import RunMetrics
+from .prompt_source import PromptSource, parse_shard
+from .recording import Replayer
+from .utils import parse_arguments
 
 
 def setup_logging():
@@ -24,6 +32,35 @@ def setup_logging():
     )
 
 
+def enqueue(password: str, prompts: PromptSource):
+    """Add prompts to the shared job queue for --queue workers."""
+    engine = create_engine_with_password(password)
+    try:
+        JobQueue(sessionmaker(autocommit=False, autoflush=False, bind=engine)).enqueue(prompts)
+    finally:
+        engine.dispose()
+
+
+def replay(args):
+    """Process recorded responses into the database without a browser."""
+    engine = create_engine_with_password(args.db_password)
+    metrics = RunMetrics()
+    try:
+        Replayer(
+            sessionmaker(autocommit=False, autoflush=False, bind=engine),
+            args.replay,
+            workers=args.replay_workers,
+            run_id=args.run_id or RunLedger.new_run_id(),
+            metrics=metrics
+        ).run()
+    finally:
+        engine.dispose()
+        if args.metrics_json:
+            metrics.write_json(args.metrics_json)
+        if args.metrics_prom:
+            metrics.write_prometheus(args.metrics_prom)
+
+
 def main():
     """Main function to run the scraper."""
     setup_logging()
@@ -33,21 +70,57 @@ def main():
         # Parse command line arguments
         args = parse_arguments()
         
-        # Load prompts
-        prompts = load_prompts()
-        if not prompts:
-            logger.error("No prompts loaded. Exiting.")
+        if args.replay:
+            replay(args)
+            return
+        
+        # Prompts are streamed from the file as the workers need them
+        if not args.queue and not Path(args.prompts).exists():
+            logger.error(f"Prompts file not found: {args.prompts}. Exiting.")
             sys.exit(1)
+        shard_index, shard_count = parse_shard(args.shard) if args.shard else (0, 1)
+        prompts = PromptSource(args.prompts, shard_index, shard_count)
+        
+        if args.enqueue:
+            enqueue(args.db_password, prompts)
+            return
         
         # Initialize scraper
         scraper = ChatGPTScraper(
             password=args.db_password,
-            delay=args.delay
+            delay=args.delay,
+            workers=args.workers,
+            url=args.url,
+            new_chat_every=args.new_chat_every,
+            max_dom_nodes=args.max_dom_nodes,
+            profile_dir=args.profile_dir,
+            keep_browser=args.keep_browser,
+            max_rate=args.max_rate,
+            min_delay=args.min_delay,
+            max_retries=args.max_retries,
+            run_id=args.run_id,
+            resume=args.resume,
+            cache_ttl=args.cache_ttl,
+            cache_size=args.cache_size,
+            queue=args.queue,
+            lease_seconds=args.lease_seconds,
+            metrics_json=args.metrics_json,
+            metrics_prom=args.metrics_prom,
+            max_restarts_per_hour=args.max_restarts_per_hour,
+            lean=args.lean,
+            lean_allow=args.lean_allow,
+            tabs=args.tabs,
+            max_browser_rss_mb=args.max_browser_rss,
+            recycle_browser_every=args.recycle_browser_every,
+            record_dir=args.record
         )
         
         try:
             # Process prompts
-            scraper.process_prompts(prompts)
+            if args.queue:
+                scraper.process_queue()
+            else:
+                scraper.process_prompts(prompts)
             logger.info("Scraping completed successfully!")
             
         finally:
@@ -0,0 +1,225 @@
+"""
+Per-stage timing for scraper runs.
+
+Workers and pipeline threads wrap each step of handling a prompt in
+RunMetrics.stage(), which records how long it took. At the end of a run the
+collected durations are summarized as p50/p95/p99 per stage, together with
+retry and failure counts, prompts per hour and sampled readings such as
+browser memory, and written as JSON and/or a Prometheus textfile.
+"""
+import json
+import math
+import os
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Iterator, List, Optional
+
+from .utils import METRICS_MAX_SAMPLES
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class StageTimings:
+    """Count, total and a bounded random sample of one stage's durations (or of a reading's values)."""
+
+    def __init__(self, max_samples: int, rng: random.Random):
+        self.max_samples = max_samples
+        self.rng = rng
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.last = 0.0
+        self.samples: List[float] = []
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+        if len(self.samples) < self.max_samples:
+            self.samples.append(seconds)
+        else:
+            # Reservoir sampling keeps percentiles representative on long runs
+            slot = self.rng.randrange(self.count)
+            if slot < self.max_samples:
+                self.samples[slot] = seconds
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'total': round(self.total, 6),
+            'mean': round(self.total / self.count, 6) if self.count else 0.0,
+            'p50': round(percentile(ordered, 0.50), 6),
+            'p95': round(percentile(ordered, 0.95), 6),
+            'p99': round(percentile(ordered, 0.99), 6),
+            'max': round(self.max, 6),
+        }
+
+    def reading_summary(self) -> Dict[str, float]:
+        stats = self.summary()
+        return {'count': self.count, 'last': round(self.last, 6), 'p50': stats['p50'], 'p95': stats['p95'],
+                'max': stats['max']}
+
+
+class RunMetrics:
+    """Thread-safe stage timings and event counters for one run."""
+
+    def __init__(self, max_samples: int = METRICS_MAX_SAMPLES, clock=time.perf_counter, wall_clock=time.time):
+        """
+        Initialize the collector.
+
+        Args:
+            max_samples: Durations kept per stage for percentiles
+            clock: Monotonic clock used for durations
+            wall_clock: Wall clock used for the run start time
+        """
+        self.max_samples = max_samples
+        self.clock = clock
+        self.started_at = wall_clock()
+        self.started = clock()
+        self.stages: Dict[str, StageTimings] = {}
+        self.readings: Dict[str, StageTimings] = {}
+        self.counters: Counter = Counter()
+        self.lock = threading.Lock()
+        self.rng = random.Random(0)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one occurrence of a stage; failures are timed too."""
+        start = self.clock()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(name, self.clock() - start, failed)
+
+    def observe(self, name: str, seconds: float, failed: bool = False):
+        """Record a duration measured elsewhere."""
+        with self.lock:
+            timings = self.stages.get(name)
+            if timings is None:
+                timings = self.stages[name] = StageTimings(self.max_samples, self.rng)
+            timings.add(seconds)
+            if failed:
+                timings.errors += 1
+
+    def sample(self, name: str, value: float):
+        """Record a reading such as browser memory in MB."""
+        with self.lock:
+            values = self.readings.get(name)
+            if values is None:
+                values = self.readings[name] = StageTimings(self.max_samples, self.rng)
+            values.add(value)
+
+    def increment(self, name: str, amount: int = 1):
+        """Count an event such as a retry or a failed prompt."""
+        with self.lock:
+            self.counters[name] += amount
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the run so far.
+
+        Returns:
+            Elapsed time, prompts per hour, event counters and per-stage statistics
+        """
+        with self.lock:
+            elapsed = self.clock() - self.started
+            prompts = self.counters['prompts']
+            return {
+                'started_at': self.started_at,
+                'elapsed_seconds': round(elapsed, 3),
+                'prompts': prompts,
+                'prompts_per_hour': round(prompts * 3600 / elapsed, 1) if elapsed > 0 else 0.0,
+                'retries': self.counters['retries'],
+                'failures': self.counters['failures'],
+                'counters': dict(sorted(self.counters.items())),
+                'stages': {name: timings.summary() for name, timings in sorted(self.stages.items())},
+                'readings': {name: values.reading_summary() for name, values in sorted(self.readings.items())},
+            }
+
+    def write_json(self, path: str):
+        """Write the summary as JSON."""
+        _write_atomically(path, json.dumps(self.summary(), indent=2) + "\n")
+
+    def write_prometheus(self, path: str):
+        """Write the summary in the Prometheus text format, for node_exporter's textfile collector."""
+        summary = self.summary()
+        lines = [
+            "# HELP scraper_stage_seconds Duration of each scraper stage.",
+            "# TYPE scraper_stage_seconds summary",
+        ]
+        for name, stats in summary['stages'].items():
+            for quantile in ('p50', 'p95', 'p99'):
+                lines.append(f'scraper_stage_seconds{{stage="{name}",quantile="0.{quantile[1:]}"}} {stats[quantile]}')
+            lines.append(f'scraper_stage_seconds_sum{{stage="{name}"}} {stats["total"]}')
+            lines.append(f'scraper_stage_seconds_count{{stage="{name}"}} {stats["count"]}')
+        lines += [
+            "# HELP scraper_events_total Prompts, retries, failures and other run events.",
+            "# TYPE scraper_events_total counter",
+        ]
+        lines += [f'scraper_events_total{{event="{name}"}} {count}' for name, count in summary['counters'].items()]
+        if summary['readings']:
+            lines += [
+                "# HELP scraper_reading Sampled readings such as browser memory (last and max value).",
+                "# TYPE scraper_reading gauge",
+            ]
+            for name, stats in summary['readings'].items():
+                lines.append(f'scraper_reading{{name="{name}",stat="last"}} {stats["last"]}')
+                lines.append(f'scraper_reading{{name="{name}",stat="max"}} {stats["max"]}')
+        lines += [
+            "# HELP scraper_prompts_per_hour Prompts processed per hour over the run.",
+            "# TYPE scraper_prompts_per_hour gauge",
+            f"scraper_prompts_per_hour {summary['prompts_per_hour']}",
+            "# HELP scraper_run_elapsed_seconds Seconds since the run started.",
+            "# TYPE scraper_run_elapsed_seconds gauge",
+            f"scraper_run_elapsed_seconds {summary['elapsed_seconds']}",
+        ]
+        _write_atomically(path, "\n".join(lines) + "\n")
+
+
+class NullMetrics:
+    """Stands in for RunMetrics when a component is used without instrumentation."""
+
+    def stage(self, name: str):
+        return nullcontext()
+
+    def observe(self, name: str, seconds: float, failed: bool = False):
+        pass
+
+    def sample(self, name: str, value: float):
+        pass
+
+    def increment(self, name: str, amount: int = 1):
+        pass
+
+
+NO_METRICS = NullMetrics()
+
+
+def _write_atomically(path: str, text: str):
+    """Replace a file in one step, so collectors never read a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def metrics_or_null(metrics: Optional[RunMetrics]):
+    """Return the collector, or a no-op one when there is none."""
+    return metrics if metrics is not None else NO_METRICS
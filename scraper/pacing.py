@@ -0,0 +1,163 @@
+"""
+Request pacing: rate limiting, backoff and adaptive delays.
+"""
+import random
+import threading
+import time
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+from .utils import (
+    PACING_MIN_DELAY, PACING_MAX_DELAY, PACING_MAX_BACKOFF,
+    PACING_SPEEDUP_AFTER, PACING_SPEEDUP_FACTOR, THROUGHPUT_WINDOW
+)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket capping the request rate across workers."""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep):
+        """
+        Initialize the token bucket.
+
+        Args:
+            rate_per_minute: Sustained number of requests allowed per minute
+            burst: Requests that may be sent back to back
+            clock: Monotonic clock, replaceable in tests
+            sleep: Sleep function, replaceable in tests
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """
+        Take one token, waiting until one is available.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+
+class PacingScheduler:
+    """
+    Decides how long a worker waits before each request and retry.
+
+    The delay between requests starts at ``base_delay``, shrinks after a run
+    of successes and doubles after a failure, staying within
+    [min_delay, max_delay]. An optional shared TokenBucket enforces the
+    overall rate target. Retries wait a jittered exponential backoff.
+    """
+
+    def __init__(self, base_delay: float, rate_limiter: Optional[TokenBucket] = None,
+                 min_delay: float = PACING_MIN_DELAY, max_delay: float = PACING_MAX_DELAY,
+                 max_backoff: float = PACING_MAX_BACKOFF, speedup_after: int = PACING_SPEEDUP_AFTER,
+                 speedup_factor: float = PACING_SPEEDUP_FACTOR,
+                 clock: Callable[[], float] = time.monotonic, sleep: Callable[[float], None] = time.sleep,
+                 rng: Optional[random.Random] = None):
+        """
+        Initialize the pacing scheduler.
+
+        Args:
+            base_delay: Starting delay between requests in seconds
+            rate_limiter: Shared token bucket for the overall request rate
+            min_delay: Lower bound for the adaptive delay
+            max_delay: Upper bound for the adaptive delay
+            max_backoff: Upper bound for a single retry backoff
+            speedup_after: Consecutive successes before the delay shrinks
+            speedup_factor: Multiplier applied to the delay on speed-up
+            clock: Monotonic clock, replaceable in tests
+            sleep: Sleep function, replaceable in tests
+            rng: Random generator used for jitter
+        """
+        self.base_delay = base_delay
+        self.min_delay = min(min_delay, base_delay)
+        self.max_delay = max(max_delay, base_delay)
+        self.max_backoff = max_backoff
+        self.speedup_after = speedup_after
+        self.speedup_factor = speedup_factor
+        self.rate_limiter = rate_limiter
+        self.clock = clock
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+
+        self.current_delay = base_delay
+        self.success_streak = 0
+        self.last_request_end: Optional[float] = None
+        self.completions = deque()
+
+    def wait_for_slot(self) -> float:
+        """
+        Wait until the next request may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        waited = 0.0
+        if self.last_request_end is not None:
+            remaining = self.current_delay - (self.clock() - self.last_request_end)
+            if remaining > 0:
+                self.sleep(remaining)
+                waited += remaining
+        if self.rate_limiter:
+            waited += self.rate_limiter.acquire()
+        return waited
+
+    def record_success(self):
+        """Note a successful request and speed up after a streak."""
+        now = self.clock()
+        self.last_request_end = now
+        self.completions.append(now)
+        self.success_streak += 1
+        if self.success_streak >= self.speedup_after:
+            self.success_streak = 0
+            self.current_delay = max(self.min_delay, self.current_delay * self.speedup_factor)
+
+    def record_failure(self):
+        """Note a failed request and slow down."""
+        self.last_request_end = self.clock()
+        self.success_streak = 0
+        self.current_delay = min(self.max_delay, max(self.current_delay * 2, self.base_delay))
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Jittered exponential backoff for the given retry attempt (1-based).
+
+        Half of the delay is fixed and half is random, so workers that fail
+        together do not retry in lockstep.
+        """
+        ceiling = min(self.max_backoff, self.base_delay * 2 * (2 ** (attempt - 1)))
+        return ceiling / 2 + self.rng.uniform(0, ceiling / 2)
+
+    def throughput(self) -> float:
+        """Completed requests per hour over the recent window."""
+        now = self.clock()
+        while self.completions and now - self.completions[0] > THROUGHPUT_WINDOW:
+            self.completions.popleft()
+        if not self.completions:
+            return 0.0
+        span = max(now - self.completions[0], self.current_delay, 1.0)
+        return len(self.completions) * 3600.0 / span
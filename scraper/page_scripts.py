@@ -0,0 +1,149 @@
+"""
+JavaScript snippets executed inside the ChatGPT page.
+"""
+
+# Installs a MutationObserver that tracks the assistant message created by
+# the next prompt. Must run before the prompt is sent so the current number
+# of assistant messages can serve as the baseline.
+#
+# Arguments: response selector, stop-button selector, quiet period (ms),
+# quiet period (ms) used when the stop button was never seen.
+INSTALL_COMPLETION_WATCHER = """
+const [responseSelector, stopSelector, quietMs, fallbackQuietMs] = arguments;
+if (window.__scraperWatcher) {
+    window.__scraperWatcher.observer.disconnect();
+}
+const watcher = {
+    baseline: document.querySelectorAll(responseSelector).length,
+    lastMutation: Date.now(),
+    sawStop: false,
+    done: false,
+    listeners: [],
+};
+watcher.check = function () {
+    const messages = document.querySelectorAll(responseSelector);
+    const generating = document.querySelector(stopSelector) !== null;
+    if (generating) {
+        watcher.sawStop = true;
+    }
+    const last = messages.length > watcher.baseline ? messages[messages.length - 1] : null;
+    const hasText = last !== null && last.innerText.trim().length > 0;
+    const quiet = Date.now() - watcher.lastMutation;
+    // Without a stop button to go by, insist on a longer silence
+    const needed = watcher.sawStop ? quietMs : fallbackQuietMs;
+    watcher.done = hasText && !generating && quiet >= needed;
+    return watcher.done;
+};
+watcher.observer = new MutationObserver(function () {
+    watcher.lastMutation = Date.now();
+    if (!watcher.sawStop && document.querySelector(stopSelector) !== null) {
+        watcher.sawStop = true;
+    }
+    watcher.listeners.forEach(function (listener) { listener(); });
+});
+watcher.observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+window.__scraperWatcher = watcher;
+return watcher.baseline;
+"""
+
+# Resolves as soon as the watcher reports the response complete, re-checking
+# a quiet period after every DOM mutation, or when the timeout expires.
+#
+# Arguments: timeout (ms), quiet period (ms).
+WAIT_FOR_COMPLETION = """
+const [timeoutMs, quietMs] = arguments;
+const callback = arguments[arguments.length - 1];
+const watcher = window.__scraperWatcher;
+if (!watcher) {
+    callback({status: 'missing'});
+    return;
+}
+let timer = null;
+let finished = false;
+const finish = function (status) {
+    if (finished) {
+        return;
+    }
+    finished = true;
+    clearTimeout(timer);
+    clearTimeout(deadline);
+    watcher.listeners = [];
+    if (status === 'done') {
+        watcher.observer.disconnect();
+    }
+    callback({status: status, sawStop: watcher.sawStop});
+};
+const schedule = function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+        if (watcher.check()) {
+            finish('done');
+        } else {
+            schedule();
+        }
+    }, quietMs);
+};
+const deadline = setTimeout(function () { finish('timeout'); }, timeoutMs);
+watcher.listeners.push(schedule);
+if (watcher.check()) {
+    finish('done');
+} else {
+    schedule();
+}
+"""
+
+# Reads the latest assistant message in a single round-trip.
+#
+# Arguments: response selector, stop-button selector.
+# Returns: {count, text, length, generating, done} where ``done`` is the
+# completion watcher's verdict (null when no watcher is installed).
+LATEST_RESPONSE = """
+const [responseSelector, stopSelector] = arguments;
+const messages = document.querySelectorAll(responseSelector);
+const last = messages.length ? messages[messages.length - 1] : null;
+const text = last !== null ? last.innerText : '';
+const watcher = window.__scraperWatcher;
+return {
+    count: messages.length,
+    text: text,
+    length: text.length,
+    generating: document.querySelector(stopSelector) !== null,
+    done: watcher ? watcher.check() : null,
+};
+"""
+
+# Fallback when no assistant message matches: returns the last text block of
+# at least ``minLength`` characters in the conversation area, truncated to
+# ``maxLength``, without shipping the page source back to Python.
+#
+# Arguments: minimum length, maximum length.
+LAST_TEXT_BLOCK = """
+const [minLength, maxLength] = arguments;
+const root = document.querySelector('main') || document.body;
+const blocks = root.querySelectorAll('article, [data-message-id], .markdown, p, li, div');
+for (let i = blocks.length - 1; i >= 0; i--) {
+    const text = (blocks[i].innerText || '').trim();
+    if (text.length >= minLength) {
+        return text.slice(0, maxLength);
+    }
+}
+return null;
+"""
+
+# Copies the finished assistant message for --record: its HTML and the text
+# the scraper extracted from it.
+#
+# Arguments: response selector.
+# Returns: {html, text}, or null when there is no assistant message.
+RESPONSE_SNAPSHOT = """
+const [responseSelector] = arguments;
+const messages = document.querySelectorAll(responseSelector);
+if (!messages.length) {
+    return null;
+}
+const last = messages[messages.length - 1];
+return {html: last.outerHTML, text: last.innerText};
+"""
+
+# Counts every element in the page, the measure conversation recycling uses.
+DOM_SIZE = "return document.getElementsByTagName('*').length;"
@@ -0,0 +1,268 @@
+"""
+Background analysis and persistence stages for scraped responses.
+
+Scraper workers hand each prompt/response pair to the pipeline and go
+straight back to the browser. An analysis thread extracts brand mentions
+and a writer thread saves the results in batched transactions. The stages
+are connected by bounded queues, so workers only wait when a queue is full.
+If the writer cannot open the database, handing over a result raises
+PipelineError, so workers stop instead of scraping prompts that would be
+thrown away.
+"""
+import queue
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+from .brand_analyzer import BrandAnalyzer
+from .data_processor import DatabaseManager
+from .metrics import RunMetrics, metrics_or_null
+from .response_cache import ResponseCache
+from .utils import (
+    prompt_hash, PIPELINE_ANALYZE_QUEUE_SIZE, PIPELINE_WRITE_QUEUE_SIZE, PIPELINE_BATCH_SIZE,
+    PIPELINE_BATCH_INTERVAL, PIPELINE_WRITE_RETRIES
+)
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class PipelineError(RuntimeError):
+    """Raised to producers once the pipeline can no longer store their results."""
+
+
+class ProcessingPipeline:
+    """Analyze and persist stages fed by scraper workers through bounded queues."""
+
+    def __init__(self, session_factory: Callable, brand_analyzer: Optional[BrandAnalyzer] = None,
+                 analyze_queue_size: int = PIPELINE_ANALYZE_QUEUE_SIZE,
+                 write_queue_size: int = PIPELINE_WRITE_QUEUE_SIZE,
+                 batch_size: int = PIPELINE_BATCH_SIZE, batch_interval: float = PIPELINE_BATCH_INTERVAL,
+                 manager_factory: Callable = DatabaseManager, run_id: Optional[str] = None,
+                 response_cache: Optional[ResponseCache] = None,
+                 on_written: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 on_dropped: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 run_id_for: Optional[Callable[[str], str]] = None, metrics: Optional[RunMetrics] = None):
+        """
+        Initialize the pipeline.
+
+        Args:
+            session_factory: Creates the writer's database session
+            brand_analyzer: Analyzer used by the analysis stage
+            analyze_queue_size: Responses waiting for analysis before submit blocks
+            write_queue_size: Analyzed records waiting to be written
+            batch_size: Maximum records per database transaction
+            batch_interval: Seconds the writer waits to fill a batch
+            manager_factory: Builds the DatabaseManager for the writer's session
+            run_id: Run whose ledger entries the writer updates
+            response_cache: Cache that learns each freshly scraped response
+            on_written: Called with each batch after it has been committed
+            on_dropped: Called with records that will never be written
+            run_id_for: Picks the ledger run of each prompt's record instead of run_id
+            metrics: Collector for analysis and write timings
+        """
+        self.session_factory = session_factory
+        self.brand_analyzer = brand_analyzer or BrandAnalyzer()
+        self.analyze_queue = queue.Queue(maxsize=analyze_queue_size)
+        self.write_queue = queue.Queue(maxsize=write_queue_size)
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.manager_factory = manager_factory
+        self.run_id = run_id
+        self.response_cache = response_cache
+        self.on_written = on_written
+        self.on_dropped = on_dropped
+        self.run_id_for = run_id_for
+        self.metrics = metrics_or_null(metrics)
+        self.threads: List[threading.Thread] = []
+        # Set when the writer cannot start; raised from submit() and close()
+        self.error: Optional[PipelineError] = None
+        self.stats = {'submitted': 0, 'written': 0, 'dropped': 0, 'batches': 0, 'blocked': 0}
+        self.stats_lock = threading.Lock()
+
+    def start(self):
+        """Start the analysis and writer threads."""
+        self.threads = [
+            threading.Thread(target=self._analyze_loop, name="pipeline-analyze", daemon=True),
+            threading.Thread(target=self._write_loop, name="pipeline-writer", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, record: Dict[str, Any]):
+        """
+        Queue a record with 'prompt' and 'response' keys for analysis.
+
+        Blocks only when the analysis queue is full (backpressure).
+
+        Raises:
+            PipelineError: If the writer could not start, so the record would be discarded
+        """
+        if self.error is not None:
+            raise self.error
+        if self.analyze_queue.full():
+            with self.stats_lock:
+                self.stats['blocked'] += 1
+            logger.warning("Processing pipeline is full, waiting for it to catch up...")
+        with self.metrics.stage('pipeline_submit'):
+            self.analyze_queue.put(record)
+        with self.stats_lock:
+            self.stats['submitted'] += 1
+
+    def process_prompt_response(self, prompt: str, response: str, cached: bool = False):
+        """
+        Queue a prompt-response pair; same interface as DataProcessor.
+
+        Args:
+            prompt: The original prompt
+            response: The ChatGPT response
+            cached: True if the response came from the response cache
+        """
+        if cached:
+            self.metrics.increment('cached')
+            self.submit(self._record(prompt, response=response, cached=True))
+            return
+        if self.response_cache is not None:
+            self.response_cache.put(prompt, response)
+        self.submit(self._record(prompt, response=response))
+
+    def record_failure(self, prompt: str):
+        """
+        Mark a prompt as failed in the run ledger.
+
+        Args:
+            prompt: The prompt that could not be scraped
+        """
+        if self.run_id:
+            self.submit(self._record(prompt, failed=True))
+
+    def _record(self, prompt: str, **fields) -> Dict[str, Any]:
+        """Build a pipeline record, keyed into the run ledger when there is a run."""
+        record = {'prompt': prompt, **fields}
+        if self.run_id:
+            record['run_id'] = self.run_id_for(prompt) if self.run_id_for else self.run_id
+            record['prompt_hash'] = prompt_hash(prompt)
+        return record
+
+    def close(self):
+        """
+        Drain both stages, write the remaining records and stop the threads.
+
+        Raises:
+            PipelineError: If the writer could not start
+        """
+        if not self.threads:
+            return
+        self.analyze_queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        logger.info(f"Pipeline finished: {self.stats['written']} written in {self.stats['batches']} batches, "
+                    f"{self.stats['dropped']} dropped, submit blocked {self.stats['blocked']} times")
+        if self.error is not None:
+            raise self.error
+
+    def _analyze_loop(self):
+        """Extract brand mentions for each queued response."""
+        while True:
+            record = self.analyze_queue.get()
+            if record is _STOP:
+                self.write_queue.put(_STOP)
+                return
+            if record.get('failed'):
+                self.write_queue.put(record)
+                continue
+            try:
+                with self.metrics.stage('analyze'):
+                    record['mentions'] = self.brand_analyzer.extract_brand_mentions(record['response'])
+                self.brand_analyzer.log_mentions(record['mentions'])
+                self.write_queue.put(record)
+            except Exception as e:
+                logger.error(f"Error analyzing response for prompt '{record['prompt'][:50]}': {e}")
+                self._drop([record])
+
+    def _write_loop(self):
+        """Group analyzed records into batches and write each in one transaction."""
+        try:
+            db_manager = self.manager_factory(self.session_factory())
+        except Exception as e:
+            logger.error(f"Pipeline writer could not open the database, discarding results: {e}")
+            self.error = PipelineError(f"Pipeline writer could not open the database: {e}")
+            self.error.__cause__ = e
+            self._discard_until_stop()
+            return
+        try:
+            stopping = False
+            while not stopping:
+                batch = []
+                record = self.write_queue.get()
+                if record is _STOP:
+                    break
+                batch.append(record)
+
+                # Keep filling the batch for a short while
+                deadline = time.monotonic() + self.batch_interval
+                while len(batch) < self.batch_size:
+                    remaining = deadline - time.monotonic()
+                    try:
+                        if remaining > 0:
+                            record = self.write_queue.get(timeout=remaining)
+                        else:
+                            # Past the deadline, only take what is already waiting
+                            record = self.write_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if record is _STOP:
+                        stopping = True
+                        break
+                    batch.append(record)
+
+                self._write_batch(db_manager, batch)
+        finally:
+            db_manager.close()
+
+    def _discard_until_stop(self):
+        """Keep taking records off the write queue so the analysis stage and workers never block on it."""
+        while True:
+            record = self.write_queue.get()
+            if record is _STOP:
+                return
+            self._drop([record])
+
+    def _drop(self, records: List[Dict[str, Any]]):
+        """Count records that will never be written and pass them to the on_dropped hook."""
+        with self.stats_lock:
+            self.stats['dropped'] += len(records)
+        self.metrics.increment('dropped', len(records))
+        if self.on_dropped is not None:
+            try:
+                self.on_dropped(records)
+            except Exception as e:
+                logger.error(f"Drop hook failed for {len(records)} records: {e}")
+
+    def _write_batch(self, db_manager: DatabaseManager, batch: List[Dict[str, Any]]):
+        """Write one batch, retrying transient database errors."""
+        for attempt in range(1, PIPELINE_WRITE_RETRIES + 1):
+            try:
+                with self.metrics.stage('db_write'):
+                    db_manager.save_prompt_responses(batch)
+                with self.stats_lock:
+                    self.stats['written'] += len(batch)
+                    self.stats['batches'] += 1
+                break
+            except Exception as e:
+                logger.error(f"Batch write failed (attempt {attempt}/{PIPELINE_WRITE_RETRIES}): {e}")
+                time.sleep(attempt)
+        else:
+            logger.error(f"Dropping {len(batch)} records after {PIPELINE_WRITE_RETRIES} failed writes")
+            self._drop(batch)
+            return
+        self.metrics.increment('written', len(batch))
+
+        if self.on_written is not None:
+            try:
+                self.on_written(batch)
+            except Exception as e:
+                logger.error(f"Post-write hook failed for a batch of {len(batch)}: {e}")
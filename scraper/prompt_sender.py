@@ -3,12 +3,18 @@ Prompt sending functionality for ChatGPT scraper.
 """
 import time
 import logging
+from typing import Optional
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import StaleElementReferenceException
+from selenium.common.exceptions import WebDriverException
 
-from .utils import CHATGPT_RESPONSE_SELECTOR, MIN_WAIT_TIME, MAX_WAIT_TIME, TEXT_CHECK_INTERVAL
+from .metrics import RunMetrics, metrics_or_null
+from .page_scripts import INSTALL_COMPLETION_WATCHER, WAIT_FOR_COMPLETION
+from .utils import (
+    CHATGPT_RESPONSE_SELECTOR, CHATGPT_STOP_BUTTON_SELECTOR, MIN_WAIT_TIME, MAX_WAIT_TIME,
+    TEXT_CHECK_INTERVAL, COMPLETION_QUIET_PERIOD, COMPLETION_FALLBACK_QUIET_PERIOD
+)
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +22,10 @@ logger = logging.getLogger(__name__)
 class PromptSender:
     """Handles sending prompts to ChatGPT and waiting for responses."""
     
-    def __init__(self, driver):
-        """Initialize prompt sender with browser driver."""
+    def __init__(self, driver, metrics: Optional[RunMetrics] = None):
+        """Initialize prompt sender with browser driver and an optional stage timer."""
         self.driver = driver
+        self.metrics = metrics_or_null(metrics)
     
     def send_prompt(self, prompt: str) -> str:
         """
@@ -30,73 +37,138 @@ class PromptSender:
         Returns:
             The response text from ChatGPT
         """
-        # Wait for the input area to be available
-        wait = WebDriverWait(self.driver, 10)
-        input_div = wait.until(EC.presence_of_element_located((By.ID, 'prompt-textarea')))
-        
-        # Clear any existing content and type the prompt
-        input_div.clear()
-        input_div.send_keys(prompt)
-        logger.info(f"Sent prompt: {prompt[:50]}...")
-        
-        # Press Enter to send
-        input_div.send_keys('\n')
-        
-        # Wait for response to start appearing
-        time.sleep(4)
-        
-        # Wait for response to complete (look for the assistant response)
-        wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, CHATGPT_RESPONSE_SELECTOR)))
+        self.submit(prompt)
         
         # Wait for ChatGPT to finish typing
         logger.info("Waiting for ChatGPT to finish typing...")
-        start_time = time.time()
+        with self.metrics.stage('wait_for_completion'):
+            if not self._wait_for_completion():
+                self.metrics.increment('completion_fallbacks')
+                self._wait_for_stable_text()
         
-        while time.time() - start_time < MAX_WAIT_TIME:
-            try:
-                # Retry up to 3 times for StaleElementReferenceException
-                for attempt in range(3):
-                    try:
-                        response_elements = self.driver.find_elements(By.CSS_SELECTOR, CHATGPT_RESPONSE_SELECTOR)
-                        if response_elements:
-                            last_response = response_elements[-1]
-                            current_text = last_response.text
-                            time.sleep(TEXT_CHECK_INTERVAL)
-                            new_text = last_response.text
-                            if time.time() - start_time >= MIN_WAIT_TIME:
-                                if current_text == new_text:
-                                    logger.info("ChatGPT finished typing")
-                                    break
-                                else:
-                                    logger.info("ChatGPT is still typing, waiting...")
-                                    continue
-                            else:
-                                logger.info(f"Waiting minimum time... ({int(time.time() - start_time)}s/{MIN_WAIT_TIME}s)")
-                                continue
-                        break  # If no exception, break retry loop
-                    except StaleElementReferenceException as se:
-                        logger.warning(f"StaleElementReferenceException (attempt {attempt+1}/3): {se}")
-                        if attempt == 2:
-                            raise
-                        time.sleep(1)
-                else:
-                    # If we exhausted retries, break outer loop
-                    break
-            except Exception as e:
-                logger.warning(f"Error checking typing status: {e}")
-                break
+        return self.collect()
+    
+    def submit(self, prompt: str):
+        """
+        Type a prompt into the current tab and send it without waiting for the answer.
         
-        # Wait a bit more for the full response
-        time.sleep(3)
+        Args:
+            prompt: The prompt to send
+        """
+        # Wait for the input area to be available
+        with self.metrics.stage('wait_for_input'):
+            wait = WebDriverWait(self.driver, 10)
+            input_div = wait.until(EC.presence_of_element_located((By.ID, 'prompt-textarea')))
+        
+        with self.metrics.stage('type_prompt'):
+            # Start watching for the new assistant message before sending
+            self._install_completion_watcher()
+            
+            # Clear any existing content and type the prompt
+            input_div.clear()
+            input_div.send_keys(prompt)
+            logger.info(f"Sent prompt: {prompt[:50]}...")
+            
+            # Press Enter to send
+            input_div.send_keys('\n')
+    
+    def is_complete(self) -> bool:
+        """
+        Check once, without blocking, whether the current tab's response has finished.
+        
+        Returns:
+            True if the completion watcher reports the response done
+        """
+        from .response_handler import ResponseExtractor
+        return bool(ResponseExtractor(self.driver).fetch_latest().get('done'))
+    
+    def collect(self) -> str:
+        """
+        Extract the finished response from the current tab.
         
+        Returns:
+            The response text from ChatGPT
+        """
         # Extract the response
         from .response_handler import ResponseExtractor
         extractor = ResponseExtractor(self.driver)
-        response = extractor.extract_response()
+        with self.metrics.stage('extract_response'):
+            response = extractor.extract_response()
         
         # Validate response - if empty or too short, raise exception to trigger retry
         if not response or len(response.strip()) < 50:
             logger.warning(f"Received empty or too short response: '{response[:100]}...'")
             raise Exception("Empty or invalid response received from ChatGPT")
         
-        return response 
\ No newline at end of file
+        return response
+    
+    def _install_completion_watcher(self):
+        """Install the in-page observer that detects when the next response is done."""
+        try:
+            self.driver.execute_script(
+                INSTALL_COMPLETION_WATCHER,
+                CHATGPT_RESPONSE_SELECTOR,
+                CHATGPT_STOP_BUTTON_SELECTOR,
+                int(COMPLETION_QUIET_PERIOD * 1000),
+                int(COMPLETION_FALLBACK_QUIET_PERIOD * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"Could not install completion watcher: {e}")
+    
+    def _wait_for_completion(self) -> bool:
+        """
+        Block until the page reports the response as finished.
+        
+        Returns:
+            True if completion was detected or the wait timed out,
+            False if the watcher is unavailable and polling is needed
+        """
+        start_time = time.time()
+        try:
+            self.driver.set_script_timeout(MAX_WAIT_TIME + 5)
+            result = self.driver.execute_async_script(
+                WAIT_FOR_COMPLETION,
+                MAX_WAIT_TIME * 1000,
+                int(COMPLETION_QUIET_PERIOD * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"Completion watcher failed, falling back to polling: {e}")
+            return False
+        
+        status = (result or {}).get('status')
+        elapsed = time.time() - start_time
+        if status == 'done':
+            logger.info(f"ChatGPT finished typing ({elapsed:.1f}s)")
+            return True
+        if status == 'timeout':
+            logger.warning(f"No completion signal after {MAX_WAIT_TIME}s, extracting what is there")
+            return True
+        logger.warning("Completion watcher missing (page reloaded?), falling back to polling")
+        return False
+    
+    def _wait_for_stable_text(self):
+        """Fallback: poll the last response until its text stops changing."""
+        from .response_handler import ResponseExtractor
+        extractor = ResponseExtractor(self.driver)
+        
+        start_time = time.time()
+        previous_text = None
+        
+        while time.time() - start_time < MAX_WAIT_TIME:
+            try:
+                latest = extractor.fetch_latest()
+            except WebDriverException as e:
+                logger.warning(f"Error checking typing status: {e}")
+                break
+            
+            current_text = latest.get('text') or ''
+            if time.time() - start_time >= MIN_WAIT_TIME:
+                if current_text and current_text == previous_text and not latest.get('generating'):
+                    logger.info("ChatGPT finished typing")
+                    return
+                logger.info("ChatGPT is still typing, waiting...")
+            else:
+                logger.info(f"Waiting minimum time... ({int(time.time() - start_time)}s/{MIN_WAIT_TIME}s)")
+            
+            previous_text = current_text
+            time.sleep(TEXT_CHECK_INTERVAL)
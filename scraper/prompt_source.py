@@ -0,0 +1,168 @@
+"""
+Streaming prompt files.
+
+Reads prompts from a JSON array or a JSONL file one at a time, so memory
+use does not depend on the size of the file and scraping can start before
+the file has been read. Entries may be plain strings or objects with a
+"prompt" key. With sharding, every process reading the same file takes
+every n-th prompt, so several scrapers can split one file without
+coordinating.
+"""
+import json
+import logging
+import re
+from itertools import chain
+from pathlib import Path
+from typing import IO, Any, Iterator, Tuple
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 64 * 1024  # Characters read from the file at a time
+
+# Characters that can carry on a number the decoder has stopped early, as it
+# does at a trailing '.' or exponent
+NUMBER_TAIL = re.compile(r'[0-9.eE+-]+')
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """
+    Parse a shard spec such as "2/4" (the second of four shards).
+
+    Returns:
+        The 0-based shard index and the shard count
+    """
+    try:
+        index, count = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/n, got {value!r}")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Shard {value!r} is out of range (expected 1 <= i <= n)")
+    return index - 1, count
+
+
+class PromptSource:
+    """Lazily reads the prompts of one shard of a JSON or JSONL file."""
+
+    def __init__(self, path: str, shard_index: int = 0, shard_count: int = 1):
+        """
+        Initialize the prompt source.
+
+        Args:
+            path: JSON array or JSONL file of prompts
+            shard_index: 0-based shard this process takes
+            shard_count: Number of shards the file is split into
+        """
+        self.path = Path(path)
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for position, entry in enumerate(self._entries(f)):
+                if position % self.shard_count != self.shard_index:
+                    continue
+                prompt = self._prompt_text(entry, position)
+                if prompt:
+                    self.read += 1
+                    yield prompt
+        logger.info(f"Read {self.read} prompts from {self.path}"
+                    + (f" (shard {self.shard_index + 1}/{self.shard_count})" if self.shard_count > 1 else ""))
+
+    def _entries(self, f: IO[str]) -> Iterator[Any]:
+        """Yield the raw JSON values of the file."""
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        if first == '[':
+            yield from _iter_json_array(f)
+        elif first:
+            yield from _iter_json_lines(first + f.readline(), f)
+
+    @staticmethod
+    def _prompt_text(entry: Any, position: int) -> str:
+        if isinstance(entry, str):
+            return entry.strip()
+        if isinstance(entry, dict) and isinstance(entry.get('prompt'), str):
+            return entry['prompt'].strip()
+        logger.warning(f"Skipping entry {position + 1}: expected a string or an object with a 'prompt' key")
+        return ''
+
+
+def _iter_json_lines(first_line: str, f: IO[str]) -> Iterator[Any]:
+    """Decode one JSON value per non-blank line."""
+    for number, line in enumerate(chain([first_line], f), 1):
+        if line.strip():
+            yield _decode_line(line, number)
+
+
+def _decode_line(line: str, number: int) -> Any:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON on line {number}: {e}") from None
+
+
+def _iter_json_array(f: IO[str]) -> Iterator[Any]:
+    """Decode the elements of a JSON array whose opening bracket was already read."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    pos = 0
+    eof = False
+
+    def fill() -> bool:
+        """Read more of the file, dropping what has been consumed; False at end of file."""
+        nonlocal buffer, pos, eof
+        if eof:
+            return False
+        chunk = f.read(READ_SIZE)
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        eof = not chunk
+        return not eof
+
+    def next_char() -> str:
+        """Skip whitespace and return the next character without consuming it."""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos].isspace():
+                pos += 1
+            if pos < len(buffer):
+                return buffer[pos]
+            if not fill():
+                raise ValueError("Unexpected end of file inside the JSON array")
+
+    expect_value = True
+    while True:
+        char = next_char()
+        if char == ']':
+            return
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f"Expected ',' or ']' in the JSON array, got {char!r}")
+            pos += 1
+            expect_value = True
+            continue
+
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # A value that runs to the end of the buffer may continue in the next
+                # read, and so may a number cut off at its '.' or exponent ("23." + "5")
+                if eof or (end < len(buffer) and not _number_cut_off(value, buffer, end)):
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            fill()
+            if eof and pos >= len(buffer):
+                raise ValueError("Unexpected end of file inside the JSON array")
+        pos = end
+        expect_value = False
+        yield value
+
+
+def _number_cut_off(value: Any, buffer: str, end: int) -> bool:
+    """Whether a decoded number is followed only by characters that could continue it up to the end of the buffer."""
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and NUMBER_TAIL.fullmatch(buffer, end) is not None)
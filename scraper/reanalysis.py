@@ -0,0 +1,231 @@
+"""
+Re-analysis backfill over stored responses.
+
+Streams responses out of the prompts table with a server-side cursor,
+spreads brand matching across a process pool and replaces each chunk's
+brand_mentions rows in one transaction. The brand summaries and rollups
+are adjusted by the difference between the old and new rows, so they stay
+consistent without a full rebuild. Chunks are committed in prompt id order,
+so an interrupted run can be restarted with --start-id.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.aggregates import add_brand_totals, add_mention_rollups, bucket_start
+from app.database import create_engine_with_password
+from app.models import BrandMention, Prompt
+from .brand_analyzer import BrandAnalyzer
+from .utils import BRANDS, REANALYZE_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Brand analyzer of a pool worker process, built once by _init_worker
+_worker_analyzer: Optional[BrandAnalyzer] = None
+
+
+def _init_worker(brands: List[str]):
+    global _worker_analyzer
+    _worker_analyzer = BrandAnalyzer(brands)
+
+
+def _analyze_chunk(rows: List[Tuple[int, str]]) -> List[Tuple[int, Dict[str, int]]]:
+    """Count brand mentions for (prompt_id, response_text) rows in a worker process."""
+    return [(prompt_id, _worker_analyzer.extract_brand_mentions(text or '')) for prompt_id, text in rows]
+
+
+class Reanalyzer:
+    """Recomputes brand_mentions for a range of stored responses."""
+
+    def __init__(self, session_factory: Callable, brands: Optional[List[str]] = None,
+                 workers: Optional[int] = None, chunk_size: int = REANALYZE_CHUNK_SIZE,
+                 start_id: Optional[int] = None, end_id: Optional[int] = None):
+        """
+        Initialize the re-analysis.
+
+        Args:
+            session_factory: Creates database sessions
+            brands: Brands to match (defaults to BRANDS)
+            workers: Analyzer processes (defaults to the CPU count; 1 runs inline)
+            chunk_size: Prompts per analysis task and per transaction
+            start_id: First prompt id to process (inclusive)
+            end_id: Last prompt id to process (inclusive)
+        """
+        self.session_factory = session_factory
+        self.brands = brands or BRANDS
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.start_id = start_id
+        self.end_id = end_id
+        self.stats = {'prompts': 0, 'removed': 0, 'added': 0, 'chunks': 0}
+
+    def run(self) -> dict:
+        """
+        Re-analyze every prompt in the id range.
+
+        Returns:
+            Counts of prompts processed and mention rows removed and added
+        """
+        started = time.perf_counter()
+        reader = self.session_factory()
+        writer = self.session_factory()
+        try:
+            chunks = self._read_chunks(reader)
+            if self.workers == 1:
+                analyzer = BrandAnalyzer(self.brands)
+                for rows in chunks:
+                    results = [
+                        (prompt_id, analyzer.extract_brand_mentions(text or '')) for prompt_id, text, _ in rows
+                    ]
+                    self._apply_chunk(writer, rows, results)
+            else:
+                self._run_pool(writer, chunks)
+        finally:
+            reader.close()
+            writer.close()
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Re-analyzed {self.stats['prompts']} prompts in {elapsed:.1f}s "
+                    f"({self.stats['prompts'] / max(elapsed, 1e-9):.0f}/s): "
+                    f"{self.stats['removed']} mention rows removed, {self.stats['added']} added")
+        return self.stats
+
+    def _run_pool(self, writer, chunks):
+        """Analyze chunks in a process pool, applying results in id order."""
+        in_flight = deque()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.brands,)) as pool:
+            for rows in chunks:
+                texts = [(prompt_id, text) for prompt_id, text, _ in rows]
+                in_flight.append((rows, pool.submit(_analyze_chunk, texts)))
+                # Keep a couple of chunks queued per worker to bound memory
+                if len(in_flight) >= self.workers * 2:
+                    rows, future = in_flight.popleft()
+                    self._apply_chunk(writer, rows, future.result())
+            while in_flight:
+                rows, future = in_flight.popleft()
+                self._apply_chunk(writer, rows, future.result())
+
+    def _read_chunks(self, reader):
+        """Stream (id, response_text, created_at) rows in id order, chunk by chunk."""
+        query = select(Prompt.id, Prompt.response_text, Prompt.created_at).order_by(Prompt.id)
+        if self.start_id is not None:
+            query = query.where(Prompt.id >= self.start_id)
+        if self.end_id is not None:
+            query = query.where(Prompt.id <= self.end_id)
+
+        if reader.get_bind().dialect.supports_server_side_cursors:
+            result = reader.execute(query.execution_options(stream_results=True, yield_per=self.chunk_size))
+            for partition in result.partitions():
+                yield [tuple(row) for row in partition]
+            return
+
+        # Without server-side cursors (SQLite) an open cursor would block the
+        # writer's commits, so page through the ids instead
+        last_id = None
+        while True:
+            page = query if last_id is None else query.where(Prompt.id > last_id)
+            rows = [tuple(row) for row in reader.execute(page.limit(self.chunk_size))]
+            reader.rollback()
+            if not rows:
+                return
+            yield rows
+            last_id = rows[-1][0]
+
+    def _apply_chunk(self, writer, rows, results):
+        """Replace one chunk's mention rows and adjust the aggregates by the difference."""
+        prompt_ids = [prompt_id for prompt_id, _, _ in rows]
+        created = {prompt_id: created_at for prompt_id, _, created_at in rows}
+        try:
+            removed = writer.execute(
+                delete(BrandMention).where(BrandMention.prompt_id.in_(prompt_ids)).returning(
+                    BrandMention.brand_name, BrandMention.mention_count, BrandMention.created_at
+                )
+            ).all()
+
+            # Signed changes per hour bucket and brand
+            deltas = defaultdict(Counter)
+            for row in removed:
+                if row.mention_count and row.created_at is not None:
+                    deltas[bucket_start(row.created_at, 'hour')][row.brand_name] -= row.mention_count
+
+            new_rows = []
+            for prompt_id, mentions in results:
+                for brand, count in mentions.items():
+                    if count > 0:
+                        new_rows.append({'prompt_id': prompt_id, 'brand_name': brand,
+                                         'mention_count': count, 'created_at': created[prompt_id]})
+                        if created[prompt_id] is not None:
+                            deltas[bucket_start(created[prompt_id], 'hour')][brand] += count
+            if new_rows:
+                writer.execute(insert(BrandMention), new_rows)
+
+            totals = Counter()
+            for hour, changes in sorted(deltas.items()):
+                add_mention_rollups(writer, changes, hour)
+                totals.update(changes)
+            add_brand_totals(writer, totals)
+
+            writer.commit()
+        except Exception:
+            writer.rollback()
+            raise
+
+        self.stats['prompts'] += len(rows)
+        self.stats['removed'] += len(removed)
+        self.stats['added'] += len(new_rows)
+        self.stats['chunks'] += 1
+        logger.info(f"Re-analyzed prompts up to id {prompt_ids[-1]} ({self.stats['prompts']} so far)")
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Re-analyze stored responses')
+    parser.add_argument('--db-password', type=str, required=True, help='Database password')
+    parser.add_argument('--brands', type=str, default=None,
+                        help='Comma-separated brands to match (default: the scraper brand list)')
+    parser.add_argument('--workers', type=int, default=None, help='Analyzer processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=REANALYZE_CHUNK_SIZE,
+                        help='Prompts per analysis task and transaction')
+    parser.add_argument('--start-id', type=int, default=None, help='First prompt id (to resume a run)')
+    parser.add_argument('--end-id', type=int, default=None, help='Last prompt id')
+    return parser.parse_args()
+
+
+def main():
+    """Main function to run the re-analysis."""
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    args = parse_arguments()
+
+    engine = create_engine_with_password(args.db_password)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    brands = [brand.strip().lower() for brand in args.brands.split(',')] if args.brands else None
+
+    try:
+        Reanalyzer(
+            session_factory,
+            brands=brands,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            start_id=args.start_id,
+            end_id=args.end_id
+        ).run()
+    except KeyboardInterrupt:
+        logger.info("Re-analysis interrupted; restart with --start-id after the last id logged")
+        sys.exit(1)
+    except Exception as e:
+        logger.error(f"Re-analysis failed: {e}")
+        sys.exit(1)
+    finally:
+        engine.dispose()
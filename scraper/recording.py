@@ -0,0 +1,241 @@
+"""
+Recording scraped responses and replaying them offline.
+
+With --record DIR, every finished assistant message is appended to a JSONL
+file in DIR together with its prompt, the extracted text and how long the
+answer took. --replay DIR later feeds those recordings through the same
+HTML-to-text extraction, brand analysis and batched database writes as a
+live run, spread across a process pool, with no browser involved. That makes
+historic captures cheap to re-process and gives a reproducible workload for
+profiling everything after the browser.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .brand_analyzer import BrandAnalyzer
+from .data_processor import DatabaseManager
+from .metrics import RunMetrics, metrics_or_null
+from .response_handler import ResponseExtractor
+from .utils import BRANDS, REPLAY_CHUNK_SIZE, prompt_hash
+
+logger = logging.getLogger(__name__)
+
+# Brand analyzer of a pool worker process, built once by _init_worker
+_worker_analyzer: Optional[BrandAnalyzer] = None
+
+
+class ResponseRecorder:
+    """Appends finished responses to a JSONL file; shared by all workers of a run."""
+
+    def __init__(self, directory: str, run_id: Optional[str] = None):
+        """
+        Initialize the recorder.
+
+        Args:
+            directory: Directory the recordings are written to (created if missing)
+            run_id: Run the recordings belong to, used in the file name
+        """
+        self.directory = Path(directory)
+        self.path = self.directory / f"{run_id or 'run'}-{os.getpid()}.jsonl"
+        self.file = None
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, prompt: str, html: str, text: str, seconds: float):
+        """
+        Append one response.
+
+        Args:
+            prompt: The prompt that was sent
+            html: Outer HTML of the finished assistant message
+            text: Response text extracted during the run
+            seconds: Time from sending the prompt to collecting the answer
+        """
+        line = json.dumps({
+            'prompt': prompt,
+            'html': html,
+            'text': text,
+            'seconds': round(seconds, 3),
+            'recorded_at': time.time(),
+        }, ensure_ascii=False)
+        with self.lock:
+            if self.file is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(line + "\n")
+            # Keep what was captured even if the run is killed
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+                logger.info(f"Recorded {self.count} responses to {self.path}")
+
+
+def iter_recordings(directory: str) -> Iterator[Dict[str, Any]]:
+    """
+    Read every recording in a directory, file by file in name order.
+
+    Raises:
+        FileNotFoundError: If the directory does not exist
+    """
+    root = Path(directory)
+    if not root.is_dir():
+        raise FileNotFoundError(f"Recordings directory not found: {directory}")
+    for path in sorted(root.glob('*.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    recording = json.loads(line)
+                except json.JSONDecodeError as e:
+                    # A run killed mid-write leaves a partial last line
+                    logger.warning(f"Skipping unreadable recording {path.name}:{line_number}: {e}")
+                    continue
+                if recording.get('prompt'):
+                    yield recording
+
+
+def _init_worker(brands: List[str]):
+    global _worker_analyzer
+    _worker_analyzer = BrandAnalyzer(brands)
+
+
+def _replay_chunk(recordings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, float]:
+    """Extract and analyze recordings in a worker process; returns records, unusable count and seconds taken."""
+    return replay_recordings(_worker_analyzer, recordings)
+
+
+def replay_recordings(analyzer: BrandAnalyzer,
+                      recordings: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int, float]:
+    """
+    Turn recordings into records ready for DatabaseManager.save_prompt_responses.
+
+    Returns:
+        The records, the number of recordings without a usable response, and seconds taken
+    """
+    start = time.perf_counter()
+    records = []
+    unusable = 0
+    for recording in recordings:
+        try:
+            response = ResponseExtractor.extract_from_html(recording.get('html', ''), recording.get('text', ''))
+        except Exception:
+            unusable += 1
+            continue
+        records.append({
+            'prompt': recording['prompt'],
+            'response': response,
+            'mentions': analyzer.extract_brand_mentions(response),
+        })
+    return records, unusable, time.perf_counter() - start
+
+
+class Replayer:
+    """Re-processes recorded responses without a browser."""
+
+    def __init__(self, session_factory: Callable, directory: str, brands: Optional[List[str]] = None,
+                 workers: Optional[int] = None, chunk_size: int = REPLAY_CHUNK_SIZE,
+                 run_id: Optional[str] = None, metrics: Optional[RunMetrics] = None):
+        """
+        Initialize the replay.
+
+        Args:
+            session_factory: Creates the writer's database session
+            directory: Directory of recordings made with --record
+            brands: Brands to match (defaults to BRANDS)
+            workers: Extraction and analysis processes (defaults to the CPU count; 1 runs inline)
+            chunk_size: Recordings per analysis task and per transaction
+            run_id: Ledger run the results are stored under; replaying into the
+                same run again stores nothing twice
+            metrics: Collector for chunk and write timings
+        """
+        self.session_factory = session_factory
+        self.directory = directory
+        self.brands = brands or BRANDS
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.run_id = run_id
+        self.metrics = metrics_or_null(metrics)
+        self.stats = {'recordings': 0, 'analyzed': 0, 'unusable': 0, 'chunks': 0}
+
+    def run(self) -> dict:
+        """
+        Replay every recording in the directory.
+
+        Returns:
+            Counts of recordings read, analyzed and unusable, and chunks written
+        """
+        started = time.perf_counter()
+        db_manager = DatabaseManager(self.session_factory())
+        try:
+            chunks = self._read_chunks()
+            if self.workers == 1:
+                analyzer = BrandAnalyzer(self.brands)
+                for recordings in chunks:
+                    self._write_chunk(db_manager, len(recordings), replay_recordings(analyzer, recordings))
+            else:
+                self._run_pool(db_manager, chunks)
+        finally:
+            db_manager.close()
+
+        elapsed = time.perf_counter() - started
+        logger.info(f"Replayed {self.stats['recordings']} recordings in {elapsed:.1f}s "
+                    f"({self.stats['recordings'] / max(elapsed, 1e-9):.0f}/s): "
+                    f"{self.stats['analyzed']} analyzed, {self.stats['unusable']} without a usable response")
+        return self.stats
+
+    def _run_pool(self, db_manager: DatabaseManager, chunks):
+        """Extract and analyze chunks in a process pool, writing results in recording order."""
+        in_flight = deque()
+        with ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.brands,)) as pool:
+            for recordings in chunks:
+                in_flight.append((len(recordings), pool.submit(_replay_chunk, recordings)))
+                # Keep a couple of chunks queued per worker to bound memory
+                if len(in_flight) >= self.workers * 2:
+                    count, future = in_flight.popleft()
+                    self._write_chunk(db_manager, count, future.result())
+            while in_flight:
+                count, future = in_flight.popleft()
+                self._write_chunk(db_manager, count, future.result())
+
+    def _read_chunks(self) -> Iterator[List[Dict[str, Any]]]:
+        chunk = []
+        for recording in iter_recordings(self.directory):
+            chunk.append(recording)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _write_chunk(self, db_manager: DatabaseManager, count: int,
+                     result: Tuple[List[Dict[str, Any]], int, float]):
+        """Store one chunk's records in one transaction."""
+        records, unusable, seconds = result
+        self.metrics.observe('replay_chunk', seconds)
+        if self.run_id:
+            for record in records:
+                record['run_id'] = self.run_id
+                record['prompt_hash'] = prompt_hash(record['prompt'])
+        with self.metrics.stage('db_write'):
+            db_manager.save_prompt_responses(records)
+        self.metrics.increment('prompts', len(records))
+        self.metrics.increment('unusable', unusable)
+
+        self.stats['recordings'] += count
+        self.stats['analyzed'] += len(records)
+        self.stats['unusable'] += unusable
+        self.stats['chunks'] += 1
+        logger.info(f"Replayed {self.stats['recordings']} recordings so far")
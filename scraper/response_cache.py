@@ -0,0 +1,117 @@
+"""
+Response cache for skipping prompts that were scraped recently.
+
+Lookups go to a small in-memory LRU first and then to the database, where
+the run ledger links each prompt hash to its stored response. Entries older
+than the TTL are ignored in both places. Only freshly scraped responses count
+in the database, so reusing a response never extends its lifetime.
+"""
+import time
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from app.models import Prompt, PromptLedger
+from .utils import prompt_hash, CACHE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class ResponseCache:
+    """TTL and size-bounded cache of responses keyed by normalized prompt hash."""
+
+    def __init__(self, session_factory: Optional[Callable], ttl: float, max_size: int = CACHE_MAX_SIZE,
+                 clock: Callable[[], float] = time.time):
+        """
+        Initialize the response cache.
+
+        Args:
+            session_factory: Creates database sessions for the persistent tier (None for memory only)
+            ttl: Seconds a response stays fresh
+            max_size: Responses kept in memory before the least recently used is evicted
+            clock: Wall clock in seconds, replaceable in tests
+        """
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, prompt: str) -> Optional[str]:
+        """
+        Return a fresh cached response for the prompt, if there is one.
+
+        Args:
+            prompt: The prompt about to be sent
+        """
+        key = prompt_hash(prompt)
+        response = self._get_memory(key)
+        if response is None and self.session_factory is not None:
+            response, stored_at = self._get_database(key)
+            if response is not None:
+                self._put_memory(key, response, stored_at)
+
+        with self.lock:
+            self.stats['hits' if response is not None else 'misses'] += 1
+        return response
+
+    def put(self, prompt: str, response: str):
+        """
+        Remember a freshly scraped response.
+
+        Args:
+            prompt: The prompt that was sent
+            response: The response it received
+        """
+        self._put_memory(prompt_hash(prompt), response, self.clock())
+
+    def _get_memory(self, key: str) -> Optional[str]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            response, stored_at = entry
+            if self.clock() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return response
+
+    def _put_memory(self, key: str, response: str, stored_at: float):
+        with self.lock:
+            self.entries[key] = (response, stored_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _get_database(self, key: str):
+        """Look up the newest stored response for the hash within the TTL."""
+        cutoff = datetime.fromtimestamp(self.clock(), timezone.utc) - timedelta(seconds=self.ttl)
+        db = self.session_factory()
+        try:
+            row = db.query(Prompt.response_text, Prompt.created_at).join(
+                PromptLedger, PromptLedger.prompt_id == Prompt.id
+            ).filter(
+                PromptLedger.prompt_hash == key,
+                PromptLedger.status == 'completed',
+                # Re-stored cache hits carry the time of reuse, not of the scrape
+                PromptLedger.cached.is_(False),
+                Prompt.created_at >= cutoff
+            ).order_by(Prompt.created_at.desc()).first()
+        except Exception as e:
+            logger.warning(f"Response cache lookup failed: {e}")
+            return None, None
+        finally:
+            db.close()
+
+        if row is None:
+            return None, None
+        created_at = row.created_at
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return row.response_text, created_at.timestamp()
@@ -2,15 +2,55 @@
 Response handling for ChatGPT scraper.
 """
 import logging
-import re
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import StaleElementReferenceException
-from .utils import CHATGPT_RESPONSE_SELECTOR
+import time
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+from selenium.common.exceptions import WebDriverException
+from .metrics import RunMetrics
+from .page_scripts import LATEST_RESPONSE, LAST_TEXT_BLOCK, RESPONSE_SNAPSHOT
+from .utils import CHATGPT_RESPONSE_SELECTOR, CHATGPT_STOP_BUTTON_SELECTOR
 from .prompt_sender import PromptSender
 from .retry_handler import RetryHandler
 
 logger = logging.getLogger(__name__)
 
+# Bounds for the fallback text-block extraction
+FALLBACK_MIN_BLOCK_LENGTH = 100
+FALLBACK_MAX_BLOCK_LENGTH = 1000
+
+# Elements that start a new line in a message's text, as innerText does
+BLOCK_TAGS = {'p', 'div', 'li', 'pre', 'br', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'ul', 'ol'}
+SKIPPED_TAGS = {'script', 'style', 'button', 'svg'}
+
+
+class MessageTextParser(HTMLParser):
+    """Reads the visible text of recorded message HTML, roughly as innerText would."""
+
+    def __init__(self):
+        super().__init__()
+        self.parts: List[str] = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skipping += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        lines = (" ".join(line.split()) for line in "".join(self.parts).splitlines())
+        return "\n".join(line for line in lines if line)
+
 
 class ResponseExtractor:
     """Handles extracting responses from ChatGPT interface."""
@@ -19,6 +59,18 @@ class ResponseExtractor:
         """Initialize response extractor with browser driver."""
         self.driver = driver
     
+    def fetch_latest(self) -> Dict[str, Any]:
+        """
+        Fetch the latest assistant message in one script execution.
+        
+        Returns:
+            Dictionary with the message count, text, length, whether ChatGPT is
+            still generating, and the completion watcher's verdict
+        """
+        return self.driver.execute_script(
+            LATEST_RESPONSE, CHATGPT_RESPONSE_SELECTOR, CHATGPT_STOP_BUTTON_SELECTOR
+        ) or {}
+    
     def extract_response(self) -> str:
         """
         Extract response text from ChatGPT interface.
@@ -26,45 +78,70 @@ class ResponseExtractor:
         Returns:
             The response text
         """
-        for attempt in range(3):
-            try:
-                response_elements = self.driver.find_elements(By.CSS_SELECTOR, CHATGPT_RESPONSE_SELECTOR)
-                if response_elements:
-                    # Get the last (most recent) response
-                    last_response = response_elements[-1]
-                    response_text = last_response.text
-                    if response_text and len(response_text.strip()) > 50:
-                        logger.info(f"Received response: {len(response_text)} characters")
-                        return response_text.strip()
-                    else:
-                        logger.warning(f"Response too short or empty: '{response_text[:100]}...'")
-                break  # If no exception, break retry loop
-            except StaleElementReferenceException as se:
-                logger.warning(f"StaleElementReferenceException in extract_response (attempt {attempt+1}/3): {se}")
-                if attempt == 2:
-                    raise
-                import time
-                time.sleep(1)
-        # Fallback: try to get any text content
+        try:
+            latest = self.fetch_latest()
+            response_text = latest.get('text') or ''
+            if len(response_text.strip()) > 50:
+                logger.info(f"Received response: {latest.get('length')} characters")
+                return response_text.strip()
+            if latest.get('count'):
+                logger.warning(f"Response too short or empty: '{response_text[:100]}...'")
+        except WebDriverException as e:
+            logger.warning(f"Error fetching latest response: {e}")
+        
+        # Fallback: last large text block in the conversation, found in-page
         logger.warning("Using fallback response extraction")
-        page_source = self.driver.page_source
-        # Simple fallback - look for any large text blocks
-        text_blocks = re.findall(r'<[^>]*>([^<]{100,})</[^>]*>', page_source)
-        if text_blocks:
-            fallback_text = text_blocks[-1][:1000]  # Return last large text block
-            if len(fallback_text.strip()) > 50:
-                return fallback_text
+        fallback_text = self.driver.execute_script(
+            LAST_TEXT_BLOCK, FALLBACK_MIN_BLOCK_LENGTH, FALLBACK_MAX_BLOCK_LENGTH
+        )
+        if fallback_text and len(fallback_text.strip()) > 50:
+            return fallback_text
         # If we still don't have a valid response, raise an exception
         raise Exception("No valid response could be extracted from ChatGPT interface")
+    
+    def snapshot(self) -> Optional[Dict[str, str]]:
+        """
+        Copy the latest assistant message for recording.
+        
+        Returns:
+            Dictionary with the message's 'html' and 'text', or None if there is none
+        """
+        return self.driver.execute_script(RESPONSE_SNAPSHOT, CHATGPT_RESPONSE_SELECTOR)
+    
+    @staticmethod
+    def extract_from_html(html: str, fallback_text: str = '') -> str:
+        """
+        Extract the response text from a recorded assistant message, without a browser.
+        
+        Args:
+            html: The message's outer HTML
+            fallback_text: Text to use when the HTML holds no usable response
+            
+        Returns:
+            The response text
+        """
+        parser = MessageTextParser()
+        parser.feed(html or '')
+        parser.close()
+        response_text = parser.text()
+        if len(response_text) > 50:
+            return response_text
+        if fallback_text and len(fallback_text.strip()) > 50:
+            return fallback_text.strip()
+        raise Exception("No valid response could be extracted from the recorded message")
 
 
 class ResponseHandler:
     """Handles ChatGPT interaction and response extraction."""
     
-    def __init__(self, driver):
-        """Initialize response handler with browser driver."""
-        self.prompt_sender = PromptSender(driver)
+    def __init__(self, driver, metrics: Optional[RunMetrics] = None, recorder=None):
+        """Initialize response handler with browser driver, an optional stage timer and an optional recorder."""
+        self.driver = driver
+        self.prompt_sender = PromptSender(driver, metrics)
         self.response_extractor = ResponseExtractor(driver)
+        self.recorder = recorder
+        # Prompts sent in each tab and when, for recording their timing
+        self.submitted: Dict[str, Tuple[str, float]] = {}
     
     def send_prompt(self, prompt: str) -> str:
         """
@@ -76,7 +153,39 @@ class ResponseHandler:
         Returns:
             The response text from ChatGPT
         """
-        return self.prompt_sender.send_prompt(prompt)
+        start = time.monotonic()
+        response = self.prompt_sender.send_prompt(prompt)
+        self._record(prompt, response, time.monotonic() - start)
+        return response
+    
+    def submit_prompt(self, prompt: str):
+        """Send a prompt in the current tab without waiting for the response."""
+        start = time.monotonic()
+        self.prompt_sender.submit(prompt)
+        if self.recorder is not None:
+            self.submitted[self.driver.current_window_handle] = (prompt, start)
+    
+    def response_ready(self) -> bool:
+        """Return True once the current tab's response has finished."""
+        return self.prompt_sender.is_complete()
+    
+    def collect_response(self) -> str:
+        """Extract the finished response from the current tab."""
+        response = self.prompt_sender.collect()
+        if self.recorder is not None:
+            prompt, start = self.submitted.pop(self.driver.current_window_handle)
+            self._record(prompt, response, time.monotonic() - start)
+        return response
+    
+    def _record(self, prompt: str, response: str, seconds: float):
+        """Save the finished message for offline replay; a failed recording never fails the prompt."""
+        if self.recorder is None:
+            return
+        try:
+            snapshot = self.response_extractor.snapshot() or {}
+            self.recorder.record(prompt, snapshot.get('html', ''), response, seconds)
+        except Exception as e:
+            logger.warning(f"Could not record response for prompt '{prompt[:50]}': {e}")
     
     def retry_with_popup_handling(self, operation, popup_handler, *args, **kwargs):
         """
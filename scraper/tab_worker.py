@@ -0,0 +1,233 @@
+"""
+A scraper worker that drives several ChatGPT tabs in one browser.
+
+Each tab holds its own conversation. The worker sends a prompt in every
+idle tab, then goes round the busy tabs checking which have finished, and
+collects each answer as soon as it is complete, so while one tab is still
+generating the others are being read and refilled. One browser process
+serves all the tabs, which costs far less memory than one browser each.
+When the browser is due for a memory recycle the worker stops refilling
+tabs, lets the busy ones finish and only then swaps the browser.
+"""
+import queue
+import time
+import logging
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .utils import MAX_WAIT_TIME, TAB_POLL_INTERVAL
+from .worker_pool import QUEUE_POLL_INTERVAL, ScraperWorker
+
+logger = logging.getLogger(__name__)
+
+Item = Tuple[int, str]
+
+
+class TabState:
+    """The prompt a tab is working on and its conversation length."""
+
+    def __init__(self, handle: str):
+        self.handle = handle
+        self.item: Optional[Item] = None
+        self.attempts = 0
+        self.submitted_at = 0.0
+        self.conversation_prompts = 0
+
+
+class MultiTabWorker(ScraperWorker):
+    """ScraperWorker that interleaves prompts across several tabs of its browser."""
+
+    def __init__(self, *args, tabs: int = 2, poll_interval: float = TAB_POLL_INTERVAL,
+                 response_timeout: float = MAX_WAIT_TIME, **kwargs):
+        """
+        Initialize a multi-tab worker.
+
+        Args:
+            *args, **kwargs: Passed to ScraperWorker
+            tabs: Number of ChatGPT tabs to keep busy
+            poll_interval: Seconds between rounds of completion checks
+            response_timeout: Seconds after which a response is collected even if unfinished
+        """
+        super().__init__(*args, **kwargs)
+        self.tabs = tabs
+        self.poll_interval = poll_interval
+        self.response_timeout = response_timeout
+        self.tab_states: List[TabState] = []
+        # Prompts waiting for another attempt, with the attempts used so far
+        self.backlog: Deque[Tuple[Item, int]] = deque()
+        self.new_chat_every = getattr(self.browser_manager, 'max_conversation_prompts', 0)
+        # Why the browser is waiting to be recycled once its tabs are idle
+        self.pending_recycle: Optional[str] = None
+
+    def in_flight(self) -> List[Item]:
+        """Prompts taken from the queue and not yet finished."""
+        return [tab.item for tab in self.tab_states if tab.item is not None] + [item for item, _ in self.backlog]
+
+    def _open_tabs(self):
+        """Open the tabs, putting any prompts they held back in the backlog."""
+        for tab in self.tab_states:
+            if tab.item is not None:
+                self.backlog.appendleft((tab.item, tab.attempts))
+                tab.item = None
+        handles = self.browser_manager.open_tabs(self.tabs)
+        self.tab_states = [TabState(handle) for handle in handles]
+
+    def run(self):
+        """Keep every tab busy until the queue is drained."""
+        try:
+            self._start_browser()
+            self._open_tabs()
+
+            while True:
+                if self.pending_recycle is None:
+                    busy = self._fill_idle_tabs()
+                else:
+                    busy = sum(tab.item is not None for tab in self.tab_states)
+                if not busy:
+                    if self.prompt_queue.unfinished_tasks == 0 and (
+                            self.input_done is None or self.input_done.is_set()):
+                        break
+                    if self.pending_recycle is not None:
+                        self._recycle_browser(self.pending_recycle)
+                        self.pending_recycle = None
+                        self._open_tabs()
+                    continue
+                settled = self._collect_finished()
+                if not settled:
+                    time.sleep(self.poll_interval)
+                elif self.pending_recycle is None:
+                    self.pending_recycle = self.memory_watchdog.recycle_reason()
+        finally:
+            self.browser_manager.close_browser()
+
+    def _next_item(self, block: bool) -> Optional[Tuple[Item, int]]:
+        """Take a retry from the backlog, or a new prompt from the queue."""
+        if self.backlog:
+            return self.backlog.popleft()
+        try:
+            if block:
+                return self.prompt_queue.get(timeout=QUEUE_POLL_INTERVAL), 0
+            return self.prompt_queue.get_nowait(), 0
+        except queue.Empty:
+            return None
+
+    def _fill_idle_tabs(self) -> int:
+        """
+        Send a prompt in each idle tab.
+
+        Returns:
+            Number of busy tabs afterwards
+        """
+        tabs = self.tab_states
+        for tab in tabs:
+            if self.tab_states is not tabs:
+                break  # The browser was restarted and its tabs reopened
+            if tab.item is not None:
+                continue
+            busy = any(other.item is not None for other in self.tab_states)
+            # Only wait for input when there is nothing to collect meanwhile
+            taken = self._next_item(block=not busy)
+            if taken is None:
+                break
+            tab.item, tab.attempts = taken
+            self._submit(tab)
+        return sum(tab.item is not None for tab in self.tab_states)
+
+    def _submit(self, tab: TabState):
+        index, prompt = tab.item
+        with self.metrics.stage('pacing_wait'):
+            self.pacer.wait_for_slot()
+        logger.info(f"[worker {self.worker_id}] Sending prompt {index} in tab {tab.handle} "
+                    f"(attempt {tab.attempts + 1}): {prompt}")
+        try:
+            self.browser_manager.switch_to_tab(tab.handle)
+            self.response_handler.retry_with_popup_handling(
+                self.response_handler.submit_prompt,
+                self.browser_manager.handle_stay_logged_out_popup,
+                prompt
+            )
+            tab.submitted_at = time.monotonic()
+        except Exception as e:
+            self._attempt_failed(tab, e)
+
+    def _collect_finished(self) -> int:
+        """
+        Check every busy tab once and collect the responses that are complete.
+
+        Returns:
+            Number of responses collected or attempts given up
+        """
+        settled = 0
+        tabs = self.tab_states
+        for tab in tabs:
+            if self.tab_states is not tabs:
+                break  # The browser was restarted and its tabs reopened
+            if tab.item is None:
+                continue
+            index, prompt = tab.item
+            try:
+                self.browser_manager.switch_to_tab(tab.handle)
+                timed_out = time.monotonic() - tab.submitted_at >= self.response_timeout
+                if not timed_out and not self.response_handler.response_ready():
+                    continue
+                if timed_out:
+                    logger.warning(f"[worker {self.worker_id}] No completion signal in tab {tab.handle} "
+                                   f"after {self.response_timeout}s, extracting what is there")
+                response = self.response_handler.collect_response()
+            except Exception as e:
+                settled += 1
+                self._attempt_failed(tab, e)
+                continue
+
+            self.metrics.observe('prompt', time.monotonic() - tab.submitted_at)
+            with self.metrics.stage('handoff'):
+                self.data_processor.process_prompt_response(prompt, response)
+            self.stats['processed'] += 1
+            self.metrics.increment('prompts')
+            self.memory_watchdog.record_prompts()
+            self.pacer.record_success()
+            tab.item = None
+            tab.conversation_prompts += 1
+            self.prompt_queue.task_done()
+            settled += 1
+            self._recycle_tab(tab)
+        return settled
+
+    def _recycle_tab(self, tab: TabState):
+        """Start a new chat in a tab whose conversation has grown long."""
+        if not self.new_chat_every or tab.conversation_prompts < self.new_chat_every:
+            return
+        try:
+            with self.metrics.stage('recycle_conversation'):
+                self.browser_manager.start_new_chat()
+            tab.conversation_prompts = 0
+        except Exception as e:
+            logger.warning(f"[worker {self.worker_id}] Could not start a new chat in tab {tab.handle}: {e}")
+            self._recover_tabs("a failed new chat")
+
+    def _attempt_failed(self, tab: TabState, error: Exception):
+        """Retry a tab's prompt later, or give up on it after max_retries attempts."""
+        index, prompt = tab.item
+        tab.item = None
+        attempts = tab.attempts + 1
+        self.pacer.record_failure()
+        logger.error(f"[worker {self.worker_id}] Error processing prompt {index} in tab {tab.handle} "
+                     f"(attempt {attempts}): {error}")
+        if attempts >= self.max_retries:
+            logger.error(f"[worker {self.worker_id}] Failed to process prompt {index} after "
+                         f"{self.max_retries} attempts, skipping...")
+            self.stats['failed'] += 1
+            self.metrics.increment('failures')
+            self.data_processor.record_failure(prompt)
+            self.prompt_queue.task_done()
+        else:
+            self.stats['retries'] += 1
+            self.metrics.increment('retries')
+            self.backlog.append(((index, prompt), attempts))
+        self._recover_tabs(f"a failed attempt ({error})")
+
+    def _recover_tabs(self, reason: str):
+        """Restart a dead browser and reopen its tabs; their prompts are sent again."""
+        if self._recover_browser(reason):
+            self.pending_recycle = None
+            self._open_tabs()
@@ -1,11 +1,12 @@
 """
 Utility functions and configuration for the scraper.
 """
-import json
+import hashlib
 import logging
 import re
-from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+from config import MAX_RETRIES
 
 logger = logging.getLogger(__name__)
 
@@ -15,12 +16,69 @@ BRANDS = ['nike', 'adidas', 'hoka', 'new balance', 'jordan']
 # ChatGPT selectors
 CHATGPT_INPUT_SELECTOR = 'textarea[data-id="root"]'
 CHATGPT_RESPONSE_SELECTOR = '[data-message-author-role="assistant"]'
+CHATGPT_STOP_BUTTON_SELECTOR = 'button[data-testid="stop-button"]'
 CHATGPT_URL = "https://chat.openai.com/"
 
 # Timing configuration
-MIN_WAIT_TIME = 30  # Minimum seconds to wait for response
+MIN_WAIT_TIME = 30  # Minimum seconds to wait for response (polling fallback only)
 MAX_WAIT_TIME = 60  # Maximum seconds to wait for response
 TEXT_CHECK_INTERVAL = 2  # Seconds between text change checks
+COMPLETION_QUIET_PERIOD = 1.5  # Seconds without DOM changes once generation stops
+COMPLETION_FALLBACK_QUIET_PERIOD = 5  # Quiet period when no stop button was seen
+
+# Pacing
+PACING_MIN_DELAY = 1  # Fastest the adaptive delay may get, in seconds
+PACING_MAX_DELAY = 120  # Slowest the adaptive delay may get, in seconds
+PACING_MAX_BACKOFF = 300  # Cap for a single retry backoff, in seconds
+PACING_SPEEDUP_AFTER = 5  # Consecutive successes before speeding up
+PACING_SPEEDUP_FACTOR = 0.75  # Delay multiplier applied on speed-up
+THROUGHPUT_WINDOW = 600  # Seconds of history used for throughput
+
+# Analysis/persistence pipeline
+PIPELINE_ANALYZE_QUEUE_SIZE = 100  # Responses waiting for analysis before workers block
+PIPELINE_WRITE_QUEUE_SIZE = 1000  # Analyzed records waiting for the writer
+PIPELINE_BATCH_SIZE = 200  # Maximum records per database transaction
+PIPELINE_BATCH_INTERVAL = 1.0  # Seconds the writer waits to fill a batch
+PIPELINE_WRITE_RETRIES = 3  # Attempts per batch before it is dropped
+
+# Bulk writes
+BULK_CHUNK_SIZE = 5000  # Rows per INSERT/COPY statement
+BULK_COPY_THRESHOLD = 5000  # Postgres batches at least this large are loaded with COPY
+
+# Re-analysis
+REANALYZE_CHUNK_SIZE = 2000  # Prompts per analysis task and per transaction
+REPLAY_CHUNK_SIZE = 500  # Recordings per analysis task and per transaction (--replay)
+
+# Prompt input
+PROMPTS_FILE = "data/sample_prompts.json"  # Default prompts file
+PROMPT_QUEUE_SIZE = 100  # Prompts read ahead of the workers
+
+# Run ledger
+LEDGER_CHUNK_SIZE = 500  # Prompts registered in the ledger per query
+
+# Response cache
+CACHE_TTL = 0  # Seconds a scraped response can be reused (0 disables the cache)
+CACHE_MAX_SIZE = 10000  # Responses kept in memory
+
+# Shared job queue (--queue)
+JOB_LEASE_SECONDS = 300  # How long a claimed job stays leased without a heartbeat
+JOB_POLL_INTERVAL = 5.0  # Seconds between polls while other hosts hold the remaining jobs
+JOB_CLAIM_BATCH = 1  # Jobs claimed per query
+JOB_ENQUEUE_CHUNK_SIZE = 1000  # Jobs inserted per statement when enqueueing
+JOB_RUN_ID = "queue"  # Prefix of the ledger run each queued job is stored under
+
+# Browser watchdog
+BROWSER_MAX_RESTARTS_PER_HOUR = 6  # In-run browser restarts allowed per worker per hour (0 disables)
+BROWSER_HEALTH_TIMEOUT = 10  # Seconds a browser has to answer a health probe
+BROWSER_MAX_RSS_MB = 0  # Browser memory in MB that triggers a recycle between prompts (0 disables)
+BROWSER_RECYCLE_EVERY = 0  # Prompts per browser before it is recycled (0 disables)
+
+# Run metrics
+METRICS_MAX_SAMPLES = 10000  # Durations kept per stage for percentiles
+
+# Conversation recycling
+CONVERSATION_MAX_PROMPTS = 20  # Prompts per conversation before starting a new chat
+CONVERSATION_MAX_DOM_NODES = 25000  # Page size that also triggers a new chat
 
 # Browser options for undetected-chromedriver
 BROWSER_OPTIONS = [
@@ -28,11 +86,43 @@ BROWSER_OPTIONS = [
     '--disable-dev-shm-usage'
 ]
 
+# Lean page mode (--lean): extra flags that turn off background services and images
+LEAN_BROWSER_OPTIONS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication',
+    '--blink-settings=imagesEnabled=false'
+]
+LEAN_BLOCKED_RESOURCE_TYPES = ['image', 'font', 'media']  # Blocked by file extension
+LEAN_BLOCKED_URLS = [  # Analytics and tracking requests the scraper never needs
+    '*google-analytics.com*',
+    '*googletagmanager.com*',
+    '*doubleclick.net*',
+    '*segment.io*',
+    '*cdn.segment.com*',
+    '*hotjar.com*',
+    '*intercom.io*',
+    '*browser-intake-datadoghq.com*'
+]
+
+# Multi-tab mode (--tabs): keep background tabs running at full speed while they generate
+MULTI_TAB_BROWSER_OPTIONS = [
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows'
+]
+TAB_POLL_INTERVAL = 0.5  # Seconds between completion checks across busy tabs
+
 
-def create_brand_patterns() -> Dict[str, re.Pattern]:
+def create_brand_patterns(brands: Optional[List[str]] = None) -> Dict[str, re.Pattern]:
     """Create regex patterns for brand detection."""
     patterns = {}
-    for brand in BRANDS:
+    for brand in (brands if brands is not None else BRANDS):
         # Handle multi-word brands like "new balance"
         if ' ' in brand:
             # For multi-word brands, match the whole phrase
@@ -44,27 +134,14 @@ def create_brand_patterns() -> Dict[str, re.Pattern]:
     return patterns
 
 
-def load_prompts() -> List[str]:
-    """
-    Load prompts from JSON file.
-    
-    Returns:
-        List of prompts
-    """
-    prompts_file = Path("data/sample_prompts.json")
-    
-    if not prompts_file.exists():
-        logger.error(f"Prompts file not found: {prompts_file}")
-        return []
-    
-    try:
-        with open(prompts_file, 'r') as f:
-            prompts = json.load(f)
-        logger.info(f"Loaded {len(prompts)} prompts from {prompts_file}")
-        return prompts
-    except Exception as e:
-        logger.error(f"Error loading prompts: {e}")
-        return []
+def normalize_prompt(prompt: str) -> str:
+    """Normalize a prompt so trivially different copies compare equal."""
+    return ' '.join(prompt.split()).casefold()
+
+
+def prompt_hash(prompt: str) -> str:
+    """Stable hash of the normalized prompt text."""
+    return hashlib.sha256(normalize_prompt(prompt).encode('utf-8')).hexdigest()
 
 
 def parse_arguments():
@@ -73,5 +150,60 @@ def parse_arguments():
     
     parser = argparse.ArgumentParser(description='Brand Mentions Scraper')
     parser.add_argument('--db-password', type=str, required=True, help='Database password')
-    parser.add_argument('--delay', type=int, default=3, help='Delay between requests in seconds')
+    parser.add_argument('--prompts', type=str, default=PROMPTS_FILE,
+                        help='JSON array or JSONL file of prompts, read as a stream')
+    parser.add_argument('--shard', type=str, default=None, metavar='I/N',
+                        help='Only process shard I of N (1-based), e.g. 2/4, to split a file across scrapers')
+    parser.add_argument('--delay', type=int, default=3, help='Initial delay between requests in seconds')
+    parser.add_argument('--max-rate', type=float, default=0,
+                        help='Maximum prompts per minute across all workers (0 for no cap)')
+    parser.add_argument('--min-delay', type=float, default=PACING_MIN_DELAY,
+                        help='Shortest delay between requests after speeding up')
+    parser.add_argument('--max-retries', type=int, default=MAX_RETRIES, help='Attempts per prompt')
+    parser.add_argument('--workers', type=int, default=1, help='Number of parallel browser sessions')
+    parser.add_argument('--url', type=str, default=CHATGPT_URL, help='ChatGPT URL (e.g. a local fake page for testing)')
+    parser.add_argument('--new-chat-every', type=int, default=CONVERSATION_MAX_PROMPTS,
+                        help='Start a new chat after this many prompts (0 disables)')
+    parser.add_argument('--max-dom-nodes', type=int, default=CONVERSATION_MAX_DOM_NODES,
+                        help='Start a new chat once the page has this many elements (0 disables)')
+    parser.add_argument('--profile-dir', type=str, default=None,
+                        help='Reuse persistent Chrome profiles (one per worker) from this directory')
+    parser.add_argument('--keep-browser', action='store_true',
+                        help='Leave browsers running after the run so the next run attaches to them')
+    parser.add_argument('--cache-ttl', type=float, default=CACHE_TTL,
+                        help='Reuse responses scraped within this many seconds instead of sending again (0 disables)')
+    parser.add_argument('--cache-size', type=int, default=CACHE_MAX_SIZE,
+                        help='Responses kept in the in-memory cache')
+    parser.add_argument('--run-id', type=str, default=None,
+                        help='Identifier for this run (default: generated)')
+    parser.add_argument('--resume', nargs='?', const='latest', default=None, metavar='RUN_ID',
+                        help='Resume a run (default: the latest), skipping prompts it already completed')
+    parser.add_argument('--queue', action='store_true',
+                        help='Take prompts from the shared scrape_jobs queue instead of --prompts')
+    parser.add_argument('--enqueue', action='store_true',
+                        help='Add the --prompts file to the shared queue and exit')
+    parser.add_argument('--lease-seconds', type=float, default=JOB_LEASE_SECONDS,
+                        help='Seconds a claimed job is held without a heartbeat before it is re-queued')
+    parser.add_argument('--tabs', type=int, default=1,
+                        help='ChatGPT tabs per browser, each with its own conversation')
+    parser.add_argument('--lean', action='store_true',
+                        help='Block images, fonts, media and analytics and use memory-saving Chrome flags')
+    parser.add_argument('--lean-allow', action='append', default=[], metavar='PATTERN',
+                        help='Resource type or URL pattern to keep loading in lean mode (repeatable)')
+    parser.add_argument('--max-restarts-per-hour', type=int, default=BROWSER_MAX_RESTARTS_PER_HOUR,
+                        help='Browser restarts per worker per hour after a crash or hang (0 disables)')
+    parser.add_argument('--max-browser-rss', type=float, default=BROWSER_MAX_RSS_MB, metavar='MB',
+                        help='Recycle a browser between prompts once its memory reaches this many MB (0 disables)')
+    parser.add_argument('--recycle-browser-every', type=int, default=BROWSER_RECYCLE_EVERY, metavar='N',
+                        help='Recycle each browser after N prompts (0 disables)')
+    parser.add_argument('--metrics-json', type=str, default=None, metavar='PATH',
+                        help='Write per-stage timings and run counters as JSON when the run ends')
+    parser.add_argument('--metrics-prom', type=str, default=None, metavar='PATH',
+                        help='Also write them as a Prometheus textfile')
+    parser.add_argument('--record', type=str, default=None, metavar='DIR',
+                        help='Save each finished response (HTML, text and timing) to DIR for offline replay')
+    parser.add_argument('--replay', type=str, default=None, metavar='DIR',
+                        help='Process responses recorded with --record instead of driving a browser')
+    parser.add_argument('--replay-workers', type=int, default=None,
+                        help='Analysis processes for --replay (default: CPU count)')
     return parser.parse_args() 
\ No newline at end of file
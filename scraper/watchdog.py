@@ -0,0 +1,209 @@
+"""
+Browser health checks, in-run restarts and memory-based recycling.
+
+A worker whose Chrome or chromedriver has crashed or stopped responding
+would otherwise fail every remaining attempt and take the run down with it.
+The watchdog probes the driver after failures and, when it is dead or hung,
+relaunches the browser and reopens ChatGPT so the worker can carry on with
+the prompt it was on. Restarts are capped per hour, so a browser that keeps
+dying still stops the worker instead of looping.
+
+Renderer memory also creeps up over a long session. The memory watchdog
+samples the browser's RSS between prompts and recycles the browser once it
+crosses a threshold or has served a set number of prompts.
+"""
+import threading
+import time
+import logging
+from collections import deque
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+from .metrics import RunMetrics, metrics_or_null
+from .utils import BROWSER_MAX_RESTARTS_PER_HOUR, BROWSER_HEALTH_TIMEOUT, BROWSER_MAX_RSS_MB, BROWSER_RECYCLE_EVERY
+
+logger = logging.getLogger(__name__)
+
+HEALTH_PROBE = "return document.readyState;"
+
+
+class BrowserRestartLimitError(Exception):
+    """Raised when a browser needs restarting but the hourly cap has been reached."""
+
+
+class BrowserWatchdog:
+    """Detects a dead or hung browser and restarts it, at most N times per hour."""
+
+    def __init__(self, browser_manager, max_restarts_per_hour: int = BROWSER_MAX_RESTARTS_PER_HOUR,
+                 health_timeout: float = BROWSER_HEALTH_TIMEOUT, metrics: Optional[RunMetrics] = None,
+                 launch_lock: Optional[threading.Lock] = None, clock: Callable[[], float] = time.monotonic,
+                 name: str = "browser"):
+        """
+        Initialize the watchdog.
+
+        Args:
+            browser_manager: BrowserManager whose browser is watched
+            max_restarts_per_hour: Restarts allowed in any 60-minute window
+            health_timeout: Seconds the browser has to answer a health probe
+            metrics: Collector for restart counts and durations
+            launch_lock: Lock serializing browser launches across workers
+            clock: Monotonic clock, replaceable in tests
+            name: Label used in log messages
+        """
+        self.browser_manager = browser_manager
+        self.max_restarts_per_hour = max_restarts_per_hour
+        self.health_timeout = health_timeout
+        self.metrics = metrics_or_null(metrics)
+        self.launch_lock = launch_lock
+        self.clock = clock
+        self.name = name
+        self.restarts = deque()
+
+    def is_healthy(self) -> bool:
+        """
+        Probe the browser with a trivial script.
+
+        The probe runs in a helper thread, so a hung renderer cannot block
+        the worker for longer than health_timeout.
+
+        Returns:
+            True if the page answered in time
+        """
+        driver = self.browser_manager.driver
+        if driver is None:
+            return False
+
+        result = {}
+
+        def probe():
+            try:
+                result['state'] = driver.execute_script(HEALTH_PROBE)
+            except Exception as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=probe, name=f"{self.name}-health", daemon=True)
+        thread.start()
+        thread.join(self.health_timeout)
+        if thread.is_alive():
+            logger.warning(f"[{self.name}] Browser did not answer within {self.health_timeout}s")
+            return False
+        if 'error' in result:
+            logger.warning(f"[{self.name}] Browser health check failed: {result['error']}")
+            return False
+        return True
+
+    def restarts_last_hour(self) -> int:
+        """Number of restarts within the last 60 minutes."""
+        cutoff = self.clock() - 3600
+        while self.restarts and self.restarts[0] <= cutoff:
+            self.restarts.popleft()
+        return len(self.restarts)
+
+    def restart(self, reason: str = ""):
+        """
+        Relaunch the browser and reopen ChatGPT, retrying failed launches within the cap.
+
+        Raises:
+            BrowserRestartLimitError: If the hourly restart cap has been reached
+        """
+        while True:
+            if self.restarts_last_hour() >= self.max_restarts_per_hour:
+                raise BrowserRestartLimitError(
+                    f"Browser restart limit reached ({self.max_restarts_per_hour} per hour)"
+                )
+            self.restarts.append(self.clock())
+            self.metrics.increment('browser_restarts')
+            logger.warning(f"[{self.name}] Restarting browser"
+                           + (f" after {reason}" if reason else "")
+                           + f" (restart {len(self.restarts)} this hour)")
+            try:
+                with self.metrics.stage('browser_restart'), self.launch_lock or nullcontext():
+                    self.browser_manager.restart_browser()
+                logger.info(f"[{self.name}] Browser restarted")
+                return
+            except Exception as e:
+                logger.error(f"[{self.name}] Browser restart failed: {e}")
+                reason = "a failed restart"
+
+    def ensure_healthy(self, reason: str = "") -> bool:
+        """
+        Restart the browser if it no longer answers.
+
+        Returns:
+            True if the browser was restarted
+        """
+        if self.is_healthy():
+            return False
+        self.restart(reason or "a failed health check")
+        return True
+
+
+class MemoryWatchdog:
+    """Samples browser memory between prompts and recycles the browser when it grows too large."""
+
+    def __init__(self, browser_manager, max_rss_mb: float = BROWSER_MAX_RSS_MB,
+                 recycle_every: int = BROWSER_RECYCLE_EVERY, metrics: Optional[RunMetrics] = None,
+                 launch_lock: Optional[threading.Lock] = None, name: str = "browser"):
+        """
+        Initialize the memory watchdog.
+
+        Args:
+            browser_manager: BrowserManager whose browser is sampled
+            max_rss_mb: Browser RSS in MB that triggers a recycle (0 disables)
+            recycle_every: Prompts per browser before a recycle (0 disables)
+            metrics: Collector for memory readings and recycle counts
+            launch_lock: Lock serializing browser launches across workers
+            name: Label used in log messages
+        """
+        self.browser_manager = browser_manager
+        self.max_rss_mb = max_rss_mb
+        self.recycle_every = recycle_every
+        self.metrics = metrics_or_null(metrics)
+        self.launch_lock = launch_lock
+        self.name = name
+        self.prompts = 0
+        self.last_rss_mb: Optional[float] = None
+
+    def sample(self) -> Optional[float]:
+        """Measure and record the browser's RSS in MB (None if it cannot be measured)."""
+        measure = getattr(self.browser_manager, 'browser_rss', None)
+        rss = measure() if measure is not None and self.browser_manager.driver is not None else None
+        if rss is None:
+            return None
+        self.last_rss_mb = rss / 2**20
+        self.metrics.sample('browser_rss_mb', round(self.last_rss_mb, 1))
+        return self.last_rss_mb
+
+    def record_prompts(self, count: int = 1):
+        """Count prompts served by the current browser."""
+        self.prompts += count
+
+    def recycle_reason(self) -> Optional[str]:
+        """
+        Sample memory and decide whether the browser is due for recycling.
+
+        Returns:
+            Why the browser should be recycled, or None
+        """
+        if self.recycle_every and self.prompts >= self.recycle_every:
+            self.sample()
+            return f"{self.prompts} prompts"
+        rss_mb = self.sample()
+        if self.max_rss_mb and rss_mb is not None and rss_mb >= self.max_rss_mb:
+            return f"{rss_mb:.0f} MB RSS (limit {self.max_rss_mb:.0f} MB)"
+        return None
+
+    def recycle(self, reason: str):
+        """Replace the browser with a fresh one; call only between prompts."""
+        logger.info(f"[{self.name}] Recycling browser after {reason}")
+        self.metrics.increment('browser_recycles')
+        with self.metrics.stage('browser_recycle'), self.launch_lock or nullcontext():
+            self.browser_manager.restart_browser()
+        self.reset()
+        rss_mb = self.sample()
+        if rss_mb is not None:
+            logger.info(f"[{self.name}] Browser recycled, now {rss_mb:.0f} MB RSS")
+
+    def reset(self):
+        """Start counting again for a new browser."""
+        self.prompts = 0
@@ -0,0 +1,481 @@
+"""
+Parallel browser workers for the ChatGPT scraper.
+"""
+import queue
+import threading
+import time
+import logging
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from .browser_manager import BrowserManager
+from .metrics import RunMetrics, metrics_or_null
+from .pacing import PacingScheduler, TokenBucket
+from .pipeline import PipelineError
+from .response_handler import ResponseHandler
+from .utils import (MAX_RETRIES, PACING_MIN_DELAY, PROMPT_QUEUE_SIZE, BROWSER_MAX_RESTARTS_PER_HOUR,
+                    BROWSER_MAX_RSS_MB, BROWSER_RECYCLE_EVERY)
+from .watchdog import BrowserWatchdog, MemoryWatchdog
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle worker waits on the queue before re-checking for work
+QUEUE_POLL_INTERVAL = 0.5
+
+
+class WorkersStoppedError(RuntimeError):
+    """Raised when every worker has stopped while prompts were still waiting."""
+
+
+class PromptQueue(queue.Queue):
+    """Bounded prompt queue that always takes back a prompt a crashed worker held."""
+
+    def put_back(self, item):
+        """
+        Return a prompt to the front of the queue without waiting for room.
+
+        The feeder may have filled the queue to its bound, and no worker may
+        be left to drain it, so a blocking put could hang the crashing thread.
+        """
+        with self.not_empty:
+            self.queue.appendleft(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+
+class PromptFeeder:
+    """
+    Feeds (index, prompt) pairs from an iterable into a bounded queue.
+
+    Runs in a background thread, so workers start on the first prompt while
+    the rest of the input is still being read, and only a queue's worth of
+    prompts is held in memory.
+    """
+
+    def __init__(self, prompts: Iterable[str], maxsize: int = PROMPT_QUEUE_SIZE):
+        """
+        Initialize the feeder.
+
+        Args:
+            prompts: Prompts to feed, possibly a lazy iterator
+            maxsize: Prompts waiting in the queue before the feeder blocks
+        """
+        self.prompts = prompts
+        self.queue = PromptQueue(maxsize=maxsize)
+        self.done = threading.Event()
+        self.fed = 0
+        self.error: Optional[Exception] = None
+        self.thread: Optional[threading.Thread] = None
+        self.stopped = threading.Event()
+
+    def start(self) -> PromptQueue:
+        """Start feeding and return the queue."""
+        self.thread = threading.Thread(target=self._feed, name="prompt-feeder", daemon=True)
+        self.thread.start()
+        return self.queue
+
+    def stop(self):
+        """Stop reading prompts, even while waiting for room in the queue."""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _feed(self):
+        try:
+            for item in enumerate(self.prompts, 1):
+                while True:
+                    if self.stopped.is_set():
+                        return
+                    try:
+                        self.queue.put(item, timeout=QUEUE_POLL_INTERVAL)
+                        break
+                    except queue.Full:
+                        continue
+                self.fed += 1
+        except Exception as e:
+            self.error = e
+            logger.error(f"Stopped reading prompts after {self.fed}: {e}")
+        finally:
+            self.done.set()
+
+
+class ScraperWorker:
+    """Drives one browser session, pulling prompts from a shared queue."""
+
+    def __init__(self, worker_id: int, prompt_queue: queue.Queue, browser_manager,
+                 data_processor, delay: float = 3, max_retries: int = MAX_RETRIES,
+                 handler_factory: Callable = ResponseHandler, total: Optional[int] = None,
+                 launch_lock: Optional[threading.Lock] = None, pacer: Optional[PacingScheduler] = None,
+                 input_done: Optional[threading.Event] = None, metrics: Optional[RunMetrics] = None,
+                 max_restarts_per_hour: int = BROWSER_MAX_RESTARTS_PER_HOUR,
+                 max_browser_rss_mb: float = BROWSER_MAX_RSS_MB, recycle_browser_every: int = BROWSER_RECYCLE_EVERY):
+        """
+        Initialize a scraper worker.
+
+        Args:
+            worker_id: Identifier used in log messages
+            prompt_queue: Queue of (index, prompt) tuples shared between workers
+            browser_manager: This worker's own BrowserManager
+            data_processor: DataProcessor used to analyze and store responses
+            delay: Initial seconds to wait between this worker's requests
+            max_retries: Attempts per prompt before it is skipped
+            handler_factory: Builds the ResponseHandler for the worker's driver
+            total: Total number of prompts in the run, for log messages
+            launch_lock: Lock serializing browser launches across workers
+            pacer: This worker's PacingScheduler, built from delay if omitted
+            input_done: Set once no more prompts will be queued (None if the queue is pre-filled)
+            metrics: Collector for stage timings and retry counts
+            max_restarts_per_hour: Browser restarts allowed after crashes (0 disables)
+            max_browser_rss_mb: Browser memory in MB that triggers a recycle between prompts (0 disables)
+            recycle_browser_every: Prompts per browser before it is recycled (0 disables)
+        """
+        self.worker_id = worker_id
+        self.prompt_queue = prompt_queue
+        self.browser_manager = browser_manager
+        self.data_processor = data_processor
+        self.pacer = pacer or PacingScheduler(delay)
+        self.max_retries = max_retries
+        self.handler_factory = handler_factory
+        self.total = total
+        self.launch_lock = launch_lock
+        self.input_done = input_done
+        self.metrics = metrics_or_null(metrics)
+        self.watchdog = BrowserWatchdog(
+            browser_manager, max_restarts_per_hour, metrics=metrics, launch_lock=launch_lock,
+            name=f"worker {worker_id}"
+        ) if max_restarts_per_hour > 0 else None
+        self.memory_watchdog = MemoryWatchdog(
+            browser_manager, max_browser_rss_mb, recycle_browser_every, metrics=metrics,
+            launch_lock=launch_lock, name=f"worker {worker_id}"
+        )
+        self.startup_time = None
+        self.response_handler = None
+        self.current = None
+        # Set by WorkerPool when the worker crashes
+        self.error: Optional[Exception] = None
+        self.stats = {'processed': 0, 'failed': 0, 'retries': 0, 'restarts': 0, 'recycles': 0}
+
+    def _start_browser(self):
+        """Launch the browser and open ChatGPT."""
+        start_time = time.time()
+        with self.metrics.stage('launch_browser'):
+            if self.launch_lock:
+                # undetected-chromedriver patches its driver binary on launch,
+                # so concurrent launches must not overlap
+                with self.launch_lock:
+                    self.browser_manager.launch_browser()
+            else:
+                self.browser_manager.launch_browser()
+        with self.metrics.stage('navigate'):
+            self.browser_manager.navigate_to_chatgpt()
+        self._attach_handler()
+
+        self.startup_time = time.time() - start_time
+        start_kind = "warm" if getattr(self.browser_manager, 'attached', False) else "cold"
+        rss_mb = self.memory_watchdog.sample()
+        memory = f", {rss_mb:.0f} MB RSS" if rss_mb else ""
+        logger.info(f"[worker {self.worker_id}] Browser ready in {self.startup_time:.1f}s ({start_kind} start{memory})")
+
+    def in_flight(self) -> List[Tuple[int, str]]:
+        """Prompts taken from the queue and not yet finished."""
+        return [self.current] if self.current is not None else []
+
+    def _attach_handler(self):
+        """Build the response handler for the current driver."""
+        self.response_handler = self.handler_factory(self.browser_manager.driver)
+
+    def _recover_browser(self, reason: str, check: bool = True) -> bool:
+        """
+        Restart the browser if it has died or hung (or unconditionally when check is False).
+
+        Returns:
+            True if the browser was restarted
+
+        Raises:
+            BrowserRestartLimitError: If the browser needs restarting but the hourly cap is used up
+        """
+        if self.watchdog is None:
+            return False
+        if check:
+            restarted = self.watchdog.ensure_healthy(reason)
+        else:
+            self.watchdog.restart(reason)
+            restarted = True
+        if restarted:
+            self.stats['restarts'] += 1
+            self.memory_watchdog.reset()
+            self._attach_handler()
+        return restarted
+
+    def _recycle_browser(self, reason: str):
+        """Swap the browser for a fresh one between prompts."""
+        try:
+            self.memory_watchdog.recycle(reason)
+        except Exception as e:
+            logger.warning(f"[worker {self.worker_id}] Could not recycle the browser: {e}")
+            self._recover_browser("a failed recycle")
+            return
+        self.stats['recycles'] += 1
+        self._attach_handler()
+
+    def run(self):
+        """Process prompts from the queue until it is empty."""
+        try:
+            self._start_browser()
+
+            while True:
+                try:
+                    self.current = self.prompt_queue.get(timeout=QUEUE_POLL_INTERVAL)
+                except queue.Empty:
+                    # Stay around while prompts are still being read or other
+                    # workers still hold prompts, in case a crashing worker hands one back
+                    if self.prompt_queue.unfinished_tasks == 0 and (
+                            self.input_done is None or self.input_done.is_set()):
+                        break
+                    continue
+
+                index, prompt = self.current
+                with self.metrics.stage('pacing_wait'):
+                    self.pacer.wait_for_slot()
+                self._process_with_recovery(index, prompt)
+                self.current = None
+                self.prompt_queue.task_done()
+
+                # Keep the conversation short so DOM size stays flat
+                try:
+                    with self.metrics.stage('recycle_conversation'):
+                        self.browser_manager.recycle_conversation_if_needed()
+                except Exception as e:
+                    logger.warning(f"[worker {self.worker_id}] Could not start a new chat: {e}")
+                    self._recover_browser("a failed new chat")
+
+                # Between prompts is the safe point to replace a bloated browser
+                self.memory_watchdog.record_prompts()
+                reason = self.memory_watchdog.recycle_reason()
+                if reason:
+                    self._recycle_browser(reason)
+        finally:
+            self.browser_manager.close_browser()
+
+    def _process_with_recovery(self, index: int, prompt: str):
+        """Process a prompt, restarting the browser and starting over on it if an error escapes."""
+        while True:
+            try:
+                with self.metrics.stage('prompt'):
+                    self.process_prompt(index, prompt)
+                return
+            except PipelineError:
+                raise  # Results can no longer be stored, so stop the worker
+            except Exception as e:
+                if self.watchdog is None:
+                    raise
+                logger.error(f"[worker {self.worker_id}] Prompt {index} failed outside the retry loop: {e}")
+                self._recover_browser(f"an unhandled error ({e})", check=False)
+
+    def process_prompt(self, index: int, prompt: str) -> bool:
+        """
+        Send one prompt with retries and process its response.
+
+        Args:
+            index: 1-based position of the prompt in the run
+            prompt: The prompt to send
+
+        Returns:
+            True if the prompt was processed, False if it was skipped
+        """
+        position = f"{index}/{self.total}" if self.total else str(index)
+        retry_count = 0
+
+        while retry_count < self.max_retries:
+            try:
+                logger.info(f"[worker {self.worker_id}] Processing prompt {position} (attempt {retry_count + 1}): {prompt}")
+
+                # Send prompt to ChatGPT (with automatic popup handling)
+                with self.metrics.stage('send_prompt'):
+                    response = self.response_handler.retry_with_popup_handling(
+                        self.response_handler.send_prompt,
+                        self.browser_manager.handle_stay_logged_out_popup,
+                        prompt
+                    )
+
+                # Process the response
+                with self.metrics.stage('handoff'):
+                    self.data_processor.process_prompt_response(prompt, response)
+                self.stats['processed'] += 1
+                self.metrics.increment('prompts')
+                self.pacer.record_success()
+                logger.info(f"[worker {self.worker_id}] Throughput: {self.pacer.throughput():.0f} prompts/hour, "
+                            f"next delay {self.pacer.current_delay:.1f}s")
+                return True
+
+            except PipelineError:
+                raise
+            except Exception as e:
+                retry_count += 1
+                self.pacer.record_failure()
+                logger.error(f"[worker {self.worker_id}] Error processing prompt {index} (attempt {retry_count}): {e}")
+
+                if retry_count >= self.max_retries:
+                    logger.error(f"[worker {self.worker_id}] Failed to process prompt {index} after {self.max_retries} attempts, skipping...")
+                    self.stats['failed'] += 1
+                    self.metrics.increment('failures')
+                    self.data_processor.record_failure(prompt)
+                    return False
+
+                # A dead or hung browser would fail every remaining attempt
+                self._recover_browser(f"a failed attempt ({e})")
+                self.stats['retries'] += 1
+                self.metrics.increment('retries')
+                backoff = self.pacer.backoff_delay(retry_count)
+                logger.info(f"[worker {self.worker_id}] Retrying prompt {index} in {backoff:.1f} seconds...")
+                with self.metrics.stage('retry_backoff'):
+                    self.pacer.sleep(backoff)
+
+        return False
+
+
+def default_browser_factory(worker_id: int) -> BrowserManager:
+    """Create a worker's BrowserManager with the default settings."""
+    return BrowserManager()
+
+
+class WorkerPool:
+    """Runs several independent browser workers over one shared prompt queue."""
+
+    def __init__(self, num_workers: int, data_processor, delay: float = 3,
+                 max_retries: int = MAX_RETRIES, browser_factory: Callable = default_browser_factory,
+                 handler_factory: Callable = ResponseHandler, max_rate: float = 0,
+                 min_delay: float = PACING_MIN_DELAY, prefetch: int = PROMPT_QUEUE_SIZE,
+                 metrics: Optional[RunMetrics] = None,
+                 max_restarts_per_hour: int = BROWSER_MAX_RESTARTS_PER_HOUR,
+                 max_browser_rss_mb: float = BROWSER_MAX_RSS_MB, recycle_browser_every: int = BROWSER_RECYCLE_EVERY,
+                 worker_factory: Callable = ScraperWorker):
+        """
+        Initialize the worker pool.
+
+        Args:
+            num_workers: Number of parallel browser sessions
+            data_processor: Thread-safe processor shared by all workers (a ProcessingPipeline)
+            delay: Initial seconds each worker waits between its requests
+            max_retries: Attempts per prompt before it is skipped
+            browser_factory: Creates a BrowserManager for a worker id
+            handler_factory: Builds a ResponseHandler for each worker's driver
+            max_rate: Maximum prompts per minute across all workers (0 for no cap)
+            min_delay: Shortest per-worker delay after speeding up
+            prefetch: Prompts read ahead of the workers
+            metrics: Collector for stage timings, shared by all workers
+            max_restarts_per_hour: Browser restarts allowed per worker after crashes (0 disables)
+            max_browser_rss_mb: Browser memory in MB that triggers a recycle between prompts (0 disables)
+            recycle_browser_every: Prompts per browser before it is recycled (0 disables)
+            worker_factory: Builds each worker (ScraperWorker or MultiTabWorker)
+        """
+        self.num_workers = num_workers
+        self.data_processor = data_processor
+        self.delay = delay
+        self.max_retries = max_retries
+        self.browser_factory = browser_factory
+        self.handler_factory = handler_factory
+        self.max_rate = max_rate
+        self.min_delay = min_delay
+        self.prefetch = prefetch
+        self.metrics = metrics
+        self.max_restarts_per_hour = max_restarts_per_hour
+        self.max_browser_rss_mb = max_browser_rss_mb
+        self.recycle_browser_every = recycle_browser_every
+        self.worker_factory = worker_factory
+        self.workers: List[ScraperWorker] = []
+        self.feeder: Optional[PromptFeeder] = None
+
+    def run(self, prompts: Iterable[str]):
+        """
+        Process prompts across all workers and wait for them to finish.
+
+        Args:
+            prompts: Prompts to process, possibly a lazy iterator
+        """
+        feeder = self.feeder = PromptFeeder(prompts, self.prefetch)
+        prompt_queue = feeder.start()
+        total = len(prompts) if hasattr(prompts, '__len__') else None
+
+        launch_lock = threading.Lock()
+        rate_limiter = TokenBucket(self.max_rate) if self.max_rate else None
+        threads = []
+        self.workers = []
+
+        for worker_id in range(1, self.num_workers + 1):
+            worker = self.worker_factory(
+                worker_id,
+                prompt_queue,
+                self.browser_factory(worker_id),
+                self.data_processor,
+                delay=self.delay,
+                max_retries=self.max_retries,
+                handler_factory=self.handler_factory,
+                total=total,
+                launch_lock=launch_lock,
+                pacer=PacingScheduler(self.delay, rate_limiter, min_delay=self.min_delay),
+                input_done=feeder.done,
+                metrics=self.metrics,
+                max_restarts_per_hour=self.max_restarts_per_hour,
+                max_browser_rss_mb=self.max_browser_rss_mb,
+                recycle_browser_every=self.recycle_browser_every
+            )
+            self.workers.append(worker)
+            thread = threading.Thread(
+                target=self._run_worker, args=(worker, prompt_queue),
+                name=f"scraper-worker-{worker_id}", daemon=True
+            )
+            threads.append(thread)
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        for worker in self.workers:
+            logger.info(f"[worker {worker.worker_id}] processed={worker.stats['processed']} "
+                        f"failed={worker.stats['failed']} retries={worker.stats['retries']} "
+                        f"restarts={worker.stats['restarts']} recycles={worker.stats['recycles']}")
+
+        if not prompt_queue.empty() or not feeder.done.is_set():
+            self._fail_leftovers(feeder, prompt_queue)
+
+    def _fail_leftovers(self, feeder: PromptFeeder, prompt_queue: PromptQueue):
+        """
+        Stop the feeder once no worker is left and fail the prompts still queued.
+
+        Raises:
+            WorkersStoppedError: Always, so the run ends with an error
+        """
+        feeder.stop()
+        metrics = metrics_or_null(self.metrics)
+        failed = 0
+        while True:
+            try:
+                _, prompt = prompt_queue.get_nowait()
+            except queue.Empty:
+                break
+            failed += 1
+            metrics.increment('failures')
+            try:
+                self.data_processor.record_failure(prompt)
+            except Exception as e:
+                logger.error(f"Could not record the failure of an unprocessed prompt: {e}")
+            prompt_queue.task_done()
+
+        errors = [worker.error for worker in self.workers if worker.error is not None]
+        message = (f"All workers stopped with prompts left: {failed} queued prompts marked failed, "
+                   f"input read up to prompt {feeder.fed}")
+        logger.error(message)
+        raise WorkersStoppedError(message) from (errors[-1] if errors else None)
+
+    @staticmethod
+    def _run_worker(worker: ScraperWorker, prompt_queue: PromptQueue):
+        """Run a worker, handing its in-flight prompts back to the queue if it crashes."""
+        try:
+            worker.run()
+        except Exception as e:
+            logger.error(f"[worker {worker.worker_id}] crashed: {e}")
+            worker.error = e
+            for item in worker.in_flight():
+                prompt_queue.put_back(item)
+                prompt_queue.task_done()
+            worker.current = None
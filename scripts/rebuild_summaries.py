@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Brand summary repair script.
+Rebuilds the brand_summaries totals and the hourly/daily rollups from the
+raw brand_mentions rows.
+"""
+import logging
+import argparse
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path so we can import app modules
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.aggregates import rebuild_brand_summaries, rebuild_rollups
+from app.database import get_session_factory, init_db
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Rebuild brand summaries')
+    parser.add_argument('--db-password', type=str, required=True, help='Database password')
+    parser.add_argument('--skip-rollups', action='store_true', help='Only rebuild the all-time totals')
+    return parser.parse_args()
+
+
+def main():
+    """Main function to rebuild the brand summaries."""
+    args = parse_arguments()
+
+    init_db(args.db_password)
+    db = get_session_factory(args.db_password)()
+    try:
+        totals = rebuild_brand_summaries(db)
+        for brand, count in sorted(totals.items()):
+            logger.info(f"{brand}: {count}")
+        if not args.skip_rollups:
+            rebuild_rollups(db)
+    except Exception as e:
+        logger.error(f"Rebuilding brand summaries failed: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
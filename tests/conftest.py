@@ -0,0 +1,18 @@
+"""
+Shared test fixtures.
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+import app.models  # noqa: F401  (registers the tables on Base)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Session factory bound to a throwaway SQLite database."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
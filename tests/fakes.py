@@ -0,0 +1,125 @@
+"""
+Fake browser components for exercising the scraper without Chrome.
+"""
+import threading
+
+
+class FakeDriver:
+    """Answers health probes until it is marked as crashed."""
+
+    def __init__(self):
+        self.crashed = False
+        self.current_window_handle = 'tab-0'
+
+    def execute_script(self, script, *args):
+        if self.crashed:
+            raise RuntimeError("tab crashed")
+        return 'complete'
+
+
+class FakeBrowserManager:
+    """Stands in for BrowserManager; optionally fails to launch or grows in memory."""
+
+    def __init__(self, fail_launch=False, rss_mb=None, rss_growth_mb=0):
+        self.fail_launch = fail_launch
+        self.base_rss_mb = rss_mb
+        self.rss_growth_mb = rss_growth_mb
+        self.rss_mb = rss_mb
+        self.driver = None
+        self.launched = False
+        self.closed = False
+        self.restarts = 0
+
+    def launch_browser(self):
+        if self.fail_launch:
+            raise RuntimeError("browser failed to start")
+        self.driver = FakeDriver()
+        self.launched = True
+        self.rss_mb = self.base_rss_mb
+
+    def open_tabs(self, count):
+        self.driver.current_window_handle = 'tab-0'
+        return [f'tab-{i}' for i in range(count)]
+
+    def switch_to_tab(self, handle):
+        self.driver.current_window_handle = handle
+
+    def start_new_chat(self):
+        pass
+
+    def restart_browser(self):
+        self.restarts += 1
+        self.launch_browser()
+
+    def browser_rss(self):
+        """Memory in bytes, growing with every reading."""
+        if self.rss_mb is None:
+            return None
+        rss = self.rss_mb * 2**20
+        self.rss_mb += self.rss_growth_mb
+        return rss
+
+    def navigate_to_chatgpt(self):
+        pass
+
+    def handle_stay_logged_out_popup(self):
+        return False
+
+    def recycle_conversation_if_needed(self):
+        return False
+
+    def close_browser(self):
+        self.closed = True
+
+
+class FakeResponseHandler:
+    """Answers every prompt with a canned response mentioning a brand."""
+
+    def __init__(self, driver, fail_prompts=(), polls_per_response=2):
+        self.driver = driver
+        self.fail_prompts = set(fail_prompts)
+        self.polls_per_response = polls_per_response
+        self.pending = {}  # tab handle -> [prompt, polls left]
+        self.max_pending = 0
+
+    def send_prompt(self, prompt):
+        if prompt in self.fail_prompts:
+            raise RuntimeError(f"no response for {prompt}")
+        return f"For '{prompt}' most runners pick Nike."
+
+    def submit_prompt(self, prompt):
+        self.pending[self.driver.current_window_handle] = [prompt, self.polls_per_response]
+        self.max_pending = max(self.max_pending, len(self.pending))
+
+    def response_ready(self):
+        entry = self.pending[self.driver.current_window_handle]
+        entry[1] -= 1
+        return entry[1] <= 0
+
+    def collect_response(self):
+        prompt, _ = self.pending.pop(self.driver.current_window_handle)
+        return self.send_prompt(prompt)
+
+    def retry_with_popup_handling(self, operation, popup_handler, *args, **kwargs):
+        return operation(*args, **kwargs)
+
+
+class FakeDataProcessor:
+    """Collects processed prompt/response pairs in memory."""
+
+    def __init__(self, results=None):
+        self.results = results if results is not None else []
+        self.lock = threading.Lock()
+        self.failures = []
+        self.closed = False
+
+    def process_prompt_response(self, prompt, response):
+        with self.lock:
+            self.results.append((prompt, response))
+
+    def record_failure(self, prompt):
+        with self.lock:
+            self.failures.append(prompt)
+
+    def close(self):
+        self.closed = True
@@ -0,0 +1,103 @@
+"""
+Tests for the incrementally maintained aggregate tables.
+"""
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+
+import app.database as database
+from app.aggregates import ROLLUPS, bucket_start, rebuild_brand_summaries, rebuild_rollups, record_mentions
+from app.api import create_app
+from app.endpoints import query_brand_mentions, query_mentions
+from app.models import BrandMention, BrandSummary
+from scraper.data_processor import DatabaseManager
+
+
+def summaries(session_factory):
+    session = session_factory()
+    try:
+        return {s.brand_name: s.total_mentions for s in session.query(BrandSummary)}
+    finally:
+        session.close()
+
+
+def test_writes_update_brand_summaries(session_factory):
+    """Test that single and batched writes add to the brand totals."""
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_response('p1', 'Nike Nike', {'nike': 2, 'hoka': 0})
+    manager.save_prompt_responses([
+        {'prompt': 'p2', 'response': 'Nike Hoka', 'mentions': {'nike': 1, 'hoka': 1}},
+        {'prompt': 'p3', 'response': 'Adidas', 'mentions': {'adidas': 1}},
+    ])
+    assert summaries(session_factory) == {'nike': 3, 'hoka': 1, 'adidas': 1}
+
+    db = session_factory()
+    mentions = query_mentions(db)
+    assert mentions['nike'] == 3 and mentions['jordan'] == 0
+    assert query_brand_mentions('HOKA', db) == {'brand': 'hoka', 'mentions': 1}
+    db.close()
+
+
+def test_rebuild_repairs_drifted_totals(session_factory):
+    """Test that the repair command recomputes totals from the raw rows."""
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([{'prompt': 'p1', 'response': 'Nike', 'mentions': {'nike': 1}}])
+
+    session = session_factory()
+    session.query(BrandSummary).filter_by(brand_name='nike').update({'total_mentions': 99})
+    session.add(BrandSummary(brand_name='jordan', total_mentions=5))
+    session.commit()
+
+    assert rebuild_brand_summaries(session) == {'nike': 1}
+    session.close()
+    assert summaries(session_factory) == {'nike': 1, 'jordan': 0}
+
+
+def test_rollups_bucket_by_hour_and_day(session_factory):
+    """Test that rollups add up per bucket and match a rebuild from raw rows."""
+    session = session_factory()
+    for hour, mentions in ((9, {'nike': 2}), (9, {'nike': 1, 'hoka': 1}), (17, {'nike': 4})):
+        at = datetime(2025, 3, 1, hour, 30, tzinfo=timezone.utc)
+        session.add(BrandMention(prompt_id=1, brand_name='nike', mention_count=mentions['nike'], created_at=at))
+        if 'hoka' in mentions:
+            session.add(BrandMention(prompt_id=1, brand_name='hoka', mention_count=1, created_at=at))
+        record_mentions(session, mentions, at)
+    session.commit()
+
+    def rollups():
+        return {
+            bucket: sorted((bucket_start(r.bucket_start, bucket).hour, r.brand_name, r.mention_count)
+                           for r in session.query(model))
+            for bucket, model in ROLLUPS.items()
+        }
+
+    incremental = rollups()
+    assert incremental == {
+        'hour': [(9, 'hoka', 1), (9, 'nike', 3), (17, 'nike', 4)],
+        'day': [(0, 'hoka', 1), (0, 'nike', 7)],
+    }
+    assert rebuild_rollups(session) == 3
+    assert rollups() == incremental
+    session.close()
+
+
+def test_timeseries_endpoint_reads_rollups(tmp_path, monkeypatch):
+    """Test /mentions/timeseries end to end, including bucket validation."""
+    monkeypatch.setattr(database, "get_database_url", lambda password: f"sqlite:///{tmp_path / 'api.db'}")
+    with TestClient(create_app("pw")) as client:
+        db = database.get_session_factory("pw")()
+        record_mentions(db, {'nike': 2, 'hoka': 1}, datetime(2025, 3, 1, 9, tzinfo=timezone.utc))
+        record_mentions(db, {'nike': 5}, datetime(2025, 3, 2, 9, tzinfo=timezone.utc))
+        db.commit()
+        db.close()
+
+        response = client.get("/mentions/timeseries", params={
+            "brand": "Nike", "from": "2025-03-01T00:00:00", "to": "2025-03-03T00:00:00", "bucket": "day"
+        })
+        assert response.status_code == 200
+        assert response.json()["series"] == {"nike": [
+            {"bucket_start": "2025-03-01T00:00:00+00:00", "mentions": 2},
+            {"bucket_start": "2025-03-02T00:00:00+00:00", "mentions": 5},
+        ]}
+        assert client.get("/mentions/timeseries", params={"bucket": "week"}).status_code == 400
+    database.dispose_engines()
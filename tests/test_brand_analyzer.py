@@ -0,0 +1,66 @@
+"""
+Tests for brand mention extraction.
+"""
+import random
+
+from scraper.brand_analyzer import BrandAnalyzer
+from scraper.brand_matcher import BrandMatcher
+from scraper.utils import BRANDS, create_brand_patterns
+
+
+def per_pattern_count(brands, text):
+    """Reference counts from one regex scan per brand."""
+    patterns = create_brand_patterns(brands)
+    return {brand: len(pattern.findall(text)) for brand, pattern in patterns.items()}
+
+
+def test_extract_brand_mentions_counts_all_brands():
+    """Test that every tracked brand is reported, including zero counts."""
+    analyzer = BrandAnalyzer()
+    mentions = analyzer.extract_brand_mentions("Nike and ADIDAS beat nike's rivals.")
+    assert set(mentions) == set(BRANDS)
+    assert mentions['nike'] == 2
+    assert mentions['adidas'] == 1
+    assert mentions['hoka'] == 0
+
+
+def test_word_boundaries_and_multi_word_brands():
+    """Test that partial words don't match and multi-word brands do."""
+    analyzer = BrandAnalyzer()
+    text = "Nikes, hokas and newbalance don't count; New Balance and new balance do."
+    mentions = analyzer.extract_brand_mentions(text)
+    assert mentions['nike'] == 0
+    assert mentions['hoka'] == 0
+    assert mentions['new balance'] == 2
+
+
+def test_matcher_agrees_with_per_pattern_loop():
+    """Test the single-pass matcher against separate per-brand scans."""
+    brands = BRANDS + ['air jordan', 'jordans', 'on', 'on running', 'asics']
+    text = (
+        "Air Jordan 1s vs Jordans: Jordan wins. On Running shoes run on foam, "
+        "ASICS and asics-gel too. NIKE/Adidas; new balance 990 or New  Balance."
+    )
+    assert BrandMatcher(brands).count(text) == per_pattern_count(brands, text)
+
+    overlapping = ['nike air', 'air jordan', 'jordan', 'new balance', 'balance shoes', 'on on']
+    text = "Nike Air Jordan 1s, new balance shoes and NEW BALANCE SHOES; on on on and on."
+    counts = BrandMatcher(overlapping).count(text)
+    assert counts == per_pattern_count(overlapping, text)
+    assert counts['air jordan'] == 1 and counts['balance shoes'] == 2 and counts['on on'] == 1
+
+
+def test_matcher_agrees_with_per_pattern_loop_on_random_text():
+    """Test overlapping and nested brands against separate scans over many random texts."""
+    rng = random.Random(0)
+    brands = BRANDS + ['nike air', 'air jordan', 'balance shoes', 'air', 'on', 'on running']
+    words = ['nike', 'air', 'jordan', 'new', 'balance', 'shoes', 'on', 'running', 'hoka', 'and', 'NIKE', 'Air']
+    for _ in range(2000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        assert BrandMatcher(brands).count(text) == per_pattern_count(brands, text), text
+
+
+def test_custom_brand_list():
+    """Test that the analyzer can track a custom brand list."""
+    analyzer = BrandAnalyzer(brands=['puma'])
+    assert analyzer.extract_brand_mentions("Puma or PUMA?") == {'puma': 2}
@@ -0,0 +1,64 @@
+"""
+Tests for conversation recycling in the browser manager.
+"""
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from scraper.browser_manager import BrowserManager
+from scraper.page_scripts import DOM_SIZE
+
+
+class ConversationDriver:
+    """Fake driver with a chat box, a settable page size and a log of page loads."""
+
+    def __init__(self, dom_size=100):
+        self.dom_size = dom_size
+        self.loads = []
+
+    def get(self, url):
+        self.loads.append(url)
+
+    def find_element(self, by, value):
+        if by == By.ID and value == 'prompt-textarea':
+            return object()
+        raise NoSuchElementException(value)
+
+    def execute_script(self, script, *args):
+        assert script == DOM_SIZE
+        return self.dom_size
+
+
+def make_manager(new_chat_every, max_dom_nodes, dom_size=100):
+    manager = BrowserManager('http://chat.test/', new_chat_every, max_dom_nodes)
+    manager.driver = ConversationDriver(dom_size)
+    return manager
+
+
+def test_new_chat_after_prompt_count():
+    """Test that a new chat starts once the conversation reaches the prompt limit."""
+    manager = make_manager(new_chat_every=3, max_dom_nodes=0)
+    assert [manager.recycle_conversation_if_needed() for _ in range(6)] == [False, False, True] * 2
+    assert manager.driver.loads == ['http://chat.test/'] * 2
+    assert manager.conversation_prompts == 0
+
+
+def test_new_chat_after_dom_size():
+    """Test that a page grown past the node limit starts a new chat regardless of prompt count."""
+    manager = make_manager(new_chat_every=0, max_dom_nodes=500, dom_size=499)
+    assert not manager.recycle_conversation_if_needed()
+    manager.driver.dom_size = 500
+    assert manager.recycle_conversation_if_needed()
+    assert manager.driver.loads == ['http://chat.test/']
+
+
+def test_zero_disables_each_threshold():
+    """Test that 0 turns off the prompt limit and the DOM-size limit independently."""
+    by_size_only = make_manager(new_chat_every=0, max_dom_nodes=500, dom_size=10)
+    assert not any(by_size_only.recycle_conversation_if_needed() for _ in range(50))
+
+    by_count_only = make_manager(new_chat_every=100, max_dom_nodes=0, dom_size=10 ** 6)
+    assert not any(by_count_only.recycle_conversation_if_needed() for _ in range(50))
+
+    neither = make_manager(new_chat_every=0, max_dom_nodes=0, dom_size=10 ** 6)
+    assert not any(neither.recycle_conversation_if_needed() for _ in range(50))
+    assert neither.driver.loads == []
@@ -0,0 +1,54 @@
+"""
+Tests for the shared database engine and session dependency.
+"""
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import app.database as database
+from app.endpoints import get_db_dependency
+
+
+@pytest.fixture
+def sqlite_url(tmp_path, monkeypatch):
+    """Point the database helpers at a throwaway SQLite file."""
+    url = f"sqlite:///{tmp_path / 'api.db'}"
+    monkeypatch.setattr(database, "get_database_url", lambda password: url)
+    yield url
+    database.dispose_engines()
+
+
+def test_engine_is_shared_per_database(sqlite_url):
+    """Test that repeated calls reuse one engine and session factory."""
+    engine = database.get_engine("pw")
+    assert database.get_engine("pw") is engine
+    assert database.get_session_factory("pw").kw["bind"] is engine
+
+
+def test_dependency_closes_sessions(sqlite_url, monkeypatch):
+    """Test that each request gets a session that is closed afterwards."""
+    sessions = []
+    factory = database.get_session_factory("pw")
+
+    def tracking_factory():
+        session = factory()
+        sessions.append(session)
+        return session
+
+    monkeypatch.setattr(database, "get_session_factory", lambda password: tracking_factory)
+
+    app = FastAPI()
+
+    @app.get("/ping")
+    def ping(db=Depends(get_db_dependency("pw"))):
+        return {"value": db.execute(text("SELECT 1")).scalar()}
+
+    client = TestClient(app)
+    for _ in range(3):
+        assert client.get("/ping").json() == {"value": 1}
+
+    assert len(sessions) == 3
+    # Closed sessions have handed their connections back to the pool
+    assert not any(session.in_transaction() for session in sessions)
+    assert database.get_engine("pw").pool.checkedout() == 0
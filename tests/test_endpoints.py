@@ -0,0 +1,28 @@
+"""
+Tests for running endpoint database work off the event loop.
+"""
+import time
+
+import anyio
+
+from app.endpoints import get_brand_mentions, run_db
+
+
+def test_blocking_queries_run_concurrently():
+    """Test that slow queries overlap instead of blocking the event loop."""
+    async def main():
+        start = time.perf_counter()
+        async with anyio.create_task_group() as tg:
+            for _ in range(4):
+                tg.start_soon(run_db, time.sleep, 0.2)
+        return time.perf_counter() - start
+
+    assert anyio.run(main) < 0.6
+
+
+def test_brand_mentions_from_worker_thread(session_factory):
+    """Test that an offloaded query returns the usual payload."""
+    db = session_factory()
+    result = anyio.run(get_brand_mentions, "NIKE", db)
+    db.close()
+    assert result == {"brand": "nike", "mentions": 0}
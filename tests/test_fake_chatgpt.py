@@ -0,0 +1,49 @@
+"""
+Tests for the local fake ChatGPT server used by the benchmarks.
+"""
+import json
+import time
+from urllib.request import Request, urlopen
+
+from benchmarks.fake_chatgpt import FakeChatGPT, FakeChatGPTServer
+from scraper.brand_analyzer import BrandAnalyzer
+from scraper.utils import CHATGPT_STOP_BUTTON_SELECTOR
+
+
+def post_prompt(server, prompt):
+    request = Request(server.url + 'backend-api/conversation', data=json.dumps({'prompt': prompt}).encode(),
+                      headers={'Content-Type': 'application/json'})
+    with urlopen(request) as response:
+        events = response.read().decode().split('\n\n')
+    assert events[-2] == 'data: [DONE]'
+    return "".join(json.loads(event[len('data: '):])['text'] for event in events[:-2])
+
+
+def test_page_has_the_elements_the_scraper_drives():
+    """Test that the chat page carries the selectors and popup the scraper looks for."""
+    with FakeChatGPTServer(FakeChatGPT(popup_every=3)) as server:
+        page = urlopen(server.url).read().decode()
+        stats = json.loads(urlopen(server.url + 'stats').read())
+
+    assert 'id="prompt-textarea"' in page
+    assert "'data-message-author-role', role" in page
+    assert "'data-testid', 'stop-button'" in page and 'stop-button' in CHATGPT_STOP_BUTTON_SELECTOR
+    assert '>Stay logged out</a>' in page
+    assert '"popupEvery": 3' in page
+    assert stats == {'page_loads': 1}
+
+
+def test_answers_stream_at_the_configured_rate():
+    """Test that answers are deterministic, as long as asked for and paced by the token rate."""
+    app = FakeChatGPT(tokens_per_second=200, answer_tokens=40, first_token_delay=0)
+    with FakeChatGPTServer(app) as server:
+        start = time.monotonic()
+        answer = post_prompt(server, "best running shoes")
+        elapsed = time.monotonic() - start
+        assert post_prompt(server, "best running shoes") == answer
+        stats = json.loads(urlopen(server.url + 'stats').read())
+
+    assert len(answer.split()) == 40
+    assert 0.15 < elapsed < 2
+    assert any(BrandAnalyzer().extract_brand_mentions(answer).values())
+    assert stats['prompts'] == 2
@@ -0,0 +1,213 @@
+"""
+Tests for the shared scrape job queue.
+"""
+import multiprocessing
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import Prompt, ScrapeJob
+from scraper.brand_analyzer import BrandAnalyzer
+from scraper.data_processor import DatabaseManager
+from scraper.job_queue import JobQueue
+from scraper.pipeline import ProcessingPipeline
+from scraper.utils import JOB_RUN_ID
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def jobs(session_factory):
+    session = session_factory()
+    rows = {job.prompt_text: (job.status, job.attempts, job.lease_owner) for job in session.query(ScrapeJob)}
+    session.close()
+    return rows
+
+
+def test_claims_are_exclusive_and_settled_after_write(session_factory):
+    """Test that two workers never claim the same job and settled jobs leave the queue."""
+    clock = FakeClock()
+    first = JobQueue(session_factory, 'host-a', lease_seconds=60, clock=clock)
+    second = JobQueue(session_factory, 'host-b', lease_seconds=60, clock=clock)
+    assert first.enqueue(['p1', 'p2', 'p3']) == 3
+
+    claimed = [prompt for _, prompt, _ in first.claim(2)] + [prompt for _, prompt, _ in second.claim(2)]
+    assert claimed == ['p1', 'p2', 'p3']
+    assert second.claim() == []
+
+    first.settle_records([{'prompt': 'p1'}, {'prompt': 'p2', 'failed': True}])
+    second.settle(done=['p3'])
+    assert jobs(session_factory) == {
+        'p1': ('done', 1, None),
+        'p2': ('queued', 1, None),
+        'p3': ('done', 1, None),
+    }
+    assert first.remaining() == 1
+
+
+def test_expired_leases_are_requeued_until_attempts_run_out(session_factory):
+    """Test that a crashed worker's jobs go back to the queue, then fail after max attempts."""
+    clock = FakeClock()
+    crashed = JobQueue(session_factory, 'crashed', lease_seconds=60, max_attempts=2, clock=clock)
+    crashed.enqueue(['p1'])
+    crashed.claim()
+
+    survivor = JobQueue(session_factory, 'survivor', lease_seconds=60, max_attempts=2, clock=clock)
+    assert survivor.requeue_expired() == 0
+    clock.now += 61
+    assert survivor.requeue_expired() == 1
+    assert jobs(session_factory)['p1'] == ('queued', 1, None)
+
+    survivor.claim()
+    clock.now += 30
+    assert survivor.heartbeat() == 1
+    clock.now += 45
+    assert survivor.requeue_expired() == 0  # the heartbeat extended the lease
+
+    clock.now += 60
+    survivor.requeue_expired()
+    assert jobs(session_factory)['p1'] == ('failed', 2, None)
+
+
+def test_iter_prompts_waits_for_other_hosts_leases(session_factory):
+    """Test that a worker keeps polling while another host holds jobs that may come back."""
+    clock = FakeClock()
+    other = JobQueue(session_factory, 'other', lease_seconds=60, clock=clock)
+    other.enqueue(['p1', 'p2'])
+    other.claim(2)
+
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        clock.now += seconds
+
+    worker = JobQueue(session_factory, 'worker', lease_seconds=60, poll_interval=20, clock=clock, sleep=sleep)
+    prompts = []
+    for prompt in worker.iter_prompts():
+        prompts.append(prompt)
+        worker.settle(done=[prompt])
+    assert prompts == ['p1', 'p2']
+    assert waits == [20, 20, 20, 20]
+    assert worker.remaining() == 0
+
+
+def write_results(session_factory, job_queue, prompts, settle=True, manager_factory=DatabaseManager):
+    """Push responses through the pipeline the way queue workers do."""
+    pipeline = ProcessingPipeline(session_factory, BrandAnalyzer(['Nike']), run_id=JOB_RUN_ID,
+                                  on_written=job_queue.settle_records if settle else None,
+                                  on_dropped=job_queue.settle_dropped if settle else None,
+                                  run_id_for=job_queue.run_id_for, manager_factory=manager_factory,
+                                  batch_interval=0.01)
+    pipeline.start()
+    for prompt in prompts:
+        pipeline.process_prompt_response(prompt, f"For {prompt}: Nike")
+    pipeline.close()
+
+
+def test_prompts_enqueued_again_are_stored_again(session_factory):
+    """Test that each enqueued copy of a prompt gets its own stored response."""
+    job_queue = JobQueue(session_factory, 'worker', lease_seconds=60, poll_interval=0.05, clock=FakeClock())
+    job_queue.enqueue(['p1'])
+    job_queue.enqueue(['p1'])
+
+    write_results(session_factory, job_queue, job_queue.iter_prompts())
+
+    session = session_factory()
+    assert [prompt.prompt_text for prompt in session.query(Prompt)] == ['p1', 'p1']
+    assert [job.status for job in session.query(ScrapeJob)] == ['done', 'done']
+    session.close()
+
+
+def test_job_retried_after_a_crash_is_stored_once(session_factory):
+    """Test that a job whose result was written before its host died is not stored twice."""
+    clock = FakeClock()
+    crashed = JobQueue(session_factory, 'crashed', lease_seconds=60, clock=clock)
+    crashed.enqueue(['p1'])
+    crashed.claim()
+    # The result is committed, but the host dies before settling the job
+    write_results(session_factory, crashed, ['p1'], settle=False)
+
+    clock.now += 61
+    survivor = JobQueue(session_factory, 'survivor', lease_seconds=60, poll_interval=0.05, clock=clock)
+    write_results(session_factory, survivor, survivor.iter_prompts())
+
+    session = session_factory()
+    assert session.query(Prompt).count() == 1
+    assert jobs(session_factory)['p1'] == ('done', 2, None)
+    session.close()
+
+
+def test_queue_drains_when_results_cannot_be_written(session_factory, monkeypatch):
+    """Test that jobs whose results the pipeline drops are failed, not held and heartbeated forever."""
+    class FailingDatabaseManager(DatabaseManager):
+        def save_prompt_responses(self, records):
+            raise RuntimeError("deadlock detected")
+
+    monkeypatch.setattr('scraper.pipeline.PIPELINE_WRITE_RETRIES', 1)
+    job_queue = JobQueue(session_factory, 'worker', lease_seconds=60, max_attempts=2, poll_interval=0.05)
+    job_queue.enqueue(['p1'])
+    job_queue.start_heartbeat()
+    finished = threading.Event()
+
+    def drain():
+        write_results(session_factory, job_queue, job_queue.iter_prompts(), manager_factory=FailingDatabaseManager)
+        finished.set()
+
+    threading.Thread(target=drain, daemon=True).start()
+    assert finished.wait(15)
+    job_queue.close()
+
+    assert jobs(session_factory)['p1'] == ('failed', 2, None)
+    assert job_queue.held == {} and job_queue.remaining() == 0
+
+
+def _queue_worker(url, name, crash):
+    """Claim and settle jobs in a separate process; a crashing worker never settles."""
+    engine = create_engine(url)
+    queue = JobQueue(sessionmaker(bind=engine), name, lease_seconds=2, poll_interval=0.2)
+    if crash:
+        queue.claim(5)
+        os._exit(0)
+    for prompt in queue.iter_prompts():
+        queue.settle(done=[prompt])
+    engine.dispose()
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'),
+                    reason="set TEST_DATABASE_URL to a scratch Postgres database")
+def test_many_processes_drain_the_queue_on_postgres():
+    """Test SKIP LOCKED claiming across processes, including one that dies holding leases."""
+    url = os.environ['TEST_DATABASE_URL']
+    engine = create_engine(url)
+    ScrapeJob.__table__.drop(engine, checkfirst=True)
+    Base.metadata.create_all(engine, tables=[ScrapeJob.__table__])
+    factory = sessionmaker(bind=engine)
+    JobQueue(factory).enqueue(f"prompt {i}" for i in range(200))
+
+    context = multiprocessing.get_context('spawn')
+    crashed = context.Process(target=_queue_worker, args=(url, 'crashed', True))
+    crashed.start()
+    crashed.join()
+    workers = [context.Process(target=_queue_worker, args=(url, f"worker-{i}", False)) for i in range(8)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(timeout=120)
+        assert process.exitcode == 0
+
+    rows = jobs(factory)
+    assert len(rows) == 200
+    assert {status for status, _, _ in rows.values()} == {'done'}
+    # Only the crashed worker's five jobs were claimed twice
+    assert sorted(attempts for _, attempts, _ in rows.values()).count(2) == 5
+    engine.dispose()
@@ -0,0 +1,78 @@
+"""
+Tests for lean page mode.
+"""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from scraper.browser_manager import BrowserManager
+from scraper.lean_page import blocked_url_patterns, process_tree_rss
+from scraper.utils import LEAN_BROWSER_OPTIONS
+
+
+class RecordingDriver:
+    def __init__(self):
+        self.commands = []
+
+    def execute_cdp_cmd(self, command, params):
+        self.commands.append((command, params))
+
+
+def test_block_list_covers_types_and_urls():
+    """Test that resource types expand to extension patterns, query strings included."""
+    patterns = blocked_url_patterns(['font'], ['*tracker.example*'])
+    assert '*.woff2' in patterns
+    assert '*.woff2?*' in patterns
+    assert '*tracker.example*' in patterns
+    assert not any(pattern.startswith('*.png') for pattern in patterns)
+
+
+def test_allow_list_removes_types_and_patterns():
+    """Test that allow entries take resource types and matching patterns off the block list."""
+    patterns = blocked_url_patterns(['image', 'font'], ['*segment.io*', '*hotjar.com*'],
+                                    allow=['font', '*.svg*', '*segment*'])
+    assert not any('woff' in pattern for pattern in patterns)
+    assert '*.svg' not in patterns and '*.svg?*' not in patterns
+    assert '*.png' in patterns
+    assert patterns[-1] == '*hotjar.com*'
+    with pytest.raises(ValueError):
+        blocked_url_patterns(['stylesheet'])
+
+
+def test_lean_manager_blocks_requests_and_adds_flags():
+    """Test that lean mode adds its Chrome flags and installs the block list on the tab."""
+    manager = BrowserManager(lean=True, lean_allow=['image'])
+    arguments = manager._build_options().arguments
+    assert '--disable-background-networking' in arguments
+    assert not any('imagesEnabled' in argument for argument in arguments)
+
+    manager.driver = RecordingDriver()
+    manager.apply_lean_mode()
+    assert [command for command, _ in manager.driver.commands] == ['Network.enable', 'Network.setBlockedURLs']
+    assert manager.driver.commands[1][1]['urls'] == manager.blocked_urls
+
+    full = BrowserManager()
+    assert not set(LEAN_BROWSER_OPTIONS) & set(full._build_options().arguments)
+    full.driver = RecordingDriver()
+    full.apply_lean_mode()
+    assert full.driver.commands == []
+
+
+@pytest.mark.skipif(not os.path.isdir('/proc'), reason="needs /proc")
+def test_process_tree_rss_includes_children():
+    """Test that descendants' memory is counted, and shared descendants only once."""
+    child = subprocess.Popen(
+        [sys.executable, '-c', 'import time; x = bytearray(b"x" * 50 * 2**20); print("ready", flush=True); time.sleep(30)'],
+        stdout=subprocess.PIPE, text=True
+    )
+    try:
+        assert child.stdout.readline().strip() == 'ready'
+        child_rss = process_tree_rss(child.pid)
+        assert child_rss > 40 * 2**20
+        assert process_tree_rss(os.getpid()) > child_rss
+        assert process_tree_rss(child.pid, child.pid) == child_rss
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,70 @@
+"""
+Tests for the run ledger and idempotent, resumable writes.
+"""
+from app.models import Prompt, PromptLedger
+from scraper.data_processor import DatabaseManager
+from scraper.ledger import RunLedger
+from scraper.utils import prompt_hash
+
+
+def make_record(run_id, prompt, **fields):
+    record = {'prompt': prompt, 'run_id': run_id, 'prompt_hash': prompt_hash(prompt)}
+    record.setdefault('response', f"Answer to {prompt}: Nike")
+    record.setdefault('mentions', {'nike': 1})
+    record.update(fields)
+    return record
+
+
+def test_prompt_hash_ignores_case_and_spacing():
+    """Test that trivially different copies of a prompt share a hash."""
+    assert prompt_hash("Best  running shoes?") == prompt_hash(" best running SHOES? ")
+    assert prompt_hash("Best running shoes?") != prompt_hash("Best trail shoes?")
+
+
+def test_resume_skips_completed_and_retries_failed(session_factory):
+    """Test that a resumed run only yields prompts without a stored result."""
+    ledger = RunLedger(session_factory, 'run-1')
+    assert list(ledger.pending(['p1', 'p2', 'p3', 'P1'])) == ['p1', 'p2', 'p3']
+
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([
+        make_record('run-1', 'p1'),
+        make_record('run-1', 'p2', failed=True),
+    ])
+
+    resumed = RunLedger(session_factory, 'run-1')
+    assert list(resumed.pending(['p1', 'p2', 'p3'])) == ['p2', 'p3']
+    assert resumed.skipped == 1
+    assert resumed.summary() == {'pending': 1, 'completed': 1, 'failed': 1}
+
+    # A different run starts from scratch
+    assert list(RunLedger(session_factory, 'run-2').pending(['p1'])) == ['p1']
+    assert RunLedger.latest_run_id(session_factory) == 'run-2'
+
+
+def test_repeated_writes_are_idempotent(session_factory):
+    """Test that writing the same result twice stores it once."""
+    RunLedger(session_factory, 'run-1')._register({prompt_hash('p1'): 'p1'})
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([make_record('run-1', 'p1'), make_record('run-1', 'p1')])
+    manager.save_prompt_responses([make_record('run-1', 'p1')])
+
+    session = session_factory()
+    prompts = session.query(Prompt).all()
+    entry = session.query(PromptLedger).one()
+    assert len(prompts) == 1
+    assert (entry.status, entry.prompt_id, entry.attempts) == ('completed', prompts[0].id, 1)
+
+
+def test_repeats_in_later_chunks_are_stored_once(session_factory, monkeypatch):
+    """Test that a repeat outside its chunk is yielded again but stored only once."""
+    monkeypatch.setattr('scraper.ledger.LEDGER_CHUNK_SIZE', 2)
+    ledger = RunLedger(session_factory, 'run-1')
+    pending = list(ledger.pending(['p1', 'p2', 'P1', 'p3']))
+    assert pending == ['p1', 'p2', 'P1', 'p3']
+
+    DatabaseManager(session_factory()).save_prompt_responses([make_record('run-1', p) for p in pending])
+
+    session = session_factory()
+    assert sorted(prompt.prompt_text for prompt in session.query(Prompt)) == ['p1', 'p2', 'p3']
+    assert ledger.summary() == {'pending': 0, 'completed': 3, 'failed': 0}
@@ -0,0 +1,92 @@
+"""
+Tests for per-stage run metrics.
+"""
+import json
+
+import pytest
+
+from scraper.metrics import RunMetrics, percentile
+from scraper.worker_pool import WorkerPool
+from tests.fakes import FakeBrowserManager, FakeDataProcessor, FakeResponseHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_percentiles_use_nearest_rank():
+    """Test p50/p95/p99 on a known distribution."""
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.95) == 95.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_stage_times_blocks_including_failures():
+    """Test that stage() records durations, and counts a block that raised as an error."""
+    clock = FakeClock()
+    metrics = RunMetrics(clock=clock)
+    for seconds in (1.0, 2.0, 3.0):
+        with metrics.stage('send_prompt'):
+            clock.now += seconds
+    with pytest.raises(RuntimeError):
+        with metrics.stage('send_prompt'):
+            clock.now += 10.0
+            raise RuntimeError("timed out")
+    metrics.increment('prompts', 3)
+    metrics.increment('retries')
+
+    summary = metrics.summary()
+    stats = summary['stages']['send_prompt']
+    assert (stats['count'], stats['errors'], stats['total'], stats['p50'], stats['max']) == (4, 1, 16.0, 2.0, 10.0)
+    assert summary['prompts'] == 3
+    assert summary['retries'] == 1
+    assert summary['prompts_per_hour'] == 3 * 3600 / 16.0
+
+
+def test_samples_are_bounded_on_long_runs():
+    """Test that only max_samples durations are kept while counts stay exact."""
+    metrics = RunMetrics(max_samples=100)
+    for i in range(10000):
+        metrics.observe('analyze', i / 10000)
+    timings = metrics.stages['analyze']
+    assert len(timings.samples) == 100
+    assert timings.count == 10000
+    assert 0.3 < metrics.summary()['stages']['analyze']['p50'] < 0.7
+
+
+def test_run_summary_files(tmp_path):
+    """Test the JSON and Prometheus textfile outputs of an instrumented worker run."""
+    metrics = RunMetrics()
+    results = []
+    pool = WorkerPool(
+        2,
+        FakeDataProcessor(results),
+        delay=0,
+        browser_factory=lambda worker_id: FakeBrowserManager(),
+        handler_factory=lambda driver: FakeResponseHandler(driver, fail_prompts={"prompt 2"}),
+        metrics=metrics
+    )
+    pool.run([f"prompt {i}" for i in range(1, 6)])
+
+    metrics.write_json(str(tmp_path / 'metrics.json'))
+    metrics.write_prometheus(str(tmp_path / 'metrics.prom'))
+
+    summary = json.loads((tmp_path / 'metrics.json').read_text())
+    assert summary['prompts'] == 4
+    assert summary['failures'] == 1
+    assert summary['retries'] == pool.max_retries - 1
+    assert summary['stages']['launch_browser']['count'] == 2
+    assert summary['stages']['prompt']['count'] == 5
+    assert summary['stages']['send_prompt']['errors'] == pool.max_retries
+
+    prom = (tmp_path / 'metrics.prom').read_text()
+    assert '# TYPE scraper_stage_seconds summary' in prom
+    assert 'scraper_stage_seconds_count{stage="prompt"} 5' in prom
+    assert 'scraper_events_total{event="failures"} 1' in prom
+    assert 'scraper_stage_seconds{stage="send_prompt",quantile="0.99"}' in prom
@@ -0,0 +1,84 @@
+"""
+Tests for request pacing.
+"""
+import random
+
+from scraper.pacing import PacingScheduler, TokenBucket
+
+
+class FakeClock:
+    """Manually advanced clock whose sleep just moves time forward."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def make_scheduler(clock, **kwargs):
+    kwargs.setdefault('min_delay', 1)
+    return PacingScheduler(10, clock=clock, sleep=clock.sleep, rng=random.Random(0), **kwargs)
+
+
+def test_token_bucket_enforces_rate():
+    """Test that requests beyond the burst wait for new tokens."""
+    clock = FakeClock()
+    bucket = TokenBucket(30, burst=2, clock=clock, sleep=clock.sleep)
+    waits = [bucket.acquire() for _ in range(4)]
+    assert waits[:2] == [0, 0]
+    assert waits[2] == waits[3] == 2.0
+
+
+def test_delay_shrinks_after_success_streak():
+    """Test that a run of successes speeds the worker up, down to min_delay."""
+    clock = FakeClock()
+    pacer = make_scheduler(clock, speedup_after=2, speedup_factor=0.5)
+    for _ in range(20):
+        pacer.record_success()
+    assert pacer.current_delay == 1
+
+
+def test_failure_slows_down():
+    """Test that a failure doubles the delay."""
+    clock = FakeClock()
+    pacer = make_scheduler(clock, max_delay=30)
+    pacer.record_failure()
+    assert pacer.current_delay == 20
+    pacer.record_failure()
+    pacer.record_failure()
+    assert pacer.current_delay == 30
+
+
+def test_wait_for_slot_only_waits_the_remaining_delay():
+    """Test that time already spent since the last request counts toward the delay."""
+    clock = FakeClock()
+    pacer = make_scheduler(clock)
+    assert pacer.wait_for_slot() == 0
+    pacer.record_success()
+    clock.now += 4
+    assert pacer.wait_for_slot() == 6
+
+
+def test_backoff_is_jittered_and_exponential():
+    """Test that backoff grows per attempt and stays within its jitter band."""
+    clock = FakeClock()
+    pacer = make_scheduler(clock, max_backoff=1000)
+    for attempt in (1, 2, 3):
+        ceiling = 20 * 2 ** (attempt - 1)
+        assert ceiling / 2 <= pacer.backoff_delay(attempt) <= ceiling
+
+
+def test_throughput_tracks_completions():
+    """Test prompts-per-hour over the recent window."""
+    clock = FakeClock()
+    pacer = make_scheduler(clock)
+    for _ in range(10):
+        clock.now += 36
+        pacer.record_success()
+    assert round(pacer.throughput()) == 111
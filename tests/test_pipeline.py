@@ -0,0 +1,194 @@
+"""
+Tests for the background analysis/persistence pipeline.
+"""
+import os
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.models import BrandMention, Prompt, PromptLedger
+from scraper.data_processor import DatabaseManager
+from scraper.pipeline import PipelineError, ProcessingPipeline
+from scraper.utils import prompt_hash
+
+
+class SlowDatabaseManager:
+    """Records batches and takes a while to commit each one."""
+
+    batches = []
+
+    def __init__(self, session):
+        self.commit_time = 0.2
+
+    def save_prompt_responses(self, records):
+        time.sleep(self.commit_time)
+        self.batches.append(list(records))
+
+    def close(self):
+        pass
+
+
+def test_save_prompt_responses_writes_one_batch(session_factory):
+    """Test that a batch of prompts and mentions is stored in one call."""
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([
+        {'prompt': 'p1', 'response': 'Nike Nike', 'mentions': {'nike': 2, 'hoka': 0}},
+        {'prompt': 'p2', 'response': 'Hoka', 'mentions': {'nike': 0, 'hoka': 1}},
+    ])
+
+    session = session_factory()
+    prompts = {p.prompt_text: p.id for p in session.query(Prompt).all()}
+    mentions = {(m.prompt_id, m.brand_name): m.mention_count for m in session.query(BrandMention).all()}
+    assert mentions == {(prompts['p1'], 'nike'): 2, (prompts['p2'], 'hoka'): 1}
+
+
+def test_bulk_insert_keeps_ids_in_order_across_chunks(session_factory, monkeypatch):
+    """Test that mentions land on the right prompts when inserts are split into chunks."""
+    monkeypatch.setattr('scraper.data_processor.BULK_CHUNK_SIZE', 3)
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([
+        {'prompt': f'p{i}', 'response': 'Nike ' * i, 'mentions': {'nike': i}} for i in range(1, 11)
+    ])
+
+    session = session_factory()
+    counts = {
+        prompt.prompt_text: mention.mention_count
+        for prompt, mention in session.query(Prompt, BrandMention).filter(BrandMention.prompt_id == Prompt.id)
+    }
+    assert counts == {f'p{i}': i for i in range(1, 11)}
+
+
+def stored_run(session, run_id):
+    """Prompts of a run in id order, with their response, ledger status and mentions."""
+    rows = session.query(PromptLedger, Prompt).filter(
+        PromptLedger.run_id == run_id, PromptLedger.prompt_id == Prompt.id
+    ).order_by(Prompt.id).all()
+    mentions = {}
+    for mention in session.query(BrandMention).filter(BrandMention.prompt_id.in_([p.id for _, p in rows])):
+        mentions.setdefault(mention.prompt_id, {})[mention.brand_name] = mention.mention_count
+    return [(prompt.prompt_text, prompt.response_text, entry.status, mentions.get(prompt.id, {}))
+            for entry, prompt in rows]
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_DATABASE_URL'),
+                    reason="set TEST_DATABASE_URL to a scratch Postgres database")
+def test_copy_stores_the_same_rows_as_inserts_on_postgres(monkeypatch):
+    """Test that COPY with reserved ids links prompts, ledger entries and mentions like INSERT does."""
+    monkeypatch.setattr('scraper.data_processor.BULK_CHUNK_SIZE', 3)
+    engine = create_engine(os.environ['TEST_DATABASE_URL'])
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+
+    def records(run_id):
+        responses = ['Nike, "Hoka" and a\nnewline', '', 'Nike ' * 8, 'None here', 'Hoka\\Nike']
+        return [{'prompt': f'p{i}', 'response': response, 'mentions': {'nike': i, 'hoka': i % 2},
+                 'run_id': run_id, 'prompt_hash': prompt_hash(f'p{i}')} for i, response in enumerate(responses)]
+
+    manager = DatabaseManager(factory())
+    manager.save_prompt_responses(records('insert'), use_copy=False)
+    manager.save_prompt_responses(records('copy'), use_copy=True)
+    # The sequence moved past the reserved ids, so later inserts do not collide
+    manager.save_prompt_responses(records('after-copy'), use_copy=False)
+    manager.close()
+
+    session = factory()
+    inserted = stored_run(session, 'insert')
+    assert [prompt for prompt, *_ in inserted] == ['p0', 'p1', 'p2', 'p3', 'p4']
+    assert stored_run(session, 'copy') == inserted
+    assert stored_run(session, 'after-copy') == inserted
+    assert session.query(BrandMention).count() == 3 * sum(
+        (i > 0) + (i % 2) for i in range(5)
+    )
+    session.close()
+    engine.dispose()
+
+
+def test_slow_writes_do_not_block_submit():
+    """Test that workers are not held up by a slow database."""
+    SlowDatabaseManager.batches = []
+    pipeline = ProcessingPipeline(lambda: None, batch_size=50, batch_interval=0.05,
+                                  manager_factory=SlowDatabaseManager)
+    pipeline.start()
+
+    start = time.monotonic()
+    for i in range(100):
+        pipeline.process_prompt_response(f"prompt {i}", f"Adidas answer {i}")
+    submit_time = time.monotonic() - start
+    pipeline.close()
+
+    written = [record for batch in SlowDatabaseManager.batches for record in batch]
+    assert submit_time < 0.2
+    assert len(written) == 100
+    assert len(SlowDatabaseManager.batches) < 100
+    assert all(record['mentions']['adidas'] == 1 for record in written)
+
+
+def test_submit_blocks_when_queue_is_full():
+    """Test backpressure once the analysis queue fills up."""
+    pipeline = ProcessingPipeline(lambda: None, analyze_queue_size=1, manager_factory=SlowDatabaseManager)
+    pipeline.submit({'prompt': 'a', 'response': 'x'})
+
+    blocked = threading.Thread(target=pipeline.submit, args=({'prompt': 'b', 'response': 'y'},), daemon=True)
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    pipeline.start()
+    blocked.join(timeout=2)
+    assert not blocked.is_alive()
+    pipeline.close()
+
+
+def test_writer_that_cannot_start_stops_producers():
+    """Test that producers are stopped, not deadlocked, and close() raises when the writer's session factory fails."""
+    def broken_session_factory():
+        raise RuntimeError("database unreachable")
+
+    dropped = []
+    pipeline = ProcessingPipeline(broken_session_factory, analyze_queue_size=2, write_queue_size=2,
+                                  manager_factory=SlowDatabaseManager, on_dropped=dropped.extend)
+    pipeline.start()
+    done = threading.Event()
+    handed_over = []
+    errors = []
+
+    def produce():
+        try:
+            for i in range(20):
+                pipeline.process_prompt_response(f"prompt {i}", "Nike answer")
+                handed_over.append(i)
+        except PipelineError as e:
+            errors.append(e)
+        done.set()
+
+    threading.Thread(target=produce, daemon=True).start()
+    assert done.wait(5)
+    assert len(errors) == 1 and len(handed_over) < 20
+    with pytest.raises(PipelineError, match="database unreachable"):
+        pipeline.close()
+    assert pipeline.stats['dropped'] == len(handed_over)
+    assert sorted(record['prompt'] for record in dropped) == sorted(f"prompt {i}" for i in handed_over)
+
+
+def test_batches_that_cannot_be_written_are_passed_to_on_dropped(session_factory, monkeypatch):
+    """Test that a batch dropped after its write retries reaches the on_dropped hook, not on_written."""
+    class FailingDatabaseManager(SlowDatabaseManager):
+        def save_prompt_responses(self, records):
+            raise RuntimeError("deadlock detected")
+
+    monkeypatch.setattr('scraper.pipeline.PIPELINE_WRITE_RETRIES', 1)
+    written, dropped = [], []
+    pipeline = ProcessingPipeline(session_factory, manager_factory=FailingDatabaseManager,
+                                  on_written=written.extend, on_dropped=dropped.extend)
+    pipeline.start()
+    pipeline.process_prompt_response("prompt 1", "Nike answer")
+    pipeline.close()
+
+    assert written == []
+    assert [record['prompt'] for record in dropped] == ["prompt 1"]
+    assert pipeline.stats['dropped'] == 1
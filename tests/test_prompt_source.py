@@ -0,0 +1,68 @@
+"""
+Tests for streaming prompt files.
+"""
+import io
+import json
+
+import pytest
+
+import scraper.prompt_source as prompt_source
+from scraper.prompt_source import PromptSource, parse_shard
+
+PROMPTS = [f'Prompt {i}, with "quotes" and ] brackets' for i in range(25)]
+
+
+@pytest.fixture(autouse=True)
+def small_reads(monkeypatch):
+    """Read a few characters at a time so values straddle read boundaries."""
+    monkeypatch.setattr(prompt_source, 'READ_SIZE', 7)
+
+
+def test_json_array_and_jsonl_give_the_same_prompts(tmp_path):
+    """Test both formats, including object entries and blank lines."""
+    entries = PROMPTS[:-1] + [{'prompt': PROMPTS[-1]}]
+    json_file = tmp_path / 'prompts.json'
+    json_file.write_text(json.dumps(entries, indent=2))
+    jsonl_file = tmp_path / 'prompts.jsonl'
+    jsonl_file.write_text('\n'.join(json.dumps(entry) for entry in entries) + '\n\n')
+
+    assert list(PromptSource(json_file)) == PROMPTS
+    assert list(PromptSource(jsonl_file)) == PROMPTS
+
+
+def test_json_array_is_read_lazily(tmp_path):
+    """Test that prompts come out before a broken tail of the file is reached."""
+    path = tmp_path / 'prompts.json'
+    path.write_text(json.dumps(PROMPTS)[:-1] + ', "unterminated')
+
+    prompts = iter(PromptSource(path))
+    assert next(prompts) == PROMPTS[0]
+    with pytest.raises(ValueError):
+        list(prompts)
+
+
+def test_numbers_split_across_reads(monkeypatch):
+    """Test that a top-level number cut off at its '.' or exponent by a read boundary is read whole."""
+    values = ["a", 23.5, -1.25e+10, 7, 0.5, True, None, "b"]
+    text = json.dumps(values)[1:]
+    for read_size in range(1, 12):
+        monkeypatch.setattr(prompt_source, 'READ_SIZE', read_size)
+        assert list(prompt_source._iter_json_array(io.StringIO(text))) == values
+
+
+def test_shards_split_the_file_without_overlap(tmp_path):
+    """Test that n shards cover every prompt exactly once."""
+    path = tmp_path / 'prompts.jsonl'
+    path.write_text('\n'.join(json.dumps(prompt) for prompt in PROMPTS))
+
+    shards = [list(PromptSource(path, *parse_shard(f'{i}/3'))) for i in (1, 2, 3)]
+    assert sorted(sum(shards, [])) == sorted(PROMPTS)
+    assert [len(shard) for shard in shards] == [9, 8, 8]
+
+
+def test_parse_shard_rejects_bad_specs():
+    """Test shard spec validation."""
+    assert parse_shard('1/1') == (0, 1)
+    for spec in ('0/4', '5/4', '2', 'a/b'):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
@@ -0,0 +1,58 @@
+"""
+Tests for re-analyzing stored responses.
+"""
+import pytest
+
+from app.aggregates import ROLLUPS, rebuild_brand_summaries, rebuild_rollups
+from app.models import BrandMention, BrandSummary
+from scraper.data_processor import DatabaseManager
+from scraper.reanalysis import Reanalyzer
+
+
+def seed(session_factory):
+    DatabaseManager(session_factory()).save_prompt_responses([
+        {'prompt': 'p1', 'response': 'Nike and On Running', 'mentions': {'nike': 1}},
+        {'prompt': 'p2', 'response': 'Hoka, Hoka, On Running', 'mentions': {'hoka': 2}},
+        {'prompt': 'p3', 'response': 'Nike', 'mentions': {'nike': 1}},
+    ])
+
+
+def snapshot(session):
+    """Mention rows plus every aggregate, for comparing against a full rebuild."""
+    return (
+        sorted((m.prompt_id, m.brand_name, m.mention_count) for m in session.query(BrandMention)),
+        {s.brand_name: s.total_mentions for s in session.query(BrandSummary)},
+        {bucket: sorted((r.brand_name, r.mention_count) for r in session.query(model))
+         for bucket, model in ROLLUPS.items()},
+    )
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_reanalysis_replaces_mentions_and_keeps_aggregates_consistent(session_factory, workers):
+    """Test that new brands are counted and the aggregates match a full rebuild."""
+    seed(session_factory)
+    stats = Reanalyzer(session_factory, brands=['nike', 'on running'], workers=workers, chunk_size=2).run()
+    assert stats == {'prompts': 3, 'removed': 3, 'added': 4, 'chunks': 2}
+
+    session = session_factory()
+    mentions, summaries, rollups = snapshot(session)
+    assert mentions == [(1, 'nike', 1), (1, 'on running', 1), (2, 'on running', 1), (3, 'nike', 1)]
+    assert summaries == {'nike': 2, 'hoka': 0, 'on running': 2}
+
+    rebuild_brand_summaries(session)
+    rebuild_rollups(session)
+    rebuilt = snapshot(session)
+    assert summaries == rebuilt[1]
+    # Rollup buckets emptied by the re-analysis remain with a zero count
+    assert {b: [r for r in rows if r[1]] for b, rows in rollups.items()} == rebuilt[2]
+    session.close()
+
+
+def test_reanalysis_respects_id_range(session_factory):
+    """Test that only prompts inside the id range are touched."""
+    seed(session_factory)
+    Reanalyzer(session_factory, brands=['on running'], workers=1, start_id=2, end_id=2).run()
+
+    session = session_factory()
+    assert snapshot(session)[0] == [(1, 'nike', 1), (2, 'on running', 1), (3, 'nike', 1)]
+    session.close()
@@ -0,0 +1,95 @@
+"""
+Tests for recording responses and replaying them offline.
+"""
+import json
+
+import pytest
+
+from app.models import BrandMention, Prompt, PromptLedger
+from scraper.page_scripts import RESPONSE_SNAPSHOT
+from scraper.recording import Replayer, ResponseRecorder, iter_recordings
+from scraper.response_handler import ResponseExtractor, ResponseHandler
+
+ANSWER = "Nike Pegasus and Hoka Clifton are the most popular daily trainers this year."
+HTML = ('<div data-message-author-role="assistant"><div class="markdown"><p>Nike Pegasus and '
+        '<strong>Hoka</strong> Clifton</p><ul><li>are popular</li><li>daily trainers, says Nike</li></ul>'
+        '</div><button>Copy</button></div>')
+
+
+class SnapshotDriver:
+    """Fake driver that only answers the snapshot script."""
+
+    current_window_handle = 'tab-0'
+
+    def execute_script(self, script, *args):
+        assert script == RESPONSE_SNAPSHOT
+        return {'html': HTML, 'text': ANSWER}
+
+
+class StubSender:
+    def send_prompt(self, prompt):
+        return ANSWER
+
+    def submit(self, prompt):
+        pass
+
+    def collect(self):
+        return ANSWER
+
+
+def record_prompts(directory, prompts):
+    recorder = ResponseRecorder(str(directory), run_id='run-1')
+    for prompt in prompts:
+        recorder.record(prompt, HTML, ANSWER, 1.25)
+    recorder.close()
+
+
+def test_html_is_read_like_inner_text():
+    """Test that recorded HTML yields the message text, with buttons left out."""
+    assert ResponseExtractor.extract_from_html(HTML) == (
+        "Nike Pegasus and Hoka Clifton\nare popular\ndaily trainers, says Nike"
+    )
+    assert ResponseExtractor.extract_from_html('<div></div>', ANSWER) == ANSWER
+    with pytest.raises(Exception, match="No valid response"):
+        ResponseExtractor.extract_from_html('<p>short</p>')
+
+
+def test_handler_records_sent_and_collected_responses(tmp_path):
+    """Test that single-tab and multi-tab sends both leave a recording with timing."""
+    recorder = ResponseRecorder(str(tmp_path), run_id='run-1')
+    handler = ResponseHandler(SnapshotDriver(), recorder=recorder)
+    handler.prompt_sender = StubSender()
+    assert handler.send_prompt("prompt 1") == ANSWER
+    handler.submit_prompt("prompt 2")
+    assert handler.collect_response() == ANSWER
+    recorder.close()
+
+    recordings = list(iter_recordings(str(tmp_path)))
+    assert [r['prompt'] for r in recordings] == ["prompt 1", "prompt 2"]
+    assert all(r['html'] == HTML and r['text'] == ANSWER and r['seconds'] >= 0 for r in recordings)
+
+
+def test_partial_last_line_is_skipped(tmp_path):
+    """Test that a recording cut short by a killed run does not stop the replay."""
+    record_prompts(tmp_path, ["prompt 1"])
+    with open(tmp_path / 'run-1-0.jsonl', 'w') as f:
+        f.write(json.dumps({'prompt': 'prompt 2', 'html': HTML}) + "\n" + '{"prompt": "prom')
+    assert [r['prompt'] for r in iter_recordings(str(tmp_path))] == ["prompt 2", "prompt 1"]
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_replay_stores_recordings_once(tmp_path, session_factory, workers):
+    """Test that a replay analyzes and stores every recording, and a repeat into the same run adds nothing."""
+    prompts = [f"prompt {i}" for i in range(7)]
+    record_prompts(tmp_path / 'recordings', prompts)
+
+    replayer = Replayer(session_factory, str(tmp_path / 'recordings'), workers=workers, chunk_size=3, run_id='replay')
+    assert replayer.run() == {'recordings': 7, 'analyzed': 7, 'unusable': 0, 'chunks': 3}
+    Replayer(session_factory, str(tmp_path / 'recordings'), workers=workers, chunk_size=3, run_id='replay').run()
+
+    session = session_factory()
+    assert sorted(p.prompt_text for p in session.query(Prompt)) == prompts
+    counts = {(m.brand_name, m.mention_count) for m in session.query(BrandMention)}
+    assert counts == {('nike', 2), ('hoka', 1)}
+    assert session.query(PromptLedger).filter_by(run_id='replay', status='completed').count() == 7
+    session.close()
@@ -0,0 +1,83 @@
+"""
+Tests for the TTL response cache.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.models import Prompt, PromptLedger
+from scraper.data_processor import DatabaseManager
+from scraper.response_cache import ResponseCache
+from scraper.utils import prompt_hash
+
+
+class FakeClock:
+    """Wall clock that only moves when told to."""
+
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_entries_expire_and_evict():
+    """Test TTL expiry and least-recently-used eviction in memory."""
+    clock = FakeClock(1000.0)
+    cache = ResponseCache(None, ttl=60, max_size=2, clock=clock)
+    cache.put('p1', 'r1')
+    cache.put('p2', 'r2')
+    assert cache.get(' P1 ') == 'r1'  # Normalized, and now most recently used
+    cache.put('p3', 'r3')
+    assert cache.get('p2') is None
+    assert cache.stats['evictions'] == 1
+
+    clock.now += 61
+    assert cache.get('p1') is None
+    assert cache.stats == {'hits': 1, 'misses': 2, 'evictions': 1}
+
+
+def test_hits_are_served_from_stored_responses(session_factory):
+    """Test that the database tier finds a recent response from an earlier run."""
+    DatabaseManager(session_factory()).save_prompt_responses([{
+        'prompt': 'Best shoes?', 'response': 'Nike', 'mentions': {'nike': 1},
+        'run_id': 'run-1', 'prompt_hash': prompt_hash('Best shoes?'),
+    }])
+
+    fresh = ResponseCache(session_factory, ttl=3600)
+    assert fresh.get('best shoes?') == 'Nike'
+    assert fresh.get('Other prompt') is None
+
+    expired = ResponseCache(session_factory, ttl=3600, clock=lambda: time.time() + 7200)
+    assert expired.get('Best shoes?') is None
+
+
+def test_cached_records_are_flagged_in_the_ledger(session_factory):
+    """Test that a reused response is stored and tagged as cached."""
+    DatabaseManager(session_factory()).save_prompt_responses([{
+        'prompt': 'p1', 'response': 'Nike', 'mentions': {'nike': 1}, 'cached': True,
+        'run_id': 'run-2', 'prompt_hash': prompt_hash('p1'),
+    }])
+    entry = session_factory().query(PromptLedger).one()
+    assert entry.cached and entry.status == 'completed'
+
+
+def test_reused_responses_do_not_extend_the_ttl(session_factory):
+    """Test that a cache hit stored again later is not served as a fresh scrape."""
+    manager = DatabaseManager(session_factory())
+    manager.save_prompt_responses([{
+        'prompt': 'Best shoes?', 'response': 'Nike', 'mentions': {'nike': 1},
+        'run_id': 'run-1', 'prompt_hash': prompt_hash('Best shoes?'),
+    }])
+    session = session_factory()
+    session.query(Prompt).update({Prompt.created_at: datetime.now(timezone.utc) - timedelta(minutes=80)})
+    session.commit()
+    session.close()
+
+    # A later run reused the response and stored it again, flagged as cached
+    manager.save_prompt_responses([{
+        'prompt': 'Best shoes?', 'response': 'Nike', 'mentions': {'nike': 1}, 'cached': True,
+        'run_id': 'run-2', 'prompt_hash': prompt_hash('Best shoes?'),
+    }])
+
+    assert ResponseCache(session_factory, ttl=3600).get('Best shoes?') is None
+    assert ResponseCache(session_factory, ttl=3 * 3600).get('Best shoes?') == 'Nike'
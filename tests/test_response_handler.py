@@ -0,0 +1,47 @@
+"""
+Tests for response extraction.
+"""
+import pytest
+
+from scraper.page_scripts import LAST_TEXT_BLOCK, LATEST_RESPONSE
+from scraper.response_handler import ResponseExtractor
+
+ANSWER = "Nike Pegasus and Hoka Clifton are the most popular daily trainers this year."
+
+
+class ScriptDriver:
+    """Fake driver that answers execute_script from a table of results."""
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+
+    def execute_script(self, script, *args):
+        self.calls.append(script)
+        return self.results.get(script)
+
+    @property
+    def page_source(self):
+        raise AssertionError("page_source must not be read")
+
+
+def test_extract_response_uses_one_round_trip():
+    """Test that the latest message is read with a single script call."""
+    driver = ScriptDriver({LATEST_RESPONSE: {'count': 3, 'text': f"  {ANSWER}\n", 'length': len(ANSWER) + 3,
+                                             'generating': False, 'done': True}})
+    assert ResponseExtractor(driver).extract_response() == ANSWER
+    assert driver.calls == [LATEST_RESPONSE]
+
+
+def test_fallback_reads_last_text_block_in_page():
+    """Test that the fallback runs in-page instead of copying the page source."""
+    driver = ScriptDriver({LATEST_RESPONSE: {'count': 0, 'text': '', 'length': 0}, LAST_TEXT_BLOCK: ANSWER})
+    assert ResponseExtractor(driver).extract_response() == ANSWER
+    assert driver.calls == [LATEST_RESPONSE, LAST_TEXT_BLOCK]
+
+
+def test_no_response_raises():
+    """Test that a missing response raises so the prompt is retried."""
+    driver = ScriptDriver({LATEST_RESPONSE: {'count': 1, 'text': 'short', 'length': 5}})
+    with pytest.raises(Exception, match="No valid response"):
+        ResponseExtractor(driver).extract_response()
@@ -0,0 +1,74 @@
+"""
+Tests for driving several ChatGPT tabs from one worker.
+"""
+from scraper.tab_worker import MultiTabWorker
+from scraper.worker_pool import PromptQueue, WorkerPool
+from tests.fakes import FakeBrowserManager, FakeDataProcessor, FakeResponseHandler
+
+PROMPTS = [f"prompt {i}" for i in range(1, 13)]
+
+
+def make_worker(results, handlers, tabs=3, fail_prompts=(), manager=None, **kwargs):
+    prompt_queue = PromptQueue()
+    for item in enumerate(PROMPTS, 1):
+        prompt_queue.put(item)
+
+    def handler_factory(driver):
+        handler = FakeResponseHandler(driver, fail_prompts=fail_prompts)
+        handlers.append(handler)
+        return handler
+
+    return MultiTabWorker(1, prompt_queue, manager or FakeBrowserManager(), FakeDataProcessor(results), delay=0,
+                          handler_factory=handler_factory, tabs=tabs, poll_interval=0, **kwargs)
+
+
+def test_prompts_are_interleaved_across_tabs():
+    """Test that every tab has a prompt in flight at once and every prompt is answered once."""
+    results, handlers = [], []
+    worker = make_worker(results, handlers)
+    worker.run()
+
+    assert sorted(prompt for prompt, _ in results) == sorted(PROMPTS)
+    assert handlers[0].max_pending == 3
+    assert worker.stats['processed'] == len(PROMPTS)
+    assert worker.in_flight() == []
+
+
+def test_failing_prompt_is_retried_then_skipped_without_blocking_other_tabs():
+    """Test per-prompt retries in tab mode."""
+    results, handlers = [], []
+    worker = make_worker(results, handlers, fail_prompts={"prompt 5"})
+    worker.run()
+
+    assert sorted(prompt for prompt, _ in results) == sorted(p for p in PROMPTS if p != "prompt 5")
+    assert worker.data_processor.failures == ["prompt 5"]
+    assert worker.stats['retries'] == worker.max_retries - 1
+    assert worker.prompt_queue.unfinished_tasks == 0
+
+
+def test_crashed_tab_worker_hands_back_all_its_prompts():
+    """Test that the pool re-queues every prompt a crashed multi-tab worker held."""
+    results, handlers = [], []
+    worker = make_worker(results, handlers)
+    worker._start_browser()
+    worker._open_tabs()
+    worker._fill_idle_tabs()
+    held = worker.in_flight()
+    assert len(held) == 3
+
+    worker.run = lambda: (_ for _ in ()).throw(RuntimeError("browser gone"))
+    WorkerPool._run_worker(worker, worker.prompt_queue)
+    assert worker.prompt_queue.qsize() == len(PROMPTS)
+    assert worker.prompt_queue.unfinished_tasks == len(PROMPTS)
+
+
+def test_recycle_waits_for_busy_tabs_to_finish():
+    """Test that a browser due for recycling drains its tabs first and no prompt is lost."""
+    results, handlers = [], []
+    manager = FakeBrowserManager()
+    worker = make_worker(results, handlers, manager=manager, recycle_browser_every=4)
+    worker.run()
+
+    assert sorted(prompt for prompt, _ in results) == sorted(PROMPTS)
+    assert worker.stats['recycles'] == manager.restarts >= 1
+    assert all(not handler.pending for handler in handlers[:-1])
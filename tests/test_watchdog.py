@@ -0,0 +1,144 @@
+"""
+Tests for browser crash recovery and memory-based recycling.
+"""
+import queue
+import threading
+
+import pytest
+
+from scraper.metrics import RunMetrics
+from scraper.watchdog import BrowserRestartLimitError, BrowserWatchdog, MemoryWatchdog
+from scraper.worker_pool import ScraperWorker
+from tests.fakes import FakeBrowserManager, FakeDataProcessor, FakeResponseHandler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CrashingHandler(FakeResponseHandler):
+    """Kills its browser on the first prompt it sees."""
+
+    crashes = 0
+
+    def send_prompt(self, prompt):
+        if CrashingHandler.crashes == 0:
+            CrashingHandler.crashes += 1
+            self.driver.crashed = True
+        if self.driver.crashed:
+            raise RuntimeError("chrome not reachable")
+        return super().send_prompt(prompt)
+
+
+def make_worker(prompts, manager, results, handler_factory, **kwargs):
+    prompt_queue = queue.Queue()
+    for item in enumerate(prompts, 1):
+        prompt_queue.put(item)
+    return ScraperWorker(1, prompt_queue, manager, FakeDataProcessor(results), delay=0,
+                         handler_factory=handler_factory, **kwargs)
+
+
+def test_hung_browser_is_unhealthy():
+    """Test that a probe which never returns counts as a failed health check."""
+    manager = FakeBrowserManager()
+    manager.launch_browser()
+    watchdog = BrowserWatchdog(manager, health_timeout=0.1)
+    assert watchdog.is_healthy()
+
+    release = threading.Event()
+    manager.driver.execute_script = lambda script: release.wait()
+    assert not watchdog.is_healthy()
+    release.set()
+
+    manager.driver = None
+    assert not watchdog.is_healthy()
+
+
+def test_restarts_are_capped_per_hour():
+    """Test the rolling one-hour restart window."""
+    clock = FakeClock()
+    manager = FakeBrowserManager()
+    watchdog = BrowserWatchdog(manager, max_restarts_per_hour=2, clock=clock)
+    watchdog.restart()
+    clock.now += 1800
+    watchdog.restart()
+    with pytest.raises(BrowserRestartLimitError):
+        watchdog.restart()
+
+    clock.now += 1801  # the first restart has left the window
+    watchdog.restart()
+    assert manager.restarts == 3
+
+
+def test_worker_restarts_crashed_browser_and_continues_with_the_prompt():
+    """Test that a dead browser is replaced and the interrupted prompt still gets its response."""
+    CrashingHandler.crashes = 0
+    results = []
+    manager = FakeBrowserManager()
+    worker = make_worker(["prompt 1", "prompt 2"], manager, results, CrashingHandler)
+    worker.run()
+
+    assert [prompt for prompt, _ in results] == ["prompt 1", "prompt 2"]
+    assert manager.restarts == 1
+    assert worker.stats['restarts'] == 1
+    assert worker.stats['retries'] == 1
+
+
+def test_worker_stops_once_restart_cap_is_reached():
+    """Test that a browser that keeps dying ends the worker instead of looping."""
+    class AlwaysCrashing(FakeResponseHandler):
+        def send_prompt(self, prompt):
+            self.driver.crashed = True
+            raise RuntimeError("chrome not reachable")
+
+    manager = FakeBrowserManager()
+    worker = make_worker(["prompt 1"], manager, [], AlwaysCrashing, max_restarts_per_hour=1)
+    with pytest.raises(BrowserRestartLimitError):
+        worker.run()
+    assert manager.restarts == 1
+    assert worker.current == (1, "prompt 1")  # handed back to the queue by the pool
+
+
+def test_memory_watchdog_triggers_on_rss_or_prompt_count():
+    """Test both recycle triggers and that a recycle starts the count again."""
+    manager = FakeBrowserManager(rss_mb=100, rss_growth_mb=50)
+    manager.launch_browser()
+    watchdog = MemoryWatchdog(manager, max_rss_mb=180)
+    assert watchdog.recycle_reason() is None  # 100 MB
+    assert watchdog.recycle_reason() is None  # 150 MB
+    assert watchdog.recycle_reason() == "200 MB RSS (limit 180 MB)"
+
+    watchdog.recycle("a test")
+    assert manager.restarts == 1
+    assert watchdog.last_rss_mb == 100
+
+    by_count = MemoryWatchdog(FakeBrowserManager(), recycle_every=2)
+    by_count.record_prompts()
+    assert by_count.recycle_reason() is None  # no RSS available, count not reached
+    by_count.record_prompts()
+    assert by_count.recycle_reason() == "2 prompts"
+    by_count.recycle("2 prompts")
+    assert by_count.prompts == 0
+
+
+def test_worker_recycles_growing_browser_between_prompts():
+    """Test that a browser past the memory limit is replaced without losing a prompt."""
+    metrics = RunMetrics()
+    results = []
+    manager = FakeBrowserManager(rss_mb=100, rss_growth_mb=60)
+    worker = make_worker([f"prompt {i}" for i in range(1, 6)], manager, results, FakeResponseHandler,
+                         metrics=metrics, max_browser_rss_mb=200)
+    worker.run()
+
+    assert [prompt for prompt, _ in results] == [f"prompt {i}" for i in range(1, 6)]
+    assert worker.stats['recycles'] == manager.restarts == 2
+    summary = metrics.summary()
+    assert summary['counters']['browser_recycles'] == 2
+    assert summary['stages']['browser_recycle']['count'] == 2
+    reading = summary['readings']['browser_rss_mb']
+    assert reading['max'] == 220
+    assert reading['count'] == 8  # startup, one per prompt and one after each recycle
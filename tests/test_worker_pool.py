@@ -0,0 +1,194 @@
+"""
+Tests for the parallel scraper worker pool.
+"""
+import threading
+import time
+
+import pytest
+
+from scraper.pipeline import PipelineError
+from scraper.utils import CHATGPT_URL
+from scraper.worker_pool import PromptQueue, ScraperWorker, WorkerPool, WorkersStoppedError
+from tests.fakes import FakeBrowserManager, FakeDataProcessor, FakeResponseHandler
+
+PROMPTS = [f"prompt {i}" for i in range(1, 21)]
+
+
+def make_pool(num_workers, results, browser_factory=lambda worker_id: FakeBrowserManager(),
+              handler_factory=FakeResponseHandler):
+    """Build a pool wired to fakes with no pacing delay."""
+    return WorkerPool(
+        num_workers,
+        FakeDataProcessor(results),
+        delay=0,
+        browser_factory=browser_factory,
+        handler_factory=handler_factory
+    )
+
+
+def test_all_prompts_processed_once():
+    """Test that every prompt is processed exactly once across workers."""
+    results = []
+    pool = make_pool(4, results)
+    pool.run(PROMPTS)
+
+    assert sorted(prompt for prompt, _ in results) == sorted(PROMPTS)
+    assert sum(worker.stats['processed'] for worker in pool.workers) == len(PROMPTS)
+
+
+def test_prompts_are_streamed_to_workers():
+    """Test that workers start before a slow prompt iterator is exhausted."""
+    results = []
+    first_processed = threading.Event()
+
+    def slow_prompts():
+        yield PROMPTS[0]
+        # The first prompt must be processed while the input is still open
+        assert first_processed.wait(5)
+        yield from PROMPTS[1:]
+
+    class SignallingProcessor(FakeDataProcessor):
+        def process_prompt_response(self, prompt, response):
+            super().process_prompt_response(prompt, response)
+            first_processed.set()
+
+    pool = WorkerPool(2, SignallingProcessor(results), delay=0,
+                      browser_factory=lambda worker_id: FakeBrowserManager(),
+                      handler_factory=FakeResponseHandler)
+    pool.run(slow_prompts())
+
+    assert pool.feeder.error is None
+    assert sorted(prompt for prompt, _ in results) == sorted(PROMPTS)
+
+
+def test_worker_that_fails_to_launch_does_not_stop_others():
+    """Test that a crashed worker leaves the remaining workers running."""
+    results = []
+    launches = iter([True, False, False])
+    pool = make_pool(3, results, browser_factory=lambda worker_id: FakeBrowserManager(fail_launch=next(launches)))
+    pool.run(PROMPTS)
+
+    assert sorted(prompt for prompt, _ in results) == sorted(PROMPTS)
+
+
+def test_run_fails_when_every_worker_dies():
+    """Test that leftover prompts are failed and the run raises once no worker is left."""
+    class CrashingBrowserManager(FakeBrowserManager):
+        def launch_browser(self):
+            # Die only once the feeder is stuck on a full queue
+            while not pool.feeder.queue.full():
+                time.sleep(0.01)
+            raise RuntimeError("browser failed to start")
+
+    results = []
+    pool = make_pool(2, results, browser_factory=lambda worker_id: CrashingBrowserManager())
+    pool.prefetch = 3
+
+    with pytest.raises(WorkersStoppedError, match="3 queued prompts marked failed") as error:
+        pool.run(iter(PROMPTS))
+
+    assert results == []
+    assert pool.data_processor.failures == PROMPTS[:3]
+    assert not pool.feeder.thread.is_alive()
+    assert str(error.value.__cause__) == "browser failed to start"
+
+
+def test_retries_are_counted_per_worker():
+    """Test that a failing prompt is retried and then skipped."""
+    results = []
+    pool = make_pool(2, results, handler_factory=lambda driver: FakeResponseHandler(driver, fail_prompts={"prompt 3"}))
+    pool.run(PROMPTS)
+
+    assert "prompt 3" not in [prompt for prompt, _ in results]
+    assert sum(worker.stats['failed'] for worker in pool.workers) == 1
+    assert sum(worker.stats['retries'] for worker in pool.workers) == pool.max_retries - 1
+
+
+def test_crashed_worker_hands_back_its_prompt():
+    """Test that a prompt held by a crashing worker is picked up by another."""
+    prompt_queue = PromptQueue()
+    prompt_queue.put((1, "prompt 1"))
+    results = []
+
+    crashing = ScraperWorker(1, prompt_queue, FakeBrowserManager(), FakeDataProcessor(results),
+                             delay=0, handler_factory=FakeResponseHandler)
+
+    def crash(index, prompt):
+        raise RuntimeError("renderer died")
+
+    crashing.process_prompt = crash
+    WorkerPool._run_worker(crashing, prompt_queue)
+
+    healthy = ScraperWorker(2, prompt_queue, FakeBrowserManager(), FakeDataProcessor(results),
+                            delay=0, handler_factory=FakeResponseHandler)
+    thread = threading.Thread(target=healthy.run)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert results == [("prompt 1", "For 'prompt 1' most runners pick Nike.")]
+    assert prompt_queue.unfinished_tasks == 0
+
+
+def test_hand_back_does_not_block_on_a_full_queue():
+    """Test that a crashing worker returns its prompt even when the feeder has filled the queue."""
+    prompt_queue = PromptQueue(maxsize=2)
+    prompt_queue.put((1, "prompt 1"))
+    results = []
+
+    crashing = ScraperWorker(1, prompt_queue, FakeBrowserManager(), FakeDataProcessor(results),
+                             delay=0, handler_factory=FakeResponseHandler)
+
+    def crash(index, prompt):
+        # The feeder refills the queue while this worker holds prompt 1
+        if prompt_queue.empty():
+            prompt_queue.put((2, "prompt 2"))
+            prompt_queue.put((3, "prompt 3"))
+        raise RuntimeError("renderer died")
+
+    crashing.process_prompt = crash
+    thread = threading.Thread(target=WorkerPool._run_worker, args=(crashing, prompt_queue), daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert [prompt_queue.get_nowait() for _ in range(3)] == [
+        (1, "prompt 1"), (2, "prompt 2"), (3, "prompt 3")
+    ]
+
+
+def test_worker_stops_once_results_cannot_be_stored():
+    """Test that a worker stops on the first prompt, without retries, once the pipeline has failed."""
+    class BrokenPipeline(FakeDataProcessor):
+        def process_prompt_response(self, prompt, response):
+            raise PipelineError("Pipeline writer could not open the database")
+
+    prompt_queue = PromptQueue()
+    for item in enumerate(PROMPTS, 1):
+        prompt_queue.put(item)
+    worker = ScraperWorker(1, prompt_queue, FakeBrowserManager(), BrokenPipeline(),
+                           delay=0, handler_factory=FakeResponseHandler)
+
+    with pytest.raises(PipelineError):
+        worker.run()
+    assert worker.stats['retries'] == worker.stats['restarts'] == 0
+    assert worker.in_flight() == [(1, "prompt 1")]
+    assert prompt_queue.qsize() == len(PROMPTS) - 1
+
+
+def test_default_browser_factory_opens_chatgpt(monkeypatch):
+    """Test that the default factory does not pass the worker id on as the URL."""
+    managers = []
+
+    class RecordingBrowserManager(FakeBrowserManager):
+        def __init__(self, url=CHATGPT_URL):
+            super().__init__()
+            self.url = url
+            managers.append(self)
+
+    monkeypatch.setattr('scraper.worker_pool.BrowserManager', RecordingBrowserManager)
+    results = []
+    pool = WorkerPool(2, FakeDataProcessor(results), delay=0, handler_factory=FakeResponseHandler)
+    pool.run(PROMPTS[:4])
+
+    assert len(results) == 4
+    assert [manager.url for manager in managers] == [CHATGPT_URL, CHATGPT_URL]